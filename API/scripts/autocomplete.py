@@ -0,0 +1,378 @@
+import heapq
+import select
+import sys
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Literal, Optional
+
+# =================================================================
+# ===== AUTOCOMPLÉTION EN MÉMOIRE =====
+# Index de préfixes des titres, artistes et albums, gardé dans le
+# processus de l'API : une recherche ne touche pas la base.
+# - chaque nom donne une clé par mot de départ ("the dark side" ->
+#   "the dark side", "dark side", "side"), normalisée (minuscules, sans
+#   accents) ; les clés sont dans une liste triée, parcourue par bisect
+# - pour les préfixes trop fréquents ("a", "la"...), les meilleurs
+#   résultats sont précalculés : une recherche ne parcourt jamais plus de
+#   `scan_limit` clés
+# - les résultats sont classés par poids (écoutes, favoris)
+# L'index est construit au démarrage puis tenu à jour par les
+# notifications 'sae_catalog' (Tables/scriptBDDautocomplete.sql).
+# =================================================================
+
+AutocompleteKind = Literal["tracks", "artists", "albums"]
+
+# Par type : requête (id, label, weight) et table émettrice des notifications
+SOURCES = {
+    "tracks": ("tracks", "SELECT track_id AS id, track_title AS label, COALESCE(track_listens, 0) AS weight FROM sae.tracks", "track_id"),
+    "artists": ("artist", "SELECT artist_id AS id, artist_name AS label, COALESCE(artist_favorites, 0) AS weight FROM sae.artist", "artist_id"),
+    "albums": ("album", "SELECT album_id AS id, album_title AS label, COALESCE(album_listens, 0) AS weight FROM sae.album", "album_id"),
+}
+KIND_BY_TABLE = {table: kind for kind, (table, _, _) in SOURCES.items()}
+
+_KEY_END = chr(sys.maxunicode)  # borne haute : toutes les clés commençant par p sont < p + _KEY_END
+
+
+def normalize(text: Optional[str]) -> str:
+    """Minuscules, sans accents, ponctuation remplacée par des espaces."""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    chars = [c if c.isalnum() else " " for c in decomposed if not unicodedata.combining(c)]
+    return " ".join("".join(chars).casefold().split())
+
+
+class PrefixIndex:
+    """
+    Index d'un type (titres, artistes ou albums). Non thread-safe :
+    Autocomplete sérialise les accès.
+    """
+
+    def __init__(self, max_entries: int = 250000, top_k: int = 20, scan_limit: int = 512,
+                 max_words: int = 8, key_length: int = 48):
+        self.max_entries = max_entries
+        self.top_k = top_k
+        self.scan_limit = scan_limit
+        self.max_words = max_words
+        self.key_length = key_length
+        self._keys: List[str] = []          # clés triées
+        self._ids: List[int] = []           # id de chaque clé (listes parallèles)
+        self._entries: Dict[int, tuple] = {}  # id -> (label, weight, clés)
+        self._top: Dict[str, List[int]] = {}  # préfixe fréquent -> meilleurs ids
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _rank(self, entry_id: int):
+        return (self._entries[entry_id][1], -entry_id)
+
+    def _make_keys(self, label: str) -> tuple:
+        words = normalize(label).split()
+        keys = {" ".join(words[i:])[:self.key_length] for i in range(min(len(words), self.max_words))}
+        return tuple(sorted(keys))
+
+    def _best(self, lo: int, hi: int, limit: int) -> List[int]:
+        return heapq.nlargest(limit, set(self._ids[lo:hi]), key=self._rank)
+
+    def _range(self, prefix: str):
+        lo = bisect_left(self._keys, prefix)
+        return lo, bisect_left(self._keys, prefix + _KEY_END, lo)
+
+    # ---------- construction ----------
+
+    def build(self, rows: Iterable) -> None:
+        rows = [(r["id"], r["label"], r["weight"]) for r in rows if r["label"]]
+        if len(rows) > self.max_entries:
+            self.dropped = len(rows) - self.max_entries
+            rows = heapq.nlargest(self.max_entries, rows, key=lambda r: (r[2], -r[0]))
+        else:
+            self.dropped = 0
+        self._entries = {}
+        pairs = []
+        for entry_id, label, weight in rows:
+            keys = self._make_keys(label)
+            self._entries[entry_id] = (label, weight, keys)
+            pairs.extend((key, entry_id) for key in keys)
+        pairs.sort()
+        self._keys = [key for key, _ in pairs]
+        self._ids = [entry_id for _, entry_id in pairs]
+        self._top = {}
+        self._index_frequent("", 0, len(self._keys))
+
+    def _index_frequent(self, prefix: str, lo: int, hi: int) -> None:
+        """Précalcule les préfixes (sous `prefix`) qui couvrent plus de scan_limit clés."""
+        depth = len(prefix)
+        i = lo
+        while i < hi:
+            key = self._keys[i]
+            if len(key) <= depth:
+                i += 1
+                continue
+            child = key[:depth + 1]
+            j = bisect_left(self._keys, child + _KEY_END, i, hi)
+            if j - i > self.scan_limit:
+                self._top[child] = self._best(i, j, self.top_k)
+                self._index_frequent(child, i, j)
+            i = j
+
+    # ---------- mises à jour incrémentales ----------
+
+    def _frequent_prefixes(self, keys) -> set:
+        prefixes = set()
+        for key in keys:
+            for n in range(1, len(key) + 1):
+                if key[:n] not in self._top:
+                    break   # les préfixes fréquents sont emboîtés
+                prefixes.add(key[:n])
+        return prefixes
+
+    def _refresh_top(self, prefix: str, entry_id: int, old_rank, new_rank) -> None:
+        top = self._top[prefix]
+        if new_rank is None:
+            if entry_id in top:
+                self._top[prefix] = self._best(*self._range(prefix), self.top_k)
+        elif entry_id in top:
+            if old_rank is not None and new_rank < old_rank:
+                self._top[prefix] = self._best(*self._range(prefix), self.top_k)
+            else:
+                top.sort(key=self._rank, reverse=True)
+        elif len(top) < self.top_k or new_rank > self._rank(top[-1]):
+            top.append(entry_id)
+            top.sort(key=self._rank, reverse=True)
+            del top[self.top_k:]
+
+    def _remove_keys(self, entry_id: int, keys) -> None:
+        for key in keys:
+            i = bisect_left(self._keys, key)
+            while self._ids[i] != entry_id:
+                i += 1
+            del self._keys[i]
+            del self._ids[i]
+
+    def upsert(self, entry_id: int, label: Optional[str], weight: int) -> None:
+        if not label:
+            self.remove(entry_id)
+            return
+        old = self._entries.get(entry_id)
+        if old is None and len(self._entries) >= self.max_entries:
+            self.dropped += 1
+            return
+        old_keys = old[2] if old else ()
+        old_rank = (old[1], -entry_id) if old else None
+        keys = old_keys if old and old[0] == label else self._make_keys(label)
+        old_prefixes = self._frequent_prefixes(old_keys)
+
+        if keys is not old_keys:
+            self._remove_keys(entry_id, old_keys)
+            for key in keys:
+                i = bisect_left(self._keys, key)
+                while i < len(self._keys) and self._keys[i] == key and self._ids[i] < entry_id:
+                    i += 1
+                self._keys.insert(i, key)
+                self._ids.insert(i, entry_id)
+        self._entries[entry_id] = (label, weight, keys)
+
+        new_prefixes = self._frequent_prefixes(keys)
+        for prefix in old_prefixes - new_prefixes:
+            self._refresh_top(prefix, entry_id, old_rank, None)
+        for prefix in new_prefixes:
+            self._refresh_top(prefix, entry_id, old_rank if prefix in old_prefixes else None, (weight, -entry_id))
+
+    def remove(self, entry_id: int) -> None:
+        old = self._entries.pop(entry_id, None)
+        if old is None:
+            return
+        prefixes = self._frequent_prefixes(old[2])
+        self._remove_keys(entry_id, old[2])
+        for prefix in prefixes:
+            if entry_id in self._top[prefix]:
+                self._top[prefix] = self._best(*self._range(prefix), self.top_k)
+
+    # ---------- lecture ----------
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        limit = min(limit, self.top_k)
+        ids = self._top.get(prefix)
+        if ids is None:
+            ids = self._best(*self._range(prefix), limit)
+        return [{"id": i, "label": self._entries[i][0], "weight": self._entries[i][1]} for i in ids[:limit]]
+
+    def memory_bytes(self) -> int:
+        """Estimation de la mémoire occupée (listes, chaînes, dictionnaires)."""
+        size = sys.getsizeof(self._keys) + sys.getsizeof(self._ids) + sys.getsizeof(self._entries) + sys.getsizeof(self._top)
+        size += sum(sys.getsizeof(k) for k in self._keys)
+        # Les ints < 257 sont partagés ; au-delà, un objet par clé (approximation)
+        size += 28 * len(self._ids)
+        for label, _, keys in self._entries.values():
+            size += sys.getsizeof(label) + sys.getsizeof(keys) + 64
+        for prefix, ids in self._top.items():
+            size += sys.getsizeof(prefix) + sys.getsizeof(ids)
+        return size
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "keys": len(self._keys),
+            "frequent_prefixes": len(self._top),
+            "dropped": self.dropped,
+            "memory_bytes": self.memory_bytes(),
+        }
+
+
+class Autocomplete:
+    """
+    Les trois index (titres, artistes, albums) + le thread qui les construit
+    au démarrage et applique les notifications 'sae_catalog'.
+    `connect()` renvoie une connexion psycopg2 (RealDictCursor) pour les
+    lectures ; `listen_connect()` la connexion dédiée au LISTEN.
+    """
+
+    CHANNEL = "sae_catalog"
+
+    def __init__(self, connect: Callable, listen_connect: Optional[Callable] = None,
+                 max_entries: int = 250000, scan_limit: int = 512,
+                 listen: bool = True, reconnect_delay: float = 5.0):
+        self._connect = connect
+        self._listen_connect = listen_connect or connect
+        self._index_options = {"max_entries": max_entries, "scan_limit": scan_limit}
+        self.indexes: Dict[str, PrefixIndex] = {kind: PrefixIndex(**self._index_options) for kind in SOURCES}
+        self.listen = listen
+        self.reconnect_delay = reconnect_delay
+        self.ready = False
+        self.build_seconds: Optional[float] = None
+        self.built_at: Optional[float] = None
+        self.applied_changes = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- construction ----------
+
+    def rebuild(self, kinds: Iterable[str] = SOURCES) -> None:
+        """Reconstruit les index demandés depuis la base (hors verrou, puis échange)."""
+        started = time.perf_counter()
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            built = {}
+            for kind in kinds:
+                cur.execute(SOURCES[kind][1])
+                index = PrefixIndex(**self._index_options)
+                index.build(cur.fetchall())
+                built[kind] = index
+            cur.close()
+            conn.rollback()
+        finally:
+            conn.close()
+        with self._lock:
+            self.indexes.update(built)
+            self.ready = True
+        self.build_seconds = round(time.perf_counter() - started, 3)
+        self.built_at = time.time()
+
+    def apply(self, kind: str, ids: List[int]) -> None:
+        """Relit les lignes `ids` et met l'index à jour (ligne absente = supprimée)."""
+        table, query, id_col = SOURCES[kind]
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute(f"{query} WHERE {id_col} = ANY(%s)", (ids,))
+            rows = {r["id"]: r for r in cur.fetchall()}
+            cur.close()
+            conn.rollback()
+        finally:
+            conn.close()
+        # Verrou pris musique par musique : chaque mise à jour coûte O(n)
+        # (insertion dans les listes triées), les recherches passent entre deux
+        for entry_id in ids:
+            row = rows.get(entry_id)
+            with self._lock:
+                index = self.indexes[kind]
+                if row is None:
+                    index.remove(entry_id)
+                else:
+                    index.upsert(entry_id, row["label"], row["weight"])
+                self.applied_changes += 1
+
+    # ---------- écoute des changements ----------
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="autocomplete", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            listener = None
+            try:
+                if self.listen:
+                    listener = self._listen_connect()
+                    listener.autocommit = True
+                    listener.cursor().execute(f"LISTEN {self.CHANNEL}")
+                # LISTEN avant la construction : aucun changement perdu entre les deux
+                self.rebuild()
+                if listener is None:
+                    return
+                while not self._stop.is_set():
+                    if select.select([listener], [], [], 1.0)[0]:
+                        listener.poll()
+                        self._dispatch(listener)
+            except Exception as e:
+                print(f"Autocomplétion : {e} (nouvel essai dans {self.reconnect_delay:g} s)")
+                self._stop.wait(self.reconnect_delay)
+            finally:
+                if listener is not None:
+                    try:
+                        listener.cursor().execute(f"UNLISTEN {self.CHANNEL}")
+                    except Exception:
+                        pass
+                    listener.close()
+
+    def _dispatch(self, listener) -> None:
+        changed: Dict[str, Optional[set]] = {}    # type -> ids (None = tout reconstruire)
+        while listener.notifies:
+            table, _, payload = listener.notifies.pop(0).payload.partition(":")
+            kind = KIND_BY_TABLE.get(table)
+            if kind is None:
+                continue
+            if payload == "*":
+                changed[kind] = None
+            elif changed.get(kind, set()) is not None:
+                changed.setdefault(kind, set()).update(int(i) for i in payload.split(",") if i)
+        full = [kind for kind, ids in changed.items() if ids is None]
+        if full:
+            self.rebuild(full)
+        for kind, ids in changed.items():
+            if ids:
+                self.apply(kind, sorted(ids))
+
+    # ---------- lecture ----------
+
+    def search(self, query: str, kinds: Iterable[str], limit: int = 10) -> dict:
+        with self._lock:
+            return {kind: self.indexes[kind].search(query, limit) for kind in kinds}
+
+    def stats(self) -> dict:
+        with self._lock:
+            indexes = {kind: index.stats() for kind, index in self.indexes.items()}
+        return {
+            "ready": self.ready,
+            "listening": self.listen and self._thread is not None and self._thread.is_alive(),
+            "build_seconds": self.build_seconds,
+            "built_at": self.built_at,
+            "applied_changes": self.applied_changes,
+            "memory_bytes": sum(i["memory_bytes"] for i in indexes.values()),
+            "indexes": indexes,
+        }
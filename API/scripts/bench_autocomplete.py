@@ -0,0 +1,91 @@
+"""
+Mesure la latence de l'autocomplétion (PrefixIndex.search) sur le catalogue.
+
+    python API/scripts/bench_autocomplete.py                 # catalogue de la base (.env)
+    python API/scripts/bench_autocomplete.py --synthetic 110000
+
+Les requêtes sont des débuts de noms réels (1 à 12 caractères, à partir
+d'un mot au hasard), comme pendant une saisie.
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+from psycopg2.extras import RealDictCursor
+
+from autocomplete import SOURCES, PrefixIndex
+
+load_dotenv()
+
+DB_CONFIG = {
+    "host": "localhost",
+    "dbname": os.getenv("POSTGRES_DBNAME"),
+    "user": os.getenv("POSTGRES_USER"),
+    "password": os.getenv("POSTGRES_PASSWORD"),
+    "port": int(os.getenv("POSTGRES_PORT", 5432))
+}
+
+SYNTHETIC_WORDS = ["love", "night", "la", "le", "de", "the", "song", "dark", "live", "remix", "amour", "été",
+                   "rock", "blue", "world", "part", "intro", "dream", "noir", "city", "fire", "rain", "ville"]
+
+
+def load_rows(synthetic: int):
+    if synthetic:
+        rng = random.Random(0)
+        rows = []
+        for i in range(synthetic):
+            words = [rng.choice(SYNTHETIC_WORDS) for _ in range(rng.randint(1, 4))] + [f"{rng.randrange(36 ** 4):x}"]
+            rows.append({"id": i, "label": " ".join(words), "weight": int(rng.paretovariate(1.2))})
+        return {"tracks": rows}
+    conn = psycopg2.connect(**DB_CONFIG, cursor_factory=RealDictCursor)
+    cur = conn.cursor()
+    catalog = {}
+    for kind, (_, query, _) in SOURCES.items():
+        cur.execute(query)
+        catalog[kind] = cur.fetchall()
+    conn.close()
+    return catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="catalogue aléatoire de N titres au lieu de la base")
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=8)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    for kind, rows in load_rows(args.synthetic).items():
+        index = PrefixIndex()
+        started = time.perf_counter()
+        index.build(rows)
+        build = time.perf_counter() - started
+
+        labels = [r["label"] for r in rows if r["label"]]
+        if not labels:
+            continue
+        queries = []
+        for _ in range(args.queries):
+            words = rng.choice(labels).split()
+            start = " ".join(words[rng.randrange(len(words)):])
+            queries.append(start[:rng.randint(1, 12)])
+
+        timings = []
+        for query in queries:
+            t = time.perf_counter()
+            index.search(query, args.limit)
+            timings.append((time.perf_counter() - t) * 1000)
+        timings.sort()
+        stats = index.stats()
+        print(f"{kind}: {stats['entries']} noms, {stats['keys']} clés, {stats['frequent_prefixes']} préfixes précalculés, "
+              f"{stats['memory_bytes'] / 2 ** 20:.1f} Mo, construit en {build:.2f} s")
+        print(f"  {len(timings)} requêtes : p50 {statistics.median(timings):.3f} ms, "
+              f"p99 {timings[int(len(timings) * 0.99)]:.3f} ms, max {timings[-1]:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Compare l'encodage des réponses : ancien chemin (clean_nan + jsonable_encoder
++ JSONResponse) et FastJSONResponse (responses.py).
+
+    python API/scripts/bench_json.py                 # pages lues dans la base (.env)
+    python API/scripts/bench_json.py --synthetic
+
+Charges mesurées : une page /tracks de 1000 lignes et 1000 lignes de
+tracks_features_mat (une trentaine de colonnes, NaN, dates).
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import time
+from datetime import date
+
+import psycopg2
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+from psycopg2.extras import RealDictCursor
+from starlette.responses import JSONResponse
+
+from responses import FastJSONResponse, orjson
+
+load_dotenv()
+
+DB_CONFIG = {
+    "host": "localhost",
+    "dbname": os.getenv("POSTGRES_DBNAME"),
+    "user": os.getenv("POSTGRES_USER"),
+    "password": os.getenv("POSTGRES_PASSWORD"),
+    "port": int(os.getenv("POSTGRES_PORT", 5432))
+}
+
+PAYLOAD_QUERIES = {
+    "/tracks (1000 lignes)": """
+        SELECT tf.track_id, tf.track_title, tf.track_duration, tf.track_genre_top,
+               tf.track_listens, tf.track_file, tf.album_titles, tf.artist_names,
+               tf.audio_features_instrumentalness, tf.audio_features_speechiness,
+               t.track_language_code
+        FROM sae.tracks_features_mat tf
+        LEFT JOIN sae.tracks t ON tf.track_id = t.track_id
+        ORDER BY tf.track_id LIMIT 1000
+    """,
+    "tracks_features (1000 lignes)": "SELECT * FROM sae.tracks_features_mat ORDER BY track_id LIMIT 1000",
+}
+
+
+def clean_nan(obj):
+    # Ancienne version de main.py
+    if isinstance(obj, float) and math.isnan(obj): return None
+    elif isinstance(obj, dict): return {k: clean_nan(v) for k, v in obj.items()}
+    elif isinstance(obj, list): return [clean_nan(v) for v in obj]
+    return obj
+
+
+def old_path(content) -> bytes:
+    return JSONResponse(jsonable_encoder(clean_nan(content))).body
+
+
+def new_path(content) -> bytes:
+    return FastJSONResponse(content).body
+
+
+def synthetic_rows(columns: int):
+    rng = random.Random(0)
+    rows = []
+    for i in range(1000):
+        row = {"track_id": i, "track_title": f"Titre {i}", "track_date_created": date(2008, 1 + i % 12, 1 + i % 28)}
+        for c in range(columns - 3):
+            row[f"feature_{c:02d}"] = float("nan") if rng.random() < 0.1 else rng.random()
+        rows.append(row)
+    return rows
+
+
+def load_payloads(synthetic: bool):
+    if synthetic:
+        return {"11 colonnes (1000 lignes)": synthetic_rows(11), "33 colonnes (1000 lignes)": synthetic_rows(33)}
+    conn = psycopg2.connect(**DB_CONFIG, cursor_factory=RealDictCursor)
+    cur = conn.cursor()
+    payloads = {}
+    for name, query in PAYLOAD_QUERIES.items():
+        cur.execute(query)
+        payloads[name] = cur.fetchall()
+    conn.close()
+    return payloads
+
+
+def measure(func, content, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func(content)
+        timings.append((time.perf_counter() - t) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", action="store_true", help="lignes aléatoires au lieu de la base")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"Encodeur : {'orjson ' + orjson.__version__ if orjson else 'json (orjson non installé)'}")
+    for name, rows in load_payloads(args.synthetic).items():
+        content = {"total": len(rows), "count": len(rows), "next_cursor": None, "results": rows}
+        old_ms = measure(old_path, content, args.repeat)
+        new_ms = measure(new_path, content, args.repeat)
+        print(f"{name} : ancien {old_ms:.2f} ms, nouveau {new_ms:.2f} ms (x{old_ms / new_ms:.1f}), "
+              f"{len(new_path(content)) / 1024:.0f} Ko")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import asyncio
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+from responses import to_jsonable
+
+try:
+    import redis
+except ImportError:  # le cache mémoire reste disponible sans redis
+    redis = None
+
+# =================================================================
+# ===== CACHE DES RÉPONSES DU CATALOGUE =====
+# Les routes de lecture du catalogue (track, album, artiste, genres,
+# playlist) gardent leur réponse en cache, sous une clé construite à partir
+# de la route et de ses paramètres. Chaque entrée porte des tags
+# ("track:12", "album:3"...) : les routes d'écriture invalident les tags
+# des entités qu'elles modifient. Le TTL ne sert que de filet de sécurité
+# pour les écritures faites hors de l'API (scripts de peuplement...).
+# Les valeurs sont stockées déjà encodées en JSON (to_jsonable) :
+# la réponse servie depuis le cache est identique à la réponse d'origine.
+# =================================================================
+
+MISSING = object()
+
+
+def cache_key(route: str, params: dict) -> str:
+    """Clé stable : nom de route + paramètres triés."""
+    args = "&".join(f"{k}={params[k]}" for k in sorted(params))
+    return f"{route}?{args}"
+
+
+class MemoryBackend:
+    """LRU en mémoire du processus, avec TTL et index tag -> clés."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()   # clé -> (valeur, expiration, tags)
+        self._tags: dict = {}                        # tag -> set(clés)
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _drop(self, key) -> None:
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            if entry[1] < time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl: float, tags: Iterable[str]) -> None:
+        tags = frozenset(tags)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, time.monotonic() + ttl, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    if key in self._entries:
+                        self._drop(key)
+                        removed += 1
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    """
+    Cache partagé entre processus (plusieurs workers uvicorn) via Redis ou
+    un serveur compatible. L'éviction est laissée à Redis (maxmemory-policy).
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "muse:cache:"):
+        self._client = redis.Redis.from_url(url)
+        self._client.ping()
+        self._prefix = prefix
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        raw = self._client.get(self._prefix + key)
+        if raw is None:
+            return MISSING
+        return json.loads(raw)
+
+    def set(self, key, value, ttl: float, tags: Iterable[str]) -> None:
+        full_key = self._prefix + key
+        pipe = self._client.pipeline()
+        pipe.set(full_key, json.dumps(value), px=int(ttl * 1000))
+        for tag in tags:
+            tag_key = self._prefix + "tag:" + tag
+            pipe.sadd(tag_key, full_key)
+            pipe.pexpire(tag_key, int(ttl * 1000))
+        pipe.execute()
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        removed = 0
+        for tag in tags:
+            tag_key = self._prefix + "tag:" + tag
+            keys = self._client.smembers(tag_key)
+            if keys:
+                removed += self._client.delete(*keys)
+            self._client.delete(tag_key)
+        return removed
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(self._prefix + "*"):
+            self._client.delete(key)
+
+    def size(self) -> int:
+        return sum(1 for k in self._client.scan_iter(self._prefix + "*") if b":tag:" not in k)
+
+
+class ResponseCache:
+    """
+    Cache lecture-traversante : @response_cache.cached(...) sur une route,
+    response_cache.invalidate("track:12", ...) dans les routes d'écriture.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 2048, url: Optional[str] = None, enabled: bool = True):
+        self.ttl = ttl
+        self.enabled = enabled
+        self.backend = MemoryBackend(max_entries)
+        if url:
+            if redis is None:
+                print("redis non installé : le cache des réponses reste en mémoire.")
+            else:
+                try:
+                    self.backend = RedisBackend(url)
+                except Exception as e:
+                    print(f"Cache Redis indisponible ({e}) : le cache des réponses reste en mémoire.")
+        self._lock = threading.Lock()
+        self._generation = 0    # incrémenté à chaque invalidation
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        if not self.enabled:
+            return MISSING
+        try:
+            value = self.backend.get(key)
+        except Exception:
+            value = MISSING
+        with self._lock:
+            if value is MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value, tags: Iterable[str] = ()) -> None:
+        if not self.enabled:
+            return
+        try:
+            self.backend.set(key, value, self.ttl, tags)
+        except Exception:
+            pass
+
+    def invalidate(self, *tags: str) -> None:
+        """À appeler après le commit d'une écriture sur les entités correspondantes."""
+        with self._lock:
+            self._generation += 1
+        try:
+            removed = self.backend.invalidate(tags)
+        except Exception:
+            return
+        with self._lock:
+            self.invalidations += removed
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def cached(self, route: str, tags: Callable[[dict, object], Iterable[str]]):
+        """
+        Décorateur de route. `tags(params, result)` renvoie les tags de l'entrée.
+        Seules les réponses réussies sont mises en cache (les HTTPException passent).
+        """
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            def lookup(args, kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                params = dict(bound.arguments)
+                key = cache_key(route, params)
+                return params, key, self._generation, self.get(key)
+
+            def store(params, key, generation, result):
+                value = to_jsonable(result)
+                # Une invalidation pendant la lecture en base : la valeur est peut-être
+                # déjà périmée, on la sert sans la garder.
+                if generation == self._generation:
+                    self.set(key, value, tags(params, value))
+                return value
+
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    params, key, generation, value = lookup(args, kwargs)
+                    if value is not MISSING:
+                        return value
+                    return store(params, key, generation, await func(*args, **kwargs))
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                params, key, generation, value = lookup(args, kwargs)
+                if value is not MISSING:
+                    return value
+                return store(params, key, generation, func(*args, **kwargs))
+            return wrapper
+        return decorator
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "enabled": self.enabled,
+            "ttl_seconds": self.ttl,
+            "size": self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.backend.evictions,
+            "expirations": self.backend.expirations,
+            "invalidated_entries": self.invalidations,
+        }
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import re
+import time
+from functools import lru_cache
+from typing import Optional, Sequence
+
+from starlette.concurrency import run_in_threadpool
+
+from db_pool import ConnectionPool, PoolTimeout
+from metrics import timed_db
+
+try:
+    import asyncpg
+except ImportError:  # le mode synchrone reste disponible sans asyncpg
+    asyncpg = None
+
+# =================================================================
+# ===== ACCÈS ASYNCHRONE À LA BASE =====
+# Les routes `async def` passent par Database : avec asyncpg les requêtes
+# sont de vraies coroutines (aucun thread bloqué), sinon elles sont
+# exécutées sur le pool psycopg2 dans le threadpool de Starlette, ce qui
+# ne bloque jamais la boucle d'événements non plus.
+# Les requêtes s'écrivent une seule fois, avec des %s façon psycopg2.
+# =================================================================
+
+_PLACEHOLDER = re.compile(r"%%|%s")
+
+
+@lru_cache(maxsize=512)
+def to_asyncpg_query(query: str) -> str:
+    """Convertit les %s de psycopg2 en $1, $2... attendus par asyncpg (%% devient %)."""
+    counter = 0
+
+    def _replace(match):
+        nonlocal counter
+        if match.group(0) == "%%":
+            return "%"
+        counter += 1
+        return f"${counter}"
+
+    return _PLACEHOLDER.sub(_replace, query)
+
+
+async def _init_connection(conn) -> None:
+    # Même comportement que psycopg2 : json/jsonb décodés en objets Python
+    for typename in ("json", "jsonb"):
+        await conn.set_type_codec(typename, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+
+class Database:
+    """Façade commune aux deux pilotes : fetch_all / fetch_one / execute."""
+
+    def __init__(self, db_config: dict, sync_pool: ConnectionPool, use_async: bool = True,
+                 min_size: int = 2, max_size: int = 20, timeout: float = 5.0, profiler=None):
+        self._db_config = db_config
+        self.profiler = profiler    # QueryProfiler (profiler.py) ; en psycopg2 c'est TimedCursor qui profile
+        self._sync_pool = sync_pool
+        self.use_async = use_async and asyncpg is not None
+        self._min_size = min_size
+        self._max_size = max_size
+        self._timeout = timeout
+        self._pool = None
+        if use_async and asyncpg is None:
+            print("asyncpg non installé : l'accès asynchrone passe par le pool psycopg2.")
+
+    @property
+    def driver(self) -> str:
+        return "asyncpg" if self.use_async else "psycopg2"
+
+    async def open(self) -> None:
+        if not self.use_async or self._pool is not None:
+            return
+        self._pool = await asyncpg.create_pool(
+            host=self._db_config["host"],
+            port=int(self._db_config["port"]),
+            database=self._db_config["dbname"],
+            user=self._db_config["user"],
+            password=self._db_config["password"],
+            min_size=self._min_size,
+            max_size=self._max_size,
+            init=_init_connection,
+        )
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    # ---------- pilote asyncpg ----------
+
+    async def _acquire(self):
+        if self._pool is None:
+            await self.open()
+        try:
+            return await self._pool.acquire(timeout=self._timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(f"Aucune connexion disponible après {self._timeout:.1f}s")
+
+    async def _async_run(self, method: str, query: str, params: Sequence):
+        conn = await self._acquire()
+        try:
+            sql = to_asyncpg_query(query)
+            start = time.perf_counter()
+            # Temps base de la requête HTTP (hors attente du pool) ; en psycopg2 c'est TimedCursor qui mesure
+            with timed_db():
+                result = await getattr(conn, method)(sql, *params)
+            profiler = self.profiler
+            if profiler is not None and profiler.enabled:
+                seconds = time.perf_counter() - start
+                explain = profiler.observe(query, params, seconds)
+                if explain:
+                    await profiler.explain_asyncpg(conn, explain, query, sql, params, seconds)
+            return result
+        finally:
+            await self._pool.release(conn)
+
+    # ---------- pilote psycopg2 (repli) ----------
+
+    def _sync_run(self, query: str, params: Sequence, mode: str):
+        with self._sync_pool.connection() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(query, tuple(params))
+                if mode == "all":
+                    return cur.fetchall()
+                if mode == "one":
+                    return cur.fetchone()
+                conn.commit()
+                return cur.rowcount
+            finally:
+                cur.close()
+
+    # ---------- API publique ----------
+
+    async def fetch_all(self, query: str, params: Sequence = ()) -> list:
+        if self.use_async:
+            rows = await self._async_run("fetch", query, params)
+            return [dict(r) for r in rows]
+        return await run_in_threadpool(self._sync_run, query, params, "all")
+
+    async def fetch_one(self, query: str, params: Sequence = ()) -> Optional[dict]:
+        if self.use_async:
+            row = await self._async_run("fetchrow", query, params)
+            return dict(row) if row is not None else None
+        return await run_in_threadpool(self._sync_run, query, params, "one")
+
+    async def execute(self, query: str, params: Sequence = ()) -> int:
+        """Exécute une écriture validée immédiatement ; renvoie le nombre de lignes touchées."""
+        if self.use_async:
+            status = await self._async_run("execute", query, params)
+            last = status.rsplit(" ", 1)[-1]
+            return int(last) if last.isdigit() else 0
+        return await run_in_threadpool(self._sync_run, query, params, "execute")
+
+    def stats(self) -> dict:
+        if not self.use_async:
+            return {"driver": self.driver}
+        pool = self._pool
+        if pool is None:
+            return {"driver": self.driver, "size": 0}
+        return {
+            "driver": self.driver,
+            "min_size": pool.get_min_size(),
+            "max_size": pool.get_max_size(),
+            "size": pool.get_size(),
+            "idle": pool.get_idle_size(),
+            "in_use": pool.get_size() - pool.get_idle_size(),
+        }
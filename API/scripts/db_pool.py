@@ -0,0 +1,313 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.extras import RealDictCursor
+
+# =================================================================
+# ===== POOL DE CONNEXIONS POSTGRES =====
+# Remplace le psycopg2.connect() fait à chaque requête : les connexions
+# sont ouvertes une fois, vérifiées à la sortie du pool et rendues à la
+# fin de chaque requête (y compris quand une route oublie conn.close()).
+# =================================================================
+
+class PoolTimeout(Exception):
+    """Aucune connexion n'a été libérée avant la fin du délai d'attente."""
+
+
+class PooledConnection:
+    """
+    Connexion prêtée par le pool. Délègue tout à la connexion psycopg2 sous-jacente ;
+    close() la rend au pool une seule fois, les appels suivants ne font rien.
+    """
+
+    __slots__ = ("_conn", "_pool")
+
+    def __init__(self, conn, pool):
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_pool", pool)
+
+    def __getattr__(self, name):
+        conn = self._conn
+        if conn is None:
+            raise psycopg2.InterfaceError("connection already returned to the pool")
+        return getattr(conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    @property
+    def closed(self):
+        conn = self._conn
+        return 1 if conn is None else conn.closed
+
+    @property
+    def is_returned(self) -> bool:
+        """Vrai une fois rendue au pool (closed est aussi vrai pour une connexion cassée non rendue)."""
+        return self._conn is None
+
+    def close(self):
+        conn = self._conn
+        if conn is None:
+            return
+        object.__setattr__(self, "_conn", None)
+        self._pool._putconn(conn)
+
+
+# Connexions empruntées pendant la requête HTTP courante (voir track_request)
+_request_connections: ContextVar[Optional[list]] = ContextVar("_request_connections", default=None)
+
+
+class ConnectionPool:
+    """
+    Pool thread-safe de connexions psycopg2.
+    - min_size connexions ouvertes au démarrage, max_size au plus
+    - getconn() attend au plus `timeout` secondes une connexion libre
+    - une connexion restée inactive plus de `check_interval` secondes est testée
+      (SELECT 1) avant d'être rendue, et remplacée si elle est cassée
+    """
+
+    def __init__(self, db_config: dict, min_size: int = 1, max_size: int = 10,
+                 timeout: float = 5.0, check_interval: float = 30.0,
+                 cursor_factory=RealDictCursor):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Configuration du pool invalide (0 <= min_size <= max_size, max_size >= 1)")
+        self._db_config = dict(db_config)
+        self._cursor_factory = cursor_factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_interval = check_interval
+
+        self._cond = threading.Condition()
+        self._idle: deque = deque()     # (conn, instant du dernier retour)
+        self._in_use: set = set()
+        self._size = 0                  # connexions ouvertes ou en cours d'ouverture
+        self._waiting = 0
+        self._closed = False
+
+        # Statistiques
+        self._acquired = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._created = 0
+        self._discarded = 0
+        self._failed_checks = 0
+        self._reclaimed = 0
+
+    # ---------- ouverture / fermeture ----------
+
+    def _connect(self):
+        conn = psycopg2.connect(**self._db_config, cursor_factory=self._cursor_factory)
+        with self._cond:
+            self._created += 1
+        return conn
+
+    def open(self) -> None:
+        """Ouvre les min_size connexions initiales (appelé au démarrage de l'API)."""
+        with self._cond:
+            self._closed = False
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def close(self) -> None:
+        """Ferme toutes les connexions inactives ; celles en cours d'usage seront fermées à leur retour."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn, count=False)
+
+    # ---------- emprunt ----------
+
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.check_interval:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self, timeout: Optional[float] = None, track: bool = True):
+        """
+        Emprunte une connexion. Lève PoolTimeout si aucune ne se libère à temps.
+        Avec track=True la connexion est rattachée à la requête HTTP courante et
+        sera rendue automatiquement à la fin de celle-ci.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        conn = None
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout("Le pool de connexions est fermé")
+                if self._idle:
+                    # LIFO : on réutilise la connexion la plus chaude
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    last_used = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"Aucune connexion disponible après {timeout:.1f}s")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        try:
+            if conn is not None and not self._is_healthy(conn, last_used):
+                with self._cond:
+                    self._failed_checks += 1
+                self._discard(conn, count=True)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self._in_use.add(conn)
+            self._acquired += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        pooled = PooledConnection(conn, self)
+        if track:
+            borrowed = _request_connections.get()
+            if borrowed is not None:
+                borrowed.append(pooled)
+        return pooled
+
+    # ---------- restitution ----------
+
+    def _discard(self, conn, count: bool = True) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        if count:
+            with self._cond:
+                self._discarded += 1
+
+    def putconn(self, pooled) -> None:
+        """Rend une connexion empruntée (équivalent à pooled.close())."""
+        pooled.close()
+
+    def _putconn(self, conn) -> None:
+        """Remet la connexion brute en file après avoir annulé toute transaction restée ouverte."""
+        with self._cond:
+            if conn not in self._in_use:
+                return
+            self._in_use.discard(conn)
+
+        reusable = not conn.closed
+        if reusable:
+            try:
+                status = conn.info.transaction_status
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    reusable = False
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                if reusable and conn.autocommit:
+                    conn.autocommit = False
+            except Exception:
+                reusable = False
+
+        with self._cond:
+            closing = self._closed
+            if not reusable or closing:
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+        if not reusable or closing:
+            self._discard(conn, count=not closing)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """with pool.connection() as conn: ... — la connexion est toujours rendue."""
+        conn = self.getconn(timeout=timeout, track=False)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    # ---------- suivi par requête ----------
+
+    def track_request(self):
+        """Démarre le suivi des connexions empruntées par la requête courante."""
+        return _request_connections.set([])
+
+    def release_request(self, token) -> None:
+        """Rend au pool les connexions que la requête n'a pas rendues elle-même."""
+        borrowed = _request_connections.get() or []
+        _request_connections.reset(token)
+        for pooled in borrowed:
+            # Pas `closed` : une connexion coupée (redémarrage de la base) doit
+            # aussi passer par _putconn, qui l'écarte et libère sa place
+            if not pooled.is_returned:
+                with self._cond:
+                    self._reclaimed += 1
+                pooled.close()
+
+    # ---------- statistiques ----------
+
+    def stats(self) -> dict:
+        with self._cond:
+            acquired = self._acquired
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "acquired_total": acquired,
+                "timeouts_total": self._timeouts,
+                "wait_time_total_ms": round(self._wait_total * 1000, 3),
+                "wait_time_avg_ms": round(self._wait_total * 1000 / acquired, 3) if acquired else 0.0,
+                "wait_time_max_ms": round(self._wait_max * 1000, 3),
+                "connections_created": self._created,
+                "connections_discarded": self._discarded,
+                "health_checks_failed": self._failed_checks,
+                "connections_reclaimed": self._reclaimed,
+            }
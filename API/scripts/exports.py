@@ -0,0 +1,123 @@
+import csv
+import io
+import threading
+import uuid
+from typing import Callable, Iterator, Literal, Optional
+
+from metrics import TimedTupleCursor
+from responses import dumps
+
+# =================================================================
+# ===== EXPORTS DU CATALOGUE =====
+# Exports complets en NDJSON ou CSV sans charger le catalogue en mémoire :
+# un curseur nommé (côté serveur) lit la table par paquets de `chunk_rows`
+# lignes, chaque paquet est encodé puis envoyé avant de lire le suivant.
+# Le générateur est consommé par StreamingResponse au rythme de l'envoi
+# au client : un client lent ralentit la lecture en base (contre-pression).
+# =================================================================
+
+ExportDataset = Literal["tracks", "albums", "artists", "audio"]
+ExportFormat = Literal["ndjson", "csv"]
+
+# Colonnes publiques uniquement (pas de artist_password ni d'embedding), triées par clé
+EXPORT_QUERIES = {
+    "tracks": "SELECT * FROM sae.tracks_features_mat ORDER BY track_id",
+    "albums": "SELECT * FROM sae.album_features_mat ORDER BY album_id",
+    "artists": "SELECT * FROM sae.artist_features_mat ORDER BY artist_id",
+    "audio": "SELECT * FROM sae.audio ORDER BY track_id",
+}
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _encode_ndjson(columns, rows) -> bytes:
+    # Même encodeur que les réponses JSON de l'API (NaN -> null, dates ISO)
+    return b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+
+def _encode_csv(writer, buffer, rows) -> bytes:
+    writer.writerows([["" if v is None or v != v else v for v in row] for row in rows])   # v != v : NaN
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data.encode("utf-8")
+
+
+def stream_export(conn, dataset: str, fmt: str, chunk_rows: int = 2000,
+                  claim: Optional[Callable[[], bool]] = None) -> Iterator[bytes]:
+    """
+    Générateur d'octets de l'export ; ferme `conn` à la fin. La connexion ne
+    doit pas être rattachée à la requête (db_pool.getconn(track=False)) : la
+    réponse est encore envoyée après la fin du handler. `claim()` (voir
+    ExportStream) est appelé au démarrage : s'il renvoie False, la connexion
+    a déjà été rendue et n'est pas touchée.
+    """
+    if claim is not None and not claim():
+        return
+    cur = None
+    try:
+        # Curseur nommé sans RealDictCursor : tuples + noms de colonnes, moins d'objets par ligne
+        cur = conn.cursor(name=f"export_{dataset}_{uuid.uuid4().hex[:8]}", cursor_factory=TimedTupleCursor)
+        cur.itersize = chunk_rows
+        cur.execute(EXPORT_QUERIES[dataset])
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        rows = cur.fetchmany(chunk_rows)
+        columns = [col.name for col in cur.description]
+        if fmt == "csv":
+            writer.writerow(columns)
+        while True:
+            if fmt == "csv":
+                data = _encode_csv(writer, buffer, rows)
+            else:
+                data = _encode_ndjson(columns, rows)
+            if data:
+                yield data
+            if len(rows) < chunk_rows:
+                break
+            rows = cur.fetchmany(chunk_rows)
+    finally:
+        # Aussi exécuté si le client coupe la connexion (fermeture du générateur)
+        try:
+            if cur is not None:
+                cur.close()
+            conn.rollback()
+        finally:
+            conn.close()
+
+
+class ExportStream:
+    """
+    Contenu de la StreamingResponse d'un export, seul propriétaire de `conn` :
+    - dès que le générateur démarre, c'est lui qui rend la connexion (son
+      finally, y compris quand le client coupe et que le générateur n'est
+      finalisé que plus tard)
+    - release(), tâche de fond de la réponse, ne la rend que si l'envoi n'a
+      jamais commencé (client parti avant le premier paquet)
+    Le premier des deux à réclamer la connexion la garde : une connexion
+    rendue au pool, peut-être déjà prêtée à une autre requête, n'est plus
+    utilisée par l'export.
+    """
+
+    def __init__(self, conn, dataset: str, fmt: str, chunk_rows: int = 2000):
+        self._conn = conn
+        self._args = (dataset, fmt, chunk_rows)
+        self._lock = threading.Lock()
+        self._owner: Optional[str] = None
+
+    def _claim(self, owner: str) -> bool:
+        with self._lock:
+            if self._owner is None:
+                self._owner = owner
+            return self._owner == owner
+
+    def __iter__(self) -> Iterator[bytes]:
+        return stream_export(self._conn, *self._args, claim=lambda: self._claim("stream"))
+
+    def release(self) -> None:
+        if self._claim("response"):
+            self._conn.close()
@@ -1,71 +1,67 @@
-from fastapi import FastAPI, HTTPException, Query, Request, UploadFile, File
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Query, Request, Response, UploadFile, File
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from typing import Optional, List
+from typing import Literal, Optional, List
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 import os
 import shutil
 import uuid
 import sys
-import math
 import bcrypt
 import random
+import re
+from datetime import date, datetime
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'Recommendation'))
 
-from item_based_pierre import recommend_similar_tracks
-from item_based_stanislas import recommend_artists, initialize_artist_system
+from item_based_pierre import recommend_similar_tracks, load_data_into_cache, ensure_neighbours
+from item_based_pierre import artifact_status as tracks_artifact_status
+from item_based_stanislas import recommend_artists, initialize_artist_system, model_loaded
+from item_based_alexis import recommend_audio, EF_SEARCH_DEFAULT
+from hybrid import recommend_hybrid, current_weights
+from item_based_stanislas import artifact_status as artists_artifact_status, rebuild_artifact as rebuild_artists_artifact
+from embedding_worker import EmbeddingWorker
+from db_pool import ConnectionPool, PoolTimeout
+from db_async import Database
+from pagination import Keyset, KeyColumn, InvalidCursor
+from totals import Totals, TotalMode, row_counter
+from cache import ResponseCache
+from autocomplete import Autocomplete, AutocompleteKind
+from responses import FastJSONResponse, FastJSONRoute
+from metrics import Histogram, HttpMetrics, MetricsMiddleware, Registry, TimedCursor, TimedTupleCursor
+from profiler import QueryProfiler, SlowQueryOrder
+from warmup import Warmup
+from migrate import pending_migrations
+from exports import ExportDataset, ExportFormat, ExportStream, MEDIA_TYPES
 
 load_dotenv()
 from fastapi.middleware.cors import CORSMiddleware
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    initialize_artist_system()
     try:
-        conn = get_db_connection()
-        if conn:
-            cur = conn.cursor()
-            cur.execute("ALTER TABLE sae.playlist_track ADD COLUMN IF NOT EXISTS position INT DEFAULT 0;")
-            cur.execute("""
-                WITH numbered AS (
-                    SELECT ctid, ROW_NUMBER() OVER (PARTITION BY playlist_id ORDER BY track_id) - 1 AS pos
-                    FROM sae.playlist_track
-                    WHERE position = 0
-                )
-                UPDATE sae.playlist_track SET position = numbered.pos
-                FROM numbered WHERE sae.playlist_track.ctid = numbered.ctid AND sae.playlist_track.position = 0;
-            """)
-            cur.execute("ALTER TABLE sae.playlist ADD COLUMN IF NOT EXISTS playlist_image TEXT;")
-            conn.commit()
-            cur.close()
-            conn.close()
-            
-            conn = get_db_connection()
-            cur = conn.cursor()
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS sae.user_reaction (
-                    user_id INT REFERENCES sae.users(user_id),
-                    target_type VARCHAR(20) NOT NULL,
-                    target_id INT NOT NULL,
-                    liked BOOLEAN DEFAULT FALSE,
-                    disliked BOOLEAN DEFAULT FALSE,
-                    favorite BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    updated_at TIMESTAMP DEFAULT NOW(),
-                    PRIMARY KEY (user_id, target_type, target_id)
-                );
-            """)
-            conn.commit()
-            cur.close()
-            conn.close()
+        db_pool.open()
     except Exception as e:
-        print(f"Migration warning: {e}")
+        print(f"Pool warning: {e}")
+    try:
+        await db.open()
+    except Exception as e:
+        print(f"Async pool warning: {e}")
+    autocomplete.start()
+    # Vérification du schéma et moteurs de recommandation en arrière-plan : l'API répond tout de suite
+    warmup.start()
+    embedding_worker.start()
     yield
+    embedding_worker.stop()
+    warmup.stop()
+    autocomplete.stop()
+    await db.close()
+    db_pool.close()
 
 tags_metadata = [
     {"name": "Général",          "description": "Endpoint racine de l'API."},
@@ -77,6 +73,7 @@ tags_metadata = [
     {"name": "Playlists",        "description": "Création, consultation, modification et suppression de playlists utilisateur."},
     {"name": "Utilisateurs",     "description": "Consultation et gestion du profil utilisateur (playlists, mise à jour, suppression)."},
     {"name": "Recherche",        "description": "Recherche textuelle de musiques par titre, artiste ou album."},
+    {"name": "Export",           "description": "Exports complets du catalogue (musiques, albums, artistes, audio features) en NDJSON ou CSV, envoyés au fil de la lecture."},
     {"name": "Favoris",          "description": "Consultation et enregistrement des favoris (tracks, artistes, genres) d'un utilisateur."},
     {"name": "Blindtests",       "description": "Génération de sessions de jeu et historique de l'utilisateur."},
     {"name": "Admin",            "description": "⚙️ Endpoints d'administration — statistiques globales, gestion des utilisateurs, modération du contenu."},
@@ -89,7 +86,10 @@ app = FastAPI(
     lifespan=lifespan,
     openapi_tags=tags_metadata,
     docs_url=None,
+    default_response_class=FastJSONResponse,
 )
+# Réponses encodées en un passage par orjson, sans jsonable_encoder (voir responses.py)
+app.router.route_class = FastJSONRoute
 
 web_dir = os.path.join(os.path.dirname(__file__), '..', 'web')
 app.mount("/static", StaticFiles(directory=web_dir), name="static")
@@ -147,19 +147,159 @@ DB_CONFIG = {
     "port": int(os.getenv("POSTGRES_PORT", 5432))
 }
 
-def clean_nan(obj):
-    if isinstance(obj, float) and math.isnan(obj): return None
-    elif isinstance(obj, dict): return {k: clean_nan(v) for k, v in obj.items()}
-    elif isinstance(obj, list): return [clean_nan(v) for v in obj]
-    return obj
+# Profilage des requêtes SQL (QUERY_PROFILER=1) : requêtes lentes, plans EXPLAIN, /admin/slow-queries
+query_profiler = QueryProfiler(
+    enabled=os.getenv("QUERY_PROFILER", "0").lower() in ("1", "true", "yes"),
+    threshold_ms=float(os.getenv("SLOW_QUERY_MS", 200)),
+    explain_rate=float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", 0.1)),
+)
+TimedCursor.profiler = TimedTupleCursor.profiler = query_profiler
+
+db_pool = ConnectionPool(
+    DB_CONFIG,
+    min_size=int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+    max_size=int(os.getenv("DB_POOL_MAX_SIZE", 20)),
+    timeout=float(os.getenv("DB_POOL_TIMEOUT", 5)),
+    check_interval=float(os.getenv("DB_POOL_CHECK_INTERVAL", 30)),
+    # RealDictCursor qui compte le temps passé en base dans les métriques de la requête
+    cursor_factory=TimedCursor,
+)
+
+# Routes async : asyncpg si DB_ASYNC=1 (défaut), sinon le pool ci-dessus dans le threadpool.
+# Pool asyncpg séparé, plus petit : une connexion n'y est tenue que le temps
+# d'une requête SQL (aucun thread en attente), et ses connexions s'ajoutent à
+# celles de db_pool pour chaque worker (voir le README)
+db = Database(
+    DB_CONFIG,
+    db_pool,
+    use_async=os.getenv("DB_ASYNC", "1").lower() in ("1", "true", "yes"),
+    min_size=int(os.getenv("DB_ASYNC_POOL_MIN_SIZE", 1)),
+    max_size=int(os.getenv("DB_ASYNC_POOL_MAX_SIZE", 5)),
+    timeout=float(os.getenv("DB_POOL_TIMEOUT", 5)),
+    profiler=query_profiler,
+)
+
+# Totaux des listes paginées (?total=exact|estimate|none)
+totals = Totals(ttl=float(os.getenv("TOTALS_CACHE_TTL", 30)))
+
+# Cache des réponses du catalogue, invalidé par tags dans les routes d'écriture
+response_cache = ResponseCache(
+    ttl=float(os.getenv("CACHE_TTL", 300)),
+    max_entries=int(os.getenv("CACHE_MAX_ENTRIES", 2048)),
+    url=os.getenv("CACHE_URL"),
+    enabled=os.getenv("CACHE_ENABLED", "1").lower() in ("1", "true", "yes"),
+)
+
+# Autocomplétion en mémoire, construite au démarrage (thread) puis tenue à jour par LISTEN sae_catalog
+autocomplete = Autocomplete(
+    connect=lambda: db_pool.getconn(track=False),
+    listen_connect=lambda: psycopg2.connect(**DB_CONFIG),
+    max_entries=int(os.getenv("AUTOCOMPLETE_MAX_ENTRIES", 250000)),
+    listen=os.getenv("AUTOCOMPLETE_LISTEN", "1").lower() in ("1", "true", "yes"),
+)
+
+# Préchauffage des moteurs de recommandation (voir warmup.py), suivi par /ready
+warmup = Warmup(retry_delay=float(os.getenv("WARMUP_RETRY_SECONDS", 30)))
+
+def check_schema(progress):
+    # Le schéma est modifié par API/scripts/migrate.py (setup_db.py), jamais au démarrage de l'API
+    conn = db_pool.getconn(track=False)
+    try:
+        pending = pending_migrations(conn)
+        conn.rollback()
+    finally:
+        conn.close()
+    if pending:
+        raise RuntimeError(
+            f"{len(pending)} migration(s) en attente ({', '.join(f'{m.version:04d}' for m in pending)}), "
+            "lancez python API/scripts/migrate.py"
+        )
+
+warmup.add("schema", check_schema)
+warmup.add("artists", initialize_artist_system)
+warmup.add("tracks", load_data_into_cache)
+# Voisins précalculés : /reco/tracks fait un calcul complet tant qu'ils ne sont pas à jour
+warmup.add("neighbours", lambda progress: ensure_neighbours(progress=progress))
+
+# Réencodage périodique des artistes dont le texte a changé (RECO_EMBEDDING_REFRESH_SECONDS, 0 = jamais)
+embedding_worker = EmbeddingWorker()
+
+def require_warm(task: str):
+    """503 tant que le préchauffage `task` n'est pas terminé."""
+    if not warmup.ready(task):
+        raise HTTPException(
+            status_code=503,
+            detail=f"Recommandations en cours de préparation ({task}), réessayez dans quelques secondes",
+            headers={"Retry-After": "5"},
+        )
+
+def id_tags(kind: str, ids) -> list:
+    # "3,12" ou [3, 12] -> ["album:3", "album:12"]
+    if isinstance(ids, str):
+        ids = [i for i in ids.split(",") if i.strip()]
+    return [f"{kind}:{int(i)}" for i in ids or []]
 
 def get_db_connection():
+    # conn.close() rend la connexion au pool ; les oublis sont rattrapés par release_db_connections
     try:
-        conn = psycopg2.connect(**DB_CONFIG, cursor_factory=RealDictCursor)
-        return conn
+        return db_pool.getconn()
+    except PoolTimeout:
+        raise HTTPException(status_code=503, detail="Base de données saturée, réessayez plus tard")
     except Exception as e:
         return None
 
+def keyset_filter(keyset: Keyset, cursor: Optional[str]):
+    # Condition SQL de reprise après le curseur (ou aucune pour la première page)
+    if not cursor:
+        return "", []
+    try:
+        condition, params = keyset.where(cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return condition, params
+
+CURSOR_QUERY = Query(None, description="Curseur opaque de la page suivante (next_cursor) ; remplace offset")
+TOTAL_QUERY = Query("exact", description="Calcul du total : exact, estimate (estimation rapide) ou none")
+
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    return JSONResponse(status_code=503, content={"detail": "Base de données saturée, réessayez plus tard"})
+
+@app.middleware("http")
+async def release_db_connections(request: Request, call_next):
+    token = db_pool.track_request()
+    try:
+        return await call_next(request)
+    finally:
+        db_pool.release_request(token)
+
+# Métriques Prometheus (/metrics) ; ajouté en dernier = middleware le plus externe, mesure tout
+metrics_registry = Registry()
+app.add_middleware(MetricsMiddleware, metrics=HttpMetrics(metrics_registry))
+hybrid_stage_seconds = metrics_registry.register(Histogram(
+    "muse_reco_hybrid_stage_seconds", "Durée des étapes du moteur hybride (/reco/tracks/hybrid).", ("stage",)))
+
+def collect_runtime_metrics():
+    pool = db_pool.stats()
+    yield ("muse_db_pool_connections", "gauge", "Connexions du pool psycopg2 par état.",
+           [({"state": "in_use"}, pool["in_use"]), ({"state": "idle"}, pool["idle"])])
+    yield ("muse_db_pool_waiting", "gauge", "Requêtes en attente d'une connexion psycopg2.", [({}, pool["waiting"])])
+    yield ("muse_db_pool_timeouts_total", "counter", "Attentes de connexion psycopg2 expirées (réponses 503).", [({}, pool["timeouts_total"])])
+    async_pool = db.stats()
+    if "in_use" in async_pool:
+        yield ("muse_db_async_pool_connections", "gauge", "Connexions du pool asyncpg par état.",
+               [({"state": "in_use"}, async_pool["in_use"]), ({"state": "idle"}, async_pool["idle"])])
+    cache = response_cache.stats()
+    yield ("muse_response_cache_lookups_total", "counter", "Lectures du cache des réponses.",
+           [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])])
+    yield ("muse_response_cache_entries", "gauge", "Réponses en cache.", [({}, cache["size"])])
+
+metrics_registry.add_collector(collect_runtime_metrics)
+
+@app.get("/metrics", tags=["Admin"], summary="Métriques Prometheus de l'API", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # =================================================================
 # ===== GENERAL & TRACKS =====
 # =================================================================
@@ -168,100 +308,153 @@ def get_db_connection():
 def read_root():
     return {"message": "Bienvenue sur l'API de Muse!"}
 
+@app.get("/ready", tags=["Général"], summary="État de préparation de l'API")
+def readiness():
+    # 200 quand tout est prêt, 503 sinon (sonde de disponibilité) ; l'API sert déjà les autres routes
+    components = warmup.report()
+    components["autocomplete"] = {"state": "ready" if autocomplete.ready else "running"}
+    ready = warmup.ready() and autocomplete.ready
+    return FastJSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "components": components,
+            "artist_model_loaded": model_loaded(),
+        },
+    )
+
+MAX_TRACK_IDS = 200
+
+# Fiche complète d'une musique en une seule requête : ligne de tracks_features_mat,
+# genres, premier album et premier artiste (même choix que l'ancien split(',')[0]).
+TRACK_DETAIL_QUERY = """
+    SELECT tf.*,
+           ARRAY(
+               SELECT g.genre_title FROM sae.track_genre tg
+               JOIN sae.genre g ON tg.genre_id = g.genre_id
+               WHERE tg.track_id = tf.track_id
+           ) AS genres,
+           (SELECT row_to_json(a) FROM (
+               SELECT album_id, album_title, album_type, album_tracks, album_image_file, album_date_released
+               FROM sae.album WHERE album_id = NULLIF(split_part(tf.album_ids, ',', 1), '')::int
+           ) a) AS album_info,
+           (SELECT row_to_json(ar) FROM (
+               SELECT artist_id, artist_name, artist_bio, artist_location, artist_favorites, artist_website
+               FROM sae.artist WHERE artist_id = NULLIF(split_part(tf.artist_ids, ',', 1), '')::int
+           ) ar) AS artist_info
+    FROM sae.tracks_features_mat tf
+    WHERE tf.track_id = ANY(%s)
+"""
+
+async def fetch_track_details(track_ids: List[int]) -> dict:
+    rows = await db.fetch_all(TRACK_DETAIL_QUERY, (list(track_ids),))
+    details = {}
+    for track in rows:
+        # Même forme qu'avant : pas de clé album_info / artist_info sans album / artiste
+        if not track['album_ids']:
+            track.pop('album_info')
+        if not track['artist_ids']:
+            track.pop('artist_info')
+        details[track['track_id']] = track
+    return details
+
+TRACKS_KEYSET = Keyset([KeyColumn("tf.track_listens", "track_listens", -1), KeyColumn("tf.track_id", "track_id")])
+
 @app.get("/tracks", tags=["Tracks"], summary="Liste de toutes les musiques")
-def get_all_tracks(limit: Optional[int] = Query(50, ge=1, le=100000), offset: Optional[int] = Query(0, ge=0)):
-    conn = get_db_connection()
-    if not conn: raise HTTPException(status_code=500, detail="DB Error")
+async def get_all_tracks(
+    limit: Optional[int] = Query(50, ge=1, le=1000),
+    offset: Optional[int] = Query(0, ge=0),
+    cursor: Optional[str] = CURSOR_QUERY,
+    total: TotalMode = TOTAL_QUERY,
+    ids: Optional[List[int]] = Query(None, description=f"Détails complets de ces musiques (au plus {MAX_TRACK_IDS}) au lieu de la liste paginée")
+):
+    if ids:
+        if len(ids) > MAX_TRACK_IDS:
+            raise HTTPException(status_code=400, detail=f"Au plus {MAX_TRACK_IDS} identifiants par requête")
+        try:
+            details = await fetch_track_details(ids)
+        except PoolTimeout:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        # Ordre de la requête conservé, identifiants inconnus ignorés
+        ordered_ids = list(dict.fromkeys(ids))
+        results = [details[i] for i in ordered_ids if i in details]
+        return {"count": len(results), "missing": [i for i in ordered_ids if i not in details], "results": results}
+
+    condition, params = keyset_filter(TRACKS_KEYSET, cursor)
     try:
-        cur = conn.cursor()
-        query = """
+        query = f"""
             SELECT tf.track_id, tf.track_title, tf.track_duration, tf.track_genre_top,
                    tf.track_listens, tf.track_file, tf.album_titles, tf.artist_names,
                    tf.audio_features_instrumentalness, tf.audio_features_speechiness,
                    t.track_language_code
-            FROM sae.tracks_features tf
+            FROM sae.tracks_features_mat tf
             LEFT JOIN sae.tracks t ON tf.track_id = t.track_id
-            ORDER BY tf.track_listens DESC LIMIT %s OFFSET %s
+            {"WHERE " + condition if condition else ""}
+            ORDER BY {TRACKS_KEYSET.order_by()} LIMIT %s OFFSET %s
         """
-        cur.execute(query, (limit, offset))
-        tracks = cur.fetchall()
+        tracks = await db.fetch_all(query, (*params, limit, 0 if cursor else offset))
+        count = await totals.acount(db, total, "sae.tracks", exact=row_counter("tracks"))
         
-        cur.execute("SELECT COUNT(*) as total FROM sae.tracks")
-        total = cur.fetchone()['total']
-        cur.close(); conn.close()
-        
-        return {"total": total, "count": len(tracks), "limit": limit, "offset": offset, "results": tracks}
+        return {"total": count, "count": len(tracks), "limit": limit, "offset": offset, "next_cursor": TRACKS_KEYSET.next_cursor(tracks, limit), "results": tracks}
+    except PoolTimeout:
+        raise
     except Exception as e:
-        if conn: conn.close()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/tracks/{track_id}", tags=["Tracks"], summary="Détails complets d'une musique")
-def get_track_by_id(track_id: int):
-    conn = get_db_connection()
-    if not conn: raise HTTPException(status_code=500, detail="DB error")
+@response_cache.cached("tracks.detail", lambda p, r: [f"track:{p['track_id']}", *id_tags("album", r.get("album_ids")), *id_tags("artist", r.get("artist_ids"))])
+async def get_track_by_id(track_id: int):
     try:
-        cur = conn.cursor()
-        query = "SELECT * FROM sae.tracks_features WHERE track_id = %s"
-        cur.execute(query, (track_id,))
-        track = cur.fetchone()
+        track = (await fetch_track_details([track_id])).get(track_id)
         if not track:
-            cur.close(); conn.close()
             raise HTTPException(status_code=404, detail="Musique non trouvée")
-        
-        cur.execute("SELECT g.genre_title FROM sae.track_genre tg JOIN sae.genre g ON tg.genre_id = g.genre_id WHERE tg.track_id = %s", (track_id,))
-        track['genres'] = [g['genre_title'] for g in cur.fetchall()]
-        
-        if track['album_ids']:
-            album_id = track['album_ids'].split(',')[0]
-            cur.execute("SELECT album_id, album_title, album_type, album_tracks, album_image_file, album_date_released FROM sae.album WHERE album_id = %s", (int(album_id),))
-            track['album_info'] = cur.fetchone()
-        
-        if track['artist_ids']:
-            artist_id = track['artist_ids'].split(',')[0]
-            cur.execute("SELECT artist_id, artist_name, artist_bio, artist_location, artist_favorites, artist_website FROM sae.artist WHERE artist_id = %s", (int(artist_id),))
-            track['artist_info'] = cur.fetchone()
-        
-        cur.close(); conn.close()
-        return clean_nan(track)
-    except HTTPException: raise
+        return track
+    except (HTTPException, PoolTimeout): raise
     except Exception as e:
-        if conn: conn.close()
         raise HTTPException(status_code=500, detail=str(e))
 
 # =================================================================
 # ===== ARTISTS & ALBUMS =====
 # =================================================================
 
+ARTISTS_KEYSET = Keyset([KeyColumn("artist_favorites", "artist_favorites", -1), KeyColumn("artist_id", "artist_id")])
+
 @app.get("/artists", tags=["Artistes"], summary="Liste de tous les artistes")
 def get_artists(
-    limit: Optional[int] = Query(50, ge=1, le=100000, description="Nombre maximum de résultats"),
-    offset: Optional[int] = Query(0, ge=0, description="Décalage pour la pagination")
+    limit: Optional[int] = Query(50, ge=1, le=1000, description="Nombre maximum de résultats"),
+    offset: Optional[int] = Query(0, ge=0, description="Décalage pour la pagination"),
+    cursor: Optional[str] = CURSOR_QUERY,
+    total: TotalMode = TOTAL_QUERY
 ):
+    condition, params = keyset_filter(ARTISTS_KEYSET, cursor)
     conn = get_db_connection()
     if not conn:
         raise HTTPException(status_code=500, detail="Impossible de se connecter à la base de données")
     
     try:
         cur = conn.cursor()
-        query = """
+        query = f"""
             SELECT artist_id, artist_name, artist_location, artist_favorites,
                    artist_active_year_begin, artist_active_year_end, artist_tags, artist_image_file
-            FROM sae.artist ORDER BY artist_favorites DESC LIMIT %s OFFSET %s
+            FROM sae.artist {"WHERE " + condition if condition else ""}
+            ORDER BY {ARTISTS_KEYSET.order_by()} LIMIT %s OFFSET %s
         """
-        cur.execute(query, (limit, offset))
+        cur.execute(query, (*params, limit, 0 if cursor else offset))
         artists = cur.fetchall()
         
-        cur.execute("SELECT COUNT(*) as total FROM sae.artist")
-        total = cur.fetchone()['total']
+        count = totals.count(cur, total, "sae.artist", exact=row_counter("artist"))
         cur.close()
         conn.close()
         
-        return {"total": total, "count": len(artists), "limit": limit, "offset": offset, "results": artists}
+        return {"total": count, "count": len(artists), "limit": limit, "offset": offset, "next_cursor": ARTISTS_KEYSET.next_cursor(artists, limit), "results": artists}
     except Exception as e:
         if conn: conn.close()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/artists/{artist_id}", tags=["Artistes"], summary="Détails complets d'un artiste")
+@response_cache.cached("artists.detail", lambda p, r: [f"artist:{p['artist_id']}"])
 def get_artist_by_id(artist_id: int):
     conn = get_db_connection()
     if not conn:
@@ -290,12 +483,21 @@ def get_artist_by_id(artist_id: int):
         if conn: conn.close()
         raise HTTPException(status_code=500, detail=str(e))
 
+ARTIST_TRACKS_KEYSET = Keyset([
+    KeyColumn("t.track_listens", "track_listens", -1),
+    KeyColumn("t.track_id", "track_id"),
+    KeyColumn("aat.album_id", "album_id"),
+])
+
 @app.get("/artists/{artist_id}/tracks", tags=["Artistes"], summary="Musiques d'un artiste")
 def get_artist_tracks(
     artist_id: int,
     limit: Optional[int] = Query(50, ge=1, le=500, description="Nombre maximum de résultats"),
-    offset: Optional[int] = Query(0, ge=0, description="Décalage pour la pagination")
+    offset: Optional[int] = Query(0, ge=0, description="Décalage pour la pagination"),
+    cursor: Optional[str] = CURSOR_QUERY,
+    total: TotalMode = TOTAL_QUERY
 ):
+    condition, params = keyset_filter(ARTIST_TRACKS_KEYSET, cursor)
     conn = get_db_connection()
     if not conn:
         raise HTTPException(status_code=500, detail="Impossible de se connecter à la base de données")
@@ -309,39 +511,47 @@ def get_artist_tracks(
             conn.close()
             raise HTTPException(status_code=404, detail="Artiste non trouvé")
         
-        query = """
-            SELECT DISTINCT t.track_id, t.track_title, t.track_duration, t.track_genre_top,
+        # (artiste, album, track) est la clé de artist_album_track : les lignes sont déjà uniques
+        query = f"""
+            SELECT t.track_id, t.track_title, t.track_duration, t.track_genre_top,
                    t.track_listens, t.track_favorite, t.track_file, aat.album_id, a.album_title, a.album_image_file
             FROM sae.tracks t
             JOIN sae.artist_album_track aat ON t.track_id = aat.track_id
             LEFT JOIN sae.album a ON aat.album_id = a.album_id
-            WHERE aat.artist_id = %s ORDER BY t.track_listens DESC LIMIT %s OFFSET %s
+            WHERE aat.artist_id = %s {"AND " + condition if condition else ""}
+            ORDER BY {ARTIST_TRACKS_KEYSET.order_by()} LIMIT %s OFFSET %s
         """
-        cur.execute(query, (artist_id, limit, offset))
+        cur.execute(query, (artist_id, *params, limit, 0 if cursor else offset))
         tracks = cur.fetchall()
         
-        cur.execute("""
-            SELECT COUNT(DISTINCT t.track_id) as total
-            FROM sae.tracks t JOIN sae.artist_album_track aat ON t.track_id = aat.track_id
-            WHERE aat.artist_id = %s
-        """, (artist_id,))
-        total = cur.fetchone()['total']
+        # num_tracks_associated = COUNT(DISTINCT track_id), tenu à jour dans artist_features_mat ;
+        # le repli et l'estimation comptent aussi les musiques distinctes, pas les lignes (album, musique)
+        count = totals.count(
+            cur, total, "sae.artist_album_track", "artist_id = %s", (artist_id,),
+            exact=("SELECT num_tracks_associated AS total FROM sae.artist_features_mat WHERE artist_id = %s", (artist_id,)),
+            distinct="track_id",
+        )
         
         cur.close()
         conn.close()
-        return {"artist": artist['artist_name'], "total": total, "count": len(tracks), "limit": limit, "offset": offset, "tracks": tracks}
+        return {"artist": artist['artist_name'], "total": count, "count": len(tracks), "limit": limit, "offset": offset, "next_cursor": ARTIST_TRACKS_KEYSET.next_cursor(tracks, limit), "tracks": tracks}
     except HTTPException:
         raise
     except Exception as e:
         if conn: conn.close()
         raise HTTPException(status_code=500, detail=str(e))
 
+ALBUMS_KEYSET = Keyset([KeyColumn("album_date_released", "album_date_released", date(1, 1, 1)), KeyColumn("album_id", "album_id")])
+
 @app.get("/albums", tags=["Albums"], summary="Liste de tous les albums")
 def get_albums(
     limit: Optional[int] = Query(50, ge=1, le=500, description="Nombre maximum de résultats"),
     offset: Optional[int] = Query(0, ge=0, description="Décalage pour la pagination"),
-    title: Optional[str] = Query(None, description="Filtrer par titre d'album")
+    title: Optional[str] = Query(None, description="Filtrer par titre d'album"),
+    cursor: Optional[str] = CURSOR_QUERY,
+    total: TotalMode = TOTAL_QUERY
 ):
+    condition, params = keyset_filter(ALBUMS_KEYSET, cursor)
     conn = get_db_connection()
     if not conn:
         raise HTTPException(status_code=500, detail="Impossible de se connecter à la base de données")
@@ -351,34 +561,34 @@ def get_albums(
         base_query = """
             SELECT album_id, album_title, album_type, album_tracks, album_listens,
                    album_favorites, album_image_file, album_date_released, album_tags, artists
-            FROM sae.album_features WHERE 1=1
+            FROM sae.album_features_mat WHERE 1=1
         """
-        params = []
+        page_params = []
         if title:
             base_query += " AND album_title ILIKE %s"
-            params.append(f"%{title}%")
-        
-        base_query += " ORDER BY album_date_released DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        cur.execute(base_query, params)
+            page_params.append(f"%{title}%")
+        if condition:
+            base_query += " AND " + condition
+            page_params.extend(params)
+        base_query += f" ORDER BY {ALBUMS_KEYSET.order_by()} LIMIT %s OFFSET %s"
+        page_params.extend([limit, 0 if cursor else offset])
+        cur.execute(base_query, page_params)
         albums = cur.fetchall()
         
-        count_query = "SELECT COUNT(*) as total FROM sae.album"
         if title:
-            count_query += " WHERE album_title ILIKE %s"
-            cur.execute(count_query, (f"%{title}%",))
+            count = totals.count(cur, total, "sae.album", "album_title ILIKE %s", (f"%{title}%",))
         else:
-            cur.execute(count_query)
-        total = cur.fetchone()['total']
+            count = totals.count(cur, total, "sae.album", exact=row_counter("album"))
         
         cur.close()
         conn.close()
-        return {"total": total, "count": len(albums), "limit": limit, "offset": offset, "results": albums}
+        return {"total": count, "count": len(albums), "limit": limit, "offset": offset, "next_cursor": ALBUMS_KEYSET.next_cursor(albums, limit), "results": albums}
     except Exception as e:
         if conn: conn.close()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/albums/{album_id}", tags=["Albums"], summary="Détails complets d'un album")
+@response_cache.cached("albums.detail", lambda p, r: [f"album:{p['album_id']}"])
 def get_album_by_id(album_id: int):
     conn = get_db_connection()
     if not conn:
@@ -388,7 +598,7 @@ def get_album_by_id(album_id: int):
         query = """
             SELECT album_id, album_title, album_type, album_tracks, album_listens,
                    album_favorites, album_image_file, album_date_released, album_tags, artists
-            FROM sae.album_features WHERE album_id = %s
+            FROM sae.album_features_mat WHERE album_id = %s
         """
         cur.execute(query, (album_id,))
         album = cur.fetchone()
@@ -404,6 +614,7 @@ def get_album_by_id(album_id: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/albums/{album_id}/tracks", tags=["Albums"], summary="Musiques d'un album")
+@response_cache.cached("albums.tracks", lambda p, r: [f"album:{p['album_id']}", *id_tags("track", [t["track_id"] for t in r["tracks"]])])
 def get_album_tracks(
     album_id: int,
     limit: Optional[int] = Query(50, ge=1, le=500, description="Nombre maximum de résultats"),
@@ -492,6 +703,7 @@ def toggle_reaction(target_type: str, target_id: int, payload: dict):
             cur.close(); conn.close()
             raise HTTPException(status_code=404, detail=f"{target_type} not found")
 
+        touched_playlists = set()
         liked = False; disliked = False; favorite = False
         if action == "like":
             liked = value
@@ -535,6 +747,7 @@ def toggle_reaction(target_type: str, target_id: int, payload: dict):
         if target_type == 'track' and action in ('like', 'dislike'):
             try:
                 def _maybe_delete_playlist(cur, pid):
+                    touched_playlists.add(pid)
                     cur.execute("SELECT COUNT(*) as cnt FROM sae.playlist_track WHERE playlist_id = %s", (pid,))
                     cnt = cur.fetchone()['cnt']
                     if cnt == 0:
@@ -562,6 +775,7 @@ def toggle_reaction(target_type: str, target_id: int, payload: dict):
                             pid = cur.fetchone()['playlist_id']
                             cur.execute("INSERT INTO sae.playlist_user (playlist_id, user_id) VALUES (%s,%s)", (pid, user_id))
                         cur.execute("INSERT INTO sae.playlist_track (playlist_id, track_id, position) VALUES (%s,%s, COALESCE((SELECT MAX(position)+1 FROM sae.playlist_track WHERE playlist_id=%s), 0)) ON CONFLICT DO NOTHING", (pid, target_id, pid))
+                        touched_playlists.add(pid)
                     else:
                         cur.execute("SELECT p.playlist_id FROM sae.playlist p JOIN sae.playlist_user pu ON p.playlist_id=pu.playlist_id WHERE pu.user_id=%s AND lower(trim(p.playlist_name)) = 'titres liké'", (user_id,))
                         row = cur.fetchone()
@@ -605,6 +819,11 @@ def toggle_reaction(target_type: str, target_id: int, payload: dict):
             pass
 
         conn.commit()
+        if action == "favorite":
+            # Compteurs *_favorites modifiés : fiches et listes contenant l'entité
+            response_cache.invalidate(f"{target_type}:{target_id}")
+        if touched_playlists:
+            response_cache.invalidate(*id_tags("playlist", touched_playlists))
         cur.execute("SELECT liked, disliked, favorite FROM sae.user_reaction WHERE user_id=%s AND target_type=%s AND target_id=%s", (user_id, target_type, target_id))
         state = cur.fetchone()
         cur.close()
@@ -637,25 +856,29 @@ def get_reaction(target_type: str, target_id: int, user_id: int):
         if conn: conn.close()
         raise HTTPException(status_code=500, detail=str(e))
 
+DISLIKED_KEYSET = Keyset([KeyColumn("ur.updated_at", "updated_at", datetime(1, 1, 1)), KeyColumn("ur.target_id", "track_id")])
+
 @app.get("/users/{user_id}/disliked_tracks")
-def get_user_disliked_tracks(user_id: int, limit: Optional[int] = Query(200, ge=1, le=2000), offset: Optional[int] = Query(0, ge=0)):
+def get_user_disliked_tracks(user_id: int, limit: Optional[int] = Query(200, ge=1, le=2000), offset: Optional[int] = Query(0, ge=0), cursor: Optional[str] = CURSOR_QUERY):
+    condition, params = keyset_filter(DISLIKED_KEYSET, cursor)
     conn = get_db_connection()
     if not conn:
         raise HTTPException(status_code=500, detail="DB connexion failed")
     try:
         cur = conn.cursor()
-        cur.execute("""
+        cur.execute(f"""
             SELECT t.track_id, t.track_title, t.track_duration, t.track_genre_top, t.track_listens, t.track_file, t.track_image_file,
-                   (SELECT string_agg(art.artist_name, ', ') FROM sae.artist art JOIN sae.artist_album_track aat ON art.artist_id = aat.artist_id WHERE aat.track_id = t.track_id) AS artist_names
+                   (SELECT string_agg(art.artist_name, ', ') FROM sae.artist art JOIN sae.artist_album_track aat ON art.artist_id = aat.artist_id WHERE aat.track_id = t.track_id) AS artist_names,
+                   ur.updated_at
             FROM sae.user_reaction ur
             JOIN sae.tracks t ON ur.target_id = t.track_id
-            WHERE ur.user_id = %s AND ur.target_type = 'track' AND ur.disliked = TRUE
-            ORDER BY ur.updated_at DESC
+            WHERE ur.user_id = %s AND ur.target_type = 'track' AND ur.disliked = TRUE {"AND " + condition if condition else ""}
+            ORDER BY {DISLIKED_KEYSET.order_by()}
             LIMIT %s OFFSET %s
-        """, (user_id, limit, offset))
+        """, (user_id, *params, limit, 0 if cursor else offset))
         tracks = cur.fetchall()
         cur.close(); conn.close()
-        return {"playlist_name": "Titres dislike", "playlist_description": "Titres que vous avez dislikés", "tracks": tracks, "count": len(tracks)}
+        return {"playlist_name": "Titres dislike", "playlist_description": "Titres que vous avez dislikés", "tracks": tracks, "count": len(tracks), "next_cursor": DISLIKED_KEYSET.next_cursor(tracks, limit)}
     except Exception as e:
         if conn: conn.close()
         raise HTTPException(status_code=500, detail=str(e))
@@ -710,11 +933,6 @@ def get_all_favorite(user_id : int):
 
 @app.post("/save-favorites", tags=["Favoris"], summary="Enregistrer les favoris d'un utilisateur")
 async def saveFavorite(request : Request):
-    conn = get_db_connection()
-
-    if not conn:
-        raise HTTPException(status_code=500, detail="Impossible de se connecter à la base de données")
-    
     data = await request.json()
     
     user_id = data.get("user_id")
@@ -726,7 +944,6 @@ async def saveFavorite(request : Request):
         raise HTTPException(status_code=400, detail="user_id manquant")
 
     try:
-        cur = conn.cursor()
         query = """
             INSERT INTO sae.favorite
                 (user_favorite_tracks,user_favorite_artist,user_favorite_genre,user_id) 
@@ -737,13 +954,12 @@ async def saveFavorite(request : Request):
                 user_favorite_artist = EXCLUDED.user_favorite_artist,
                 user_favorite_tracks = EXCLUDED.user_favorite_tracks;
         """
-        cur.execute(query, (tracks_str,artists_str,genres_str,user_id))
-        conn.commit()
-        cur.close()
-        conn.close()
+        await db.execute(query, (tracks_str,artists_str,genres_str,user_id))
         
         return {"success": True}
 
+    except PoolTimeout:
+        raise
     except Exception as e:
         print(f"Erreur : {e}")
         return {"success": False, "error": str(e)}
@@ -753,29 +969,22 @@ async def saveFavorite(request : Request):
 # =================================================================
 
 @app.get("/reco/tracks", tags=["Recommandations"], summary="Recommandations de musiques similaires")
-def recommend_tracks(
+async def recommend_tracks(
     track_ids: List[int] = Query(..., description="One or more track IDs to base recommendations on"),
     limit: int = Query(10, ge=1, le=50),
     exclude_user_id: Optional[int] = Query(None, description="Optional user id whose disliked tracks should be excluded")
 ):
+    require_warm("tracks")
     try:
-        recommendations = recommend_similar_tracks(track_ids, top_n=limit)
+        recommendations = await run_in_threadpool(recommend_similar_tracks, track_ids, limit)
 
         if not recommendations:
             raise HTTPException(status_code=404, detail="No recommendations found for the given IDs")
 
         if exclude_user_id is not None:
             try:
-                conn = get_db_connection()
-                if conn:
-                    cur = conn.cursor()
-                    cur.execute("SELECT target_id FROM sae.user_reaction WHERE user_id=%s AND target_type='track' AND disliked = TRUE", (exclude_user_id,))
-                    rows = cur.fetchall()
-                    disliked = set(r['target_id'] for r in rows) if rows else set()
-                    cur.close()
-                    conn.close()
-                else:
-                    disliked = set()
+                rows = await db.fetch_all("SELECT target_id FROM sae.user_reaction WHERE user_id=%s AND target_type='track' AND disliked = TRUE", (exclude_user_id,))
+                disliked = set(r['target_id'] for r in rows) if rows else set()
             except Exception:
                 disliked = set()
 
@@ -796,13 +1005,113 @@ def recommend_tracks(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Moteur audio : plus proches voisins pgvector (index HNSW de Tables/scriptBDDdlc.sql),
+# présélection sur les vecteurs réduits de Tables/scriptBDDaudio.sql s'ils existent
+# Musiques de départ par groupe : limit x RERANK_FACTOR + musiques de départ doit tenir
+# dans hnsw.ef_search (1000 au plus), sinon certaines recherches renverraient moins de limit
+MAX_AUDIO_SEEDS = 100
+
+class AudioRecoBatch(BaseModel):
+    groups: List[List[int]] = Field(..., min_length=1, max_length=100)
+    limit: int = Field(10, ge=1, le=50)
+    ef_search: int = Field(EF_SEARCH_DEFAULT, ge=1, le=1000)
+    genres: Optional[List[str]] = None
+    dims: Optional[int] = Field(None, ge=0, le=223)
+
+EF_SEARCH_QUERY = Query(EF_SEARCH_DEFAULT, ge=1, le=1000, description="hnsw.ef_search : candidats parcourus (rappel / latence)")
+DIMS_QUERY = Query(None, ge=0, le=223, description="Taille des vecteurs réduits de la présélection (0 : vecteurs complets, défaut : RECO_AUDIO_DIMS)")
+
+def audio_recommendations(groups: List[List[int]], limit: int, ef_search: int, genres: Optional[List[str]],
+                          dims: Optional[int] = None):
+    conn = get_db_connection()
+    if not conn:
+        raise HTTPException(status_code=500, detail="Impossible de se connecter à la base de données")
+    try:
+        cur = conn.cursor()
+        results = recommend_audio(cur, groups, limit, ef_search, genres, dims)
+        cur.close()
+        return results
+    except (RuntimeError, psycopg2.errors.UndefinedTable) as e:
+        # Schéma DLC (pgvector) absent de cette base
+        raise HTTPException(status_code=503, detail=f"Recommandations audio indisponibles : {str(e).splitlines()[0]}")
+    finally:
+        conn.rollback()     # fin de la transaction : ef_search et iterative_scan étaient SET LOCAL
+        conn.close()
+
+@app.get("/reco/tracks/audio", tags=["Recommandations"], summary="Musiques au son proche (vecteurs audio)")
+def recommend_tracks_audio(
+    track_ids: List[int] = Query(..., description="Une ou plusieurs musiques de départ (centroïde de leurs vecteurs)"),
+    limit: int = Query(10, ge=1, le=50),
+    ef_search: int = EF_SEARCH_QUERY,
+    genres: Optional[List[str]] = Query(None, description="Ne garder que ces genres (track_genre_top)"),
+    dims: Optional[int] = DIMS_QUERY
+):
+    if len(track_ids) > MAX_AUDIO_SEEDS:
+        raise HTTPException(status_code=400, detail=f"Au plus {MAX_AUDIO_SEEDS} musiques de départ")
+    results = audio_recommendations([track_ids], limit, ef_search, genres, dims)[0]
+    if not results:
+        raise HTTPException(status_code=404, detail="No audio vectors found for the given IDs")
+    return {"input_ids": track_ids, "count": len(results), "results": results}
+
+@app.post("/reco/tracks/audio/batch", tags=["Recommandations"], summary="Musiques au son proche pour plusieurs groupes en une requête")
+def recommend_tracks_audio_batch(data: AudioRecoBatch):
+    if not all(data.groups):
+        raise HTTPException(status_code=400, detail="groups : listes de track_id non vides")
+    if any(len(group) > MAX_AUDIO_SEEDS for group in data.groups):
+        raise HTTPException(status_code=400, detail=f"Au plus {MAX_AUDIO_SEEDS} musiques de départ par groupe")
+    results = audio_recommendations(data.groups, data.limit, data.ef_search, data.genres, data.dims)
+    return {
+        "count": len(results),
+        "results": [
+            {"input_ids": group, "count": len(items), "results": items}
+            for group, items in zip(data.groups, results)
+        ],
+    }
+
+# Moteur hybride : candidats audio, métadonnées et artistes fusionnés avec des poids (Recommendation/hybrid.py)
+@app.get("/reco/tracks/hybrid", tags=["Recommandations"], summary="Recommandations hybrides (audio, métadonnées, artistes)")
+def recommend_tracks_hybrid(
+    response: Response,
+    track_ids: List[int] = Query(..., description="Une ou plusieurs musiques de départ"),
+    limit: int = Query(10, ge=1, le=50),
+    w_audio: Optional[float] = Query(None, ge=0, description="Poids de la source audio (défaut : poids réglés par tune_hybrid.py)"),
+    w_metadata: Optional[float] = Query(None, ge=0, description="Poids de la source durée / bitrate / genre"),
+    w_artists: Optional[float] = Query(None, ge=0, description="Poids de la source embeddings d'artistes"),
+):
+    require_warm("tracks")
+    overrides = {"audio": w_audio, "metadata": w_metadata, "artists": w_artists}
+    weights = None
+    if any(w is not None for w in overrides.values()):
+        weights = {**current_weights(), **{s: w for s, w in overrides.items() if w is not None}}
+        if not any(weights.values()):
+            raise HTTPException(status_code=400, detail="Au moins un poids doit être positif")
+    # Embeddings d'artistes pas encore chargés : fusion sans cette source plutôt qu'un 503
+    sources = ["audio", "metadata"] + (["artists"] if warmup.ready("artists") else [])
+
+    conn = get_db_connection()
+    try:
+        result = recommend_hybrid(track_ids, limit, weights, conn.cursor() if conn else None, sources)
+    finally:
+        if conn:
+            conn.rollback()     # fin de la transaction : réglages SET LOCAL du moteur audio
+            conn.close()
+
+    timings = result["timings_ms"]
+    for stage, ms in timings.items():
+        hybrid_stage_seconds.observe(ms / 1000, stage)
+    response.headers["Server-Timing"] = ", ".join(f"{stage};dur={ms}" for stage, ms in timings.items())
+    if not result["results"]:
+        raise HTTPException(status_code=404, detail="No recommendations found for the given IDs")
+    return {"input_ids": track_ids, "count": len(result["results"]), **result}
+
 @app.get("/reco/artists", tags=["Recommandations"], summary="Recommandations d'artistes similaires")
-def get_artist_recommendations(
+async def get_artist_recommendations(
     artist_ids: List[int] = Query(..., description="One or more artist IDs to base recommendations on"),
     limit: int = Query(5, ge=1, le=50)
 ):
+    require_warm("artists")
     try:
-        recommendations = recommend_artists(artist_ids=artist_ids, top_k=limit)
+        recommendations = await run_in_threadpool(recommend_artists, artist_ids, limit)
         
         if not recommendations:
             return {
@@ -825,9 +1134,11 @@ def get_artist_recommendations(
 # =================================================================
 
 @app.get("/genres", tags=["Genres"], summary="Liste de tous les genres")
+@response_cache.cached("genres.list", lambda p, r: ["genres"])
 def get_all_genres(
     limit: Optional[int] = Query(500, ge=1, le=500, description="Nombre maximum de résultats"),
-    offset: Optional[int] = Query(0, ge=0, description="Décalage pour la pagination")
+    offset: Optional[int] = Query(0, ge=0, description="Décalage pour la pagination"),
+    total: TotalMode = TOTAL_QUERY
 ):
     conn = get_db_connection()
     if not conn:
@@ -848,15 +1159,13 @@ def get_all_genres(
         cur.execute(query, (limit, offset))
         genres = cur.fetchall()
         
-        count_query = "SELECT COUNT(*) as total FROM sae.genre"
-        cur.execute(count_query)
-        total = cur.fetchone()['total']
+        count = totals.count(cur, total, "sae.genre", exact=row_counter("genre"))
         
         cur.close()
         conn.close()
         
         return {
-            "total": total,
+            "total": count,
             "count": len(genres),
             "limit": limit,
             "offset": offset,
@@ -866,12 +1175,23 @@ def get_all_genres(
         if conn: conn.close()
         raise HTTPException(status_code=500, detail=str(e))
 
+GENRE_TRACKS_KEYSET = Keyset([
+    KeyColumn("t.track_listens", "track_listens", -1),
+    KeyColumn("t.track_id", "track_id"),
+    KeyColumn("aat.artist_id", "artist_id"),
+    KeyColumn("aat.album_id", "album_id"),
+])
+
 @app.get("/genres/{genre_id}/tracks", tags=["Genres"], summary="Musiques d'un genre")
+@response_cache.cached("genres.tracks", lambda p, r: [f"genre:{p['genre_id']}", *id_tags("track", [t["track_id"] for t in r["tracks"]])])
 def get_genre_tracks(
     genre_id: int,
     limit: Optional[int] = Query(50, ge=1, le=500, description="Nombre maximum de résultats"),
-    offset: Optional[int] = Query(0, ge=0, description="Décalage pour la pagination")
+    offset: Optional[int] = Query(0, ge=0, description="Décalage pour la pagination"),
+    cursor: Optional[str] = CURSOR_QUERY,
+    total: TotalMode = TOTAL_QUERY
 ):
+    condition, params = keyset_filter(GENRE_TRACKS_KEYSET, cursor)
     conn = get_db_connection()
     if not conn:
         raise HTTPException(status_code=500, detail="Impossible de se connecter à la base de données")
@@ -888,7 +1208,7 @@ def get_genre_tracks(
             conn.close()
             raise HTTPException(status_code=404, detail="Genre non trouvé")
         
-        query = """
+        query = f"""
             SELECT 
                 t.track_id,
                 t.track_title,
@@ -897,37 +1217,37 @@ def get_genre_tracks(
                 t.track_file,
                 t.track_favorite,
                 art.artist_name,
-                alb.album_title
+                alb.album_title,
+                aat.artist_id,
+                aat.album_id
             FROM sae.tracks t
             JOIN sae.track_genre tg ON t.track_id = tg.track_id
             JOIN sae.artist_album_track aat ON t.track_id = aat.track_id
             JOIN sae.artist art ON aat.artist_id = art.artist_id
             LEFT JOIN sae.album alb ON aat.album_id = alb.album_id
-            WHERE tg.genre_id = %s
-            ORDER BY t.track_listens DESC
+            WHERE tg.genre_id = %s {"AND " + condition if condition else ""}
+            ORDER BY {GENRE_TRACKS_KEYSET.order_by()}
             LIMIT %s OFFSET %s
         """
         
-        cur.execute(query, (genre_id, limit, offset))
+        cur.execute(query, (genre_id, *params, limit, 0 if cursor else offset))
         tracks = cur.fetchall()
         
-        count_query = """
-            SELECT COUNT(*) as total
-            FROM sae.track_genre
-            WHERE genre_id = %s
-        """
-        cur.execute(count_query, (genre_id,))
-        total = cur.fetchone()['total']
+        count = totals.count(
+            cur, total, "sae.track_genre", "genre_id = %s", (genre_id,),
+            exact=row_counter(f"track_genre:{genre_id}"),
+        )
         
         cur.close()
         conn.close()
         
         return {
             "genre": genre['genre_title'],
-            "total": total,
+            "total": count,
             "count": len(tracks),
             "limit": limit,
             "offset": offset,
+            "next_cursor": GENRE_TRACKS_KEYSET.next_cursor(tracks, limit),
             "tracks": tracks
         }
     except Exception as e:
@@ -1014,14 +1334,9 @@ def create_playlist(data: PlaylistCreate):
             conn.close()
 
 @app.get("/playlists/{playlist_id}", tags=["Playlists"], summary="Détails complets d'une playlist")
-def get_playlist_by_id(playlist_id: int):
-    conn = get_db_connection()
-    if not conn:
-        raise HTTPException(status_code=500, detail="Impossible de se connecter à la base de données")
-    
+@response_cache.cached("playlists.detail", lambda p, r: [f"playlist:{p['playlist_id']}", f"user:{r['user_id']}", *id_tags("track", [t["track_id"] for t in r["tracks"]])])
+async def get_playlist_by_id(playlist_id: int):
     try:
-        cur = conn.cursor()
-        
         playlist_query = """
             SELECT 
                 p.playlist_id,
@@ -1034,12 +1349,9 @@ def get_playlist_by_id(playlist_id: int):
             JOIN sae.playlist_user pu ON p.playlist_id = pu.playlist_id
             WHERE p.playlist_id = %s
         """
-        cur.execute(playlist_query, (playlist_id,))
-        playlist = cur.fetchone()
+        playlist = await db.fetch_one(playlist_query, (playlist_id,))
         
         if not playlist:
-            cur.close()
-            conn.close()
             raise HTTPException(status_code=404, detail="Playlist non trouvée")
         
         tracks_query = """
@@ -1063,20 +1375,15 @@ def get_playlist_by_id(playlist_id: int):
                      t.track_listens, t.track_file, t.track_image_file
             ORDER BY MIN(pt.position)
         """
-        cur.execute(tracks_query, (playlist_id,))
-        tracks = cur.fetchall()
+        tracks = await db.fetch_all(tracks_query, (playlist_id,))
         
         playlist['tracks'] = tracks
         playlist['tracks_count'] = len(tracks)
         
-        cur.close()
-        conn.close()
-        
         return playlist
-    except HTTPException:
+    except (HTTPException, PoolTimeout):
         raise
     except Exception as e:
-        if conn: conn.close()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/playlists/{playlist_id}", tags=["Playlists"], summary="Supprimer une playlist")
@@ -1144,6 +1451,7 @@ def delete_playlist(playlist_id: int):
         cur.execute("SET session_replication_role = 'origin';")
         
         conn.commit()
+        response_cache.invalidate(f"playlist:{playlist_id}")
         return {"message": "Playlist supprimée"}
     except Exception as e:
         conn.rollback()
@@ -1185,6 +1493,7 @@ def update_tracks_in_playlist(playlist_id: int, data: PlaylistUpdateTracks):
         for idx, t_id in enumerate(data.track_ids):
             cur.execute("INSERT INTO sae.playlist_track (playlist_id, track_id, position) VALUES (%s, %s, %s)", (playlist_id, t_id, idx))
         conn.commit()
+        response_cache.invalidate(f"playlist:{playlist_id}")
         return {"message": "Liste de lecture mise à jour"}
     finally:
         conn.close()
@@ -1240,6 +1549,7 @@ def remove_track_from_playlist(playlist_id: int, track_id: int):
         conn.commit()
         cur.close()
         conn.close()
+        response_cache.invalidate(f"playlist:{playlist_id}")
 
         return {"message": "Track supprimée de la playlist", "playlist_deleted": playlist_deleted}
     except HTTPException:
@@ -1341,6 +1651,7 @@ def update_playlist_info(playlist_id: int, data: PlaylistUpdateInfo):
         """
         cur.execute(query, (data.name, data.description, playlist_id))
         conn.commit()
+        response_cache.invalidate(f"playlist:{playlist_id}")
         
         return {"message": "Playlist mise à jour avec succès"}
     except Exception as e:
@@ -1357,50 +1668,40 @@ async def upload_playlist_image(playlist_id: int, file: UploadFile = File(...)):
     if file.content_type not in allowed_types:
         raise HTTPException(status_code=400, detail="Type de fichier non supporté. Utilisez JPG, PNG, WebP ou AVIF.")
     
-    conn = get_db_connection()
-    if not conn:
-        raise HTTPException(status_code=500, detail="Impossible de se connecter à la base de données")
-    
     try:
-        cur = conn.cursor()
-        
-        cur.execute("SELECT playlist_id, playlist_image FROM sae.playlist WHERE playlist_id = %s", (playlist_id,))
-        playlist = cur.fetchone()
+        playlist = await db.fetch_one("SELECT playlist_id, playlist_image FROM sae.playlist WHERE playlist_id = %s", (playlist_id,))
         if not playlist:
             raise HTTPException(status_code=404, detail="Playlist non trouvée")
         
-        if playlist['playlist_image']:
-            old_path = os.path.join(UPLOADS_DIR, 'playlists', playlist['playlist_image'])
-            if os.path.exists(old_path):
-                os.remove(old_path)
-        
         ext = os.path.splitext(file.filename)[1] or '.jpg'
         filename = f"{playlist_id}_{uuid.uuid4().hex[:8]}{ext}"
         filepath = os.path.join(UPLOADS_DIR, 'playlists', filename)
         
-        with open(filepath, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Écritures disque hors de la boucle d'événements
+        await run_in_threadpool(_save_playlist_image, file.file, filepath, playlist['playlist_image'])
         
-        cur.execute(
+        await db.execute(
             "UPDATE sae.playlist SET playlist_image = %s WHERE playlist_id = %s",
             (filename, playlist_id)
         )
-        conn.commit()
+        response_cache.invalidate(f"playlist:{playlist_id}")
         
         return {
             "message": "Image mise à jour avec succès",
             "playlist_image": filename
         }
-    except HTTPException:
-        if conn: conn.rollback()
+    except (HTTPException, PoolTimeout):
         raise
     except Exception as e:
-        if conn: conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
+
+def _save_playlist_image(source, filepath, old_image):
+    if old_image:
+        old_path = os.path.join(UPLOADS_DIR, 'playlists', old_image)
+        if os.path.exists(old_path):
+            os.remove(old_path)
+    with open(filepath, "wb") as buffer:
+        shutil.copyfileobj(source, buffer)
 
 @app.delete("/playlists/{playlist_id}/image", tags=["Playlists"], summary="Supprimer l'image d'une playlist")
 def delete_playlist_image(playlist_id: int):
@@ -1426,6 +1727,7 @@ def delete_playlist_image(playlist_id: int):
                 (playlist_id,)
             )
             conn.commit()
+            response_cache.invalidate(f"playlist:{playlist_id}")
         
         return {"message": "Image supprimée avec succès"}
     except HTTPException:
@@ -1443,56 +1745,95 @@ def delete_playlist_image(playlist_id: int):
 # ===== SEARCH =====
 # =================================================================
 
+SEARCH_KEYSET = Keyset([KeyColumn("m.score", "score"), KeyColumn("m.track_id", "track_id")])
+
+# Recherche sur sae.track_search (Tables/scriptBDDsearch.sql) : mots et préfixes via le
+# tsvector, fautes de frappe (<%%) et sous-chaînes (LIKE) via l'index trigramme.
+SEARCH_QUERY = """
+    WITH matches AS (
+        SELECT s.track_id,
+               (ts_rank_cd(s.document, to_tsquery('sae.muse', %s))
+                + word_similarity(sae.search_normalize(%s), s.search_text))::float8 AS score
+        FROM sae.track_search s
+        WHERE s.document @@ to_tsquery('sae.muse', %s)
+           OR sae.search_normalize(%s) <%% s.search_text
+           OR s.search_text LIKE sae.search_normalize(%s)
+    )
+    SELECT m.score, tf.track_id, tf.track_title, tf.track_duration, tf.track_genre_top,
+           tf.track_image_file, tf.artist_names, tf.album_titles
+    FROM matches m
+    JOIN sae.tracks_features_mat tf ON tf.track_id = m.track_id
+    {where}
+    ORDER BY {order_by} LIMIT %s
+"""
+
+def search_terms(query: str):
+    """(tsquery préfixe "mot1:* & mot2:*", motif LIKE échappé) pour SEARCH_QUERY."""
+    words = re.findall(r"[^\W_]+", query)
+    tsquery = " & ".join(f"{w}:*" for w in words)
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return tsquery, f"%{escaped}%"
+
 @app.get("/search/tracks", tags=["Recherche"], summary="Rechercher des musiques")
-def search_tracks(
-    query: str = Query(..., description="Terme de recherche"),
-    limit: Optional[int] = Query(10, ge=1, le=50, description="Nombre maximum de résultats")
+async def search_tracks(
+    query: str = Query(..., min_length=1, description="Terme de recherche"),
+    limit: Optional[int] = Query(10, ge=1, le=50, description="Nombre maximum de résultats"),
+    cursor: Optional[str] = CURSOR_QUERY
 ):
-    conn = get_db_connection()
-    if not conn:
-        raise HTTPException(status_code=500, detail="Impossible de se connecter à la base de données")
-    
+    condition, params = keyset_filter(SEARCH_KEYSET, cursor)
     try:
-        cur = conn.cursor()
-        
-        search_query = """
-            SELECT DISTINCT
-                t.track_id,
-                t.track_title,
-                t.track_duration,
-                t.track_genre_top,
-                t.track_image_file,
-                STRING_AGG(DISTINCT ar.artist_name, ', ') as artist_names,
-                STRING_AGG(DISTINCT alb.album_title, ', ') as album_titles
-            FROM sae.tracks t
-            LEFT JOIN sae.artist_album_track aat ON t.track_id = aat.track_id
-            LEFT JOIN sae.artist ar ON aat.artist_id = ar.artist_id
-            LEFT JOIN sae.album alb ON aat.album_id = alb.album_id
-            WHERE 
-                t.track_title ILIKE %s
-                OR ar.artist_name ILIKE %s
-                OR alb.album_title ILIKE %s
-            GROUP BY t.track_id, t.track_title, t.track_duration, 
-                     t.track_genre_top, t.track_image_file
-            LIMIT %s
-        """
-        
-        search_term = f"%{query}%"
-        cur.execute(search_query, (search_term, search_term, search_term, limit))
-        tracks = cur.fetchall()
-        
-        cur.close()
-        conn.close()
+        tsquery, pattern = search_terms(query)
+        search_query = SEARCH_QUERY.format(
+            where="WHERE " + condition if condition else "",
+            order_by=SEARCH_KEYSET.order_by(),
+        )
+        tracks = await db.fetch_all(search_query, (tsquery, query, tsquery, query, pattern, *params, limit))
         
         return {
             "query": query,
             "count": len(tracks),
+            "next_cursor": SEARCH_KEYSET.next_cursor(tracks, limit),
             "results": tracks
         }
+    except PoolTimeout:
+        raise
     except Exception as e:
-        if conn: conn.close()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/search/autocomplete", tags=["Recherche"], summary="Suggestions pendant la saisie")
+def search_autocomplete(
+    query: str = Query(..., min_length=1, description="Début du titre, de l'artiste ou de l'album"),
+    types: List[AutocompleteKind] = Query(["tracks", "artists", "albums"], description="Types de suggestions"),
+    limit: int = Query(8, ge=1, le=20, description="Nombre maximum de suggestions par type")
+):
+    # Lecture en mémoire uniquement (voir autocomplete.py) : pas d'accès à la base.
+    # Route synchrone (pool de threads) : le verrou de l'index peut être tenu par
+    # le thread des notifications, la boucle asyncio n'attend pas derrière lui
+    if not autocomplete.ready:
+        raise HTTPException(status_code=503, detail="Index d'autocomplétion en cours de construction")
+    return {"query": query, **autocomplete.search(query, dict.fromkeys(types), limit)}
+
+# =================================================================
+# ===== EXPORTS =====
+# =================================================================
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", 2000))
+
+@app.get("/export/{dataset}", tags=["Export"], summary="Export complet d'une table du catalogue")
+def export_dataset(
+    dataset: ExportDataset,
+    format: ExportFormat = Query("ndjson", description="ndjson (un objet JSON par ligne) ou csv")
+):
+    # Connexion hors requête : elle sert pendant tout l'envoi et est rendue par le générateur
+    stream = ExportStream(db_pool.getconn(track=False), dataset, format, EXPORT_CHUNK_ROWS)
+    return StreamingResponse(
+        stream,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'},
+        # Rend la connexion seulement si l'envoi n'a jamais commencé (voir ExportStream)
+        background=BackgroundTask(stream.release),
+    )
+
 # =================================================================
 # ===== BLINDTESTS =====
 # =================================================================
@@ -1537,7 +1878,7 @@ def generate_personalized_blindtest(
                         JOIN sae.artist_album_track aat ON art.artist_id = aat.artist_id 
                         WHERE aat.track_id = t.track_id) as artist_names
                 FROM sae.tracks t
-                LEFT JOIN sae.tracks_features tf ON t.track_id = tf.track_id
+                LEFT JOIN sae.tracks_features_mat tf ON t.track_id = tf.track_id
                 WHERE t.track_file IS NOT NULL AND t.track_file != ''
             """
             conds = custom_conditions.copy()
@@ -1566,8 +1907,9 @@ def generate_personalized_blindtest(
             cur.execute("SELECT target_id FROM sae.user_reaction WHERE user_id = %s AND target_type = 'track' AND liked = TRUE", (user_id,))
             liked_tracks = [row['target_id'] for row in cur.fetchall()]
 
+        # Tant que la matrice des musiques n'est pas prête : blindtest sans recommandations
         recommended_ids = []
-        if liked_tracks:
+        if liked_tracks and warmup.ready("tracks"):
             try:
                 recos = recommend_similar_tracks(liked_tracks[:5], top_n=200)
                 recommended_ids = [int(r.get('track_id', r.get('id'))) for r in recos if r.get('track_id') or r.get('id')]
@@ -1889,6 +2231,8 @@ def delete_user(user_id: int):
         conn.commit()
         cur.close()
         conn.close()
+        # Ses playlists ne sont plus rattachées à personne
+        response_cache.invalidate(f"user:{user_id}")
 
         return {"success": True, "message": "Compte supprimé"}
 
@@ -1967,13 +2311,98 @@ def admin_stats():
         if conn: conn.close()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/admin/db/pool", tags=["Admin"], summary="Statistiques du pool de connexions")
+def admin_db_pool_stats():
+    return db_pool.stats()
+
+USERS_KEYSET = Keyset([KeyColumn("user_id", "user_id")], descending=False)
+
+@app.get("/admin/cache", tags=["Admin"], summary="Statistiques du cache des réponses")
+def admin_cache_stats():
+    return response_cache.stats()
+
+@app.delete("/admin/cache", tags=["Admin"], summary="Vider le cache des réponses")
+def admin_cache_clear():
+    response_cache.clear()
+    return {"success": True, "message": "Cache vidé"}
+
+@app.get("/admin/slow-queries", tags=["Admin"], summary="Requêtes SQL les plus coûteuses (profileur)")
+def admin_slow_queries(
+    limit: int = Query(20, ge=1, le=200),
+    order: SlowQueryOrder = Query("total", description="Tri : total, max, mean, slow (nombre de requêtes lentes) ou calls")
+):
+    return {**query_profiler.settings(), "queries": query_profiler.top(limit, order)}
+
+@app.put("/admin/slow-queries", tags=["Admin"], summary="Activer ou régler le profileur de requêtes")
+def admin_slow_queries_settings(
+    enabled: Optional[bool] = Query(None),
+    threshold_ms: Optional[float] = Query(None, ge=0, description="Seuil d'une requête lente"),
+    explain_rate: Optional[float] = Query(None, ge=0, le=1, description="Fraction des requêtes lentes analysées par EXPLAIN")
+):
+    if enabled is not None:
+        query_profiler.enabled = enabled
+    if threshold_ms is not None:
+        query_profiler.threshold = threshold_ms / 1000
+    if explain_rate is not None:
+        query_profiler.explain_rate = explain_rate
+    return query_profiler.settings()
+
+@app.delete("/admin/slow-queries", tags=["Admin"], summary="Remettre à zéro les statistiques du profileur")
+def admin_slow_queries_reset():
+    query_profiler.reset()
+    return {"success": True, "message": "Statistiques du profileur effacées"}
+
+@app.get("/admin/autocomplete", tags=["Admin"], summary="Statistiques de l'index d'autocomplétion")
+def admin_autocomplete_stats():
+    return autocomplete.stats()
+
+@app.post("/admin/autocomplete/rebuild", tags=["Admin"], summary="Reconstruire l'index d'autocomplétion")
+def admin_autocomplete_rebuild():
+    try:
+        autocomplete.rebuild()
+        return {"success": True, "build_seconds": autocomplete.build_seconds}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/admin/reco/artifacts", tags=["Admin"], summary="Matrices de recommandation partagées (artefacts en mmap)")
+def admin_reco_artifacts():
+    # Version ouverte par ce worker ; les autres basculent au plus 5 s après une publication
+    return {"tracks": tracks_artifact_status(), "artists": artists_artifact_status(),
+            "embedding_worker": embedding_worker.status()}
+
+@app.post("/admin/reco/artifacts/{name}/rebuild", tags=["Admin"], summary="Reconstruire une matrice de recommandation")
+def admin_reco_artifact_rebuild(name: Literal["tracks", "neighbours", "artists"]):
+    try:
+        if name == "tracks":
+            load_data_into_cache(force=True)
+            ensure_neighbours()
+        elif name == "neighbours":
+            ensure_neighbours(force=True)
+        else:
+            rebuild_artists_artifact()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reconstruction impossible : {e}")
+    return {"success": True, **admin_reco_artifacts()}
+
+@app.post("/admin/reco/embeddings/refresh", tags=["Admin"], summary="Réencoder les artistes dont le texte a changé")
+def admin_reco_embeddings_refresh():
+    # Même passe que le thread périodique ; verrou partagé : pas de double encodage
+    require_warm("artists")
+    encoded = embedding_worker.run_once()
+    if embedding_worker.last_run["error"]:
+        raise HTTPException(status_code=500, detail=f"Rafraîchissement impossible : {embedding_worker.last_run['error']}")
+    return {"success": True, "encoded": encoded, **admin_reco_artifacts()}
+
 @app.get("/admin/users", tags=["Admin"], summary="Liste de tous les utilisateurs")
 def admin_list_users(
     limit: Optional[int] = Query(50, ge=1, le=500),
     offset: Optional[int] = Query(0, ge=0),
     search: Optional[str] = Query(None, description="Rechercher par nom, prénom ou email"),
-    role: Optional[str] = Query(None, description="Filtrer par rôle (admin, user, banned)")
+    role: Optional[str] = Query(None, description="Filtrer par rôle (admin, user, banned)"),
+    cursor: Optional[str] = CURSOR_QUERY,
+    total: TotalMode = TOTAL_QUERY
 ):
+    condition, cursor_params = keyset_filter(USERS_KEYSET, cursor)
     conn = get_db_connection()
     if not conn:
         raise HTTPException(status_code=500, detail="Impossible de se connecter à la base de données")
@@ -1999,9 +2428,14 @@ def admin_list_users(
         if where_clauses:
             where_sql = "WHERE " + " AND ".join(where_clauses)
 
-        count_query = f"SELECT COUNT(*) as total FROM sae.users {where_sql}"
-        cur.execute(count_query, params)
-        total = cur.fetchone()['total']
+        count = totals.count(
+            cur, total, "sae.users", " AND ".join(where_clauses), params,
+            exact=None if where_clauses else row_counter("users"),
+        )
+
+        if condition:
+            where_sql = ("WHERE " + " AND ".join(where_clauses + [condition]))
+            params.extend(cursor_params)
 
         query = f"""
             SELECT
@@ -2010,10 +2444,10 @@ def admin_list_users(
                 user_year_created
             FROM sae.users
             {where_sql}
-            ORDER BY user_id ASC
+            ORDER BY {USERS_KEYSET.order_by()}
             LIMIT %s OFFSET %s
         """
-        params.extend([limit, offset])
+        params.extend([limit, 0 if cursor else offset])
         cur.execute(query, params)
         users = cur.fetchall()
 
@@ -2021,10 +2455,11 @@ def admin_list_users(
         conn.close()
 
         return {
-            "total": total,
+            "total": count,
             "count": len(users),
             "limit": limit,
             "offset": offset,
+            "next_cursor": USERS_KEYSET.next_cursor(users, limit),
             "users": users
         }
     except Exception as e:
@@ -2269,6 +2704,7 @@ def admin_delete_user(user_id: int, requester_id: Optional[int] = Query(None)):
         conn.commit()
         cur.close()
         conn.close()
+        response_cache.invalidate(f"user:{user_id}")
 
         return {"success": True, "message": "Utilisateur supprimé"}
     except HTTPException:
@@ -2286,6 +2722,12 @@ def admin_delete_track(track_id: int):
     try:
         cur = conn.cursor()
 
+        # Entités dont les réponses en cache contiennent ce titre
+        cur.execute("SELECT DISTINCT album_id, artist_id FROM sae.artist_album_track WHERE track_id = %s", (track_id,))
+        links = cur.fetchall()
+        cur.execute("SELECT genre_id FROM sae.track_genre WHERE track_id = %s", (track_id,))
+        genre_ids = [r['genre_id'] for r in cur.fetchall()]
+
         cur.execute("DELETE FROM sae.playlist_track WHERE track_id = %s", (track_id,))
         cur.execute("DELETE FROM sae.users_track WHERE track_id = %s", (track_id,))
         cur.execute("DELETE FROM sae.track_genre WHERE track_id = %s", (track_id,))
@@ -2304,6 +2746,12 @@ def admin_delete_track(track_id: int):
         conn.commit()
         cur.close()
         conn.close()
+        response_cache.invalidate(
+            f"track:{track_id}", "genres",
+            *id_tags("album", {l['album_id'] for l in links}),
+            *id_tags("artist", {l['artist_id'] for l in links}),
+            *id_tags("genre", genre_ids),
+        )
 
         return {"success": True, "message": "Track supprimée"}
     except HTTPException:
@@ -2331,6 +2779,7 @@ def admin_delete_playlist(playlist_id: int):
         conn.commit()
         cur.close()
         conn.close()
+        response_cache.invalidate(f"playlist:{playlist_id}")
 
         return {"success": True, "message": "Playlist supprimée"}
     except HTTPException:
@@ -0,0 +1,291 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from psycopg2.extensions import cursor as TupleCursor
+from psycopg2.extras import RealDictCursor
+
+# =================================================================
+# ===== MÉTRIQUES DES REQUÊTES (FORMAT PROMETHEUS) =====
+# MetricsMiddleware mesure chaque requête HTTP : durée, temps passé en
+# base, taille de la réponse, code de retour, requêtes en cours ; par
+# méthode et par route (le chemin déclaré, "/tracks/{track_id}", pas l'URL).
+# Le temps en base est cumulé par les curseurs psycopg2 (TimedCursor) et
+# par Database pour asyncpg, via un compteur propre à la requête
+# (ContextVar) ; le reste du temps est le temps Python de la route.
+# Registry.render() produit le format texte de Prometheus pour /metrics.
+# =================================================================
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labels, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels) -> None:
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(counts), total)) for k, (counts, total) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+# Collecteur : fonction appelée à chaque /metrics, renvoie des
+# (nom, type, aide, [(labels dict, valeur)]) lus sur l'état courant (pools, cache...)
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+        self.collectors: List[Collector] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Collector) -> None:
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            try:
+                families = list(collector())
+            except Exception:
+                continue    # une source indisponible ne casse pas l'export
+            for name, kind, help, samples in families:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# ---------- temps passé en base pendant la requête courante ----------
+
+class RequestTimer:
+    __slots__ = ("db_seconds", "db_queries")
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.db_queries = 0
+
+
+# Objet mutable : les copies du contexte (threadpool, tâches) voient le même compteur
+_request_timer: ContextVar[Optional[RequestTimer]] = ContextVar("_request_timer", default=None)
+
+
+@contextmanager
+def timed_db(query: bool = True):
+    """Ajoute la durée du bloc au temps base de la requête en cours (s'il y en a une)."""
+    timer = _request_timer.get()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.db_seconds += time.perf_counter() - start
+        if query:
+            timer.db_queries += 1
+
+
+class _TimedCursorMixin:
+    profiler = None     # QueryProfiler (profiler.py), branché par main.py
+
+    def execute(self, query, vars=None):
+        profiler = self.profiler
+        if profiler is None or not profiler.enabled:
+            with timed_db():
+                return super().execute(query, vars)
+        start = time.perf_counter()
+        with timed_db():
+            result = super().execute(query, vars)
+        seconds = time.perf_counter() - start
+        explain = profiler.observe(query, vars, seconds)
+        # Pas d'EXPLAIN au milieu de la lecture d'un curseur nommé
+        if explain and self.name is None:
+            profiler.explain_psycopg2(self.connection, explain, query, vars, seconds)
+        return result
+
+    def executemany(self, query, vars_list):
+        profiler = self.profiler
+        start = time.perf_counter()
+        with timed_db():
+            result = super().executemany(query, vars_list)
+        if profiler is not None and profiler.enabled:
+            profiler.observe(query, None, time.perf_counter() - start)
+        return result
+
+    # Curseurs nommés : chaque fetch est un aller-retour vers le serveur
+    def fetchone(self):
+        with timed_db(query=False):
+            return super().fetchone()
+
+    def fetchmany(self, size=None):
+        with timed_db(query=False):
+            return super().fetchmany(size) if size is not None else super().fetchmany()
+
+    def fetchall(self):
+        with timed_db(query=False):
+            return super().fetchall()
+
+
+class TimedCursor(_TimedCursorMixin, RealDictCursor):
+    """RealDictCursor qui compte son temps dans la requête HTTP courante."""
+
+
+class TimedTupleCursor(_TimedCursorMixin, TupleCursor):
+    """Curseur à tuples, même mesure."""
+
+
+# ---------- middleware ----------
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class HttpMetrics:
+    """Métriques HTTP, enregistrées une fois dans `registry` et alimentées par MetricsMiddleware."""
+
+    def __init__(self, registry: Registry):
+        self.requests = registry.register(Counter(
+            "muse_http_requests_total", "Requêtes HTTP traitées.", ("method", "route", "status")))
+        self.duration = registry.register(Histogram(
+            "muse_http_request_duration_seconds", "Durée totale des requêtes.", ("method", "route")))
+        self.db_time = registry.register(Histogram(
+            "muse_http_request_db_seconds", "Temps passé en base par requête (requêtes + lectures).", ("method", "route")))
+        self.app_time = registry.register(Histogram(
+            "muse_http_request_app_seconds", "Temps hors base par requête (Python, sérialisation, envoi).", ("method", "route")))
+        self.db_queries = registry.register(Counter(
+            "muse_http_db_queries_total", "Requêtes SQL exécutées par les routes.", ("method", "route")))
+        self.response_size = registry.register(Histogram(
+            "muse_http_response_size_bytes", "Taille du corps des réponses.", ("method", "route"), SIZE_BUCKETS))
+        self.in_progress = registry.register(Gauge(
+            "muse_http_requests_in_progress", "Requêtes en cours de traitement.", ("method",)))
+
+
+class MetricsMiddleware:
+    """Middleware ASGI (pas BaseHTTPMiddleware : les réponses en streaming ne sont pas mises en tampon)."""
+
+    def __init__(self, app, metrics: HttpMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        timer = RequestTimer()
+        token = _request_timer.set(timer)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        metrics = self.metrics
+        metrics.in_progress.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = route_template(scope)
+            metrics.in_progress.dec(method)
+            metrics.requests.inc(method, route, status)
+            metrics.duration.observe(elapsed, method, route)
+            metrics.db_time.observe(timer.db_seconds, method, route)
+            metrics.app_time.observe(max(elapsed - timer.db_seconds, 0.0), method, route)
+            metrics.response_size.observe(size, method, route)
+            if timer.db_queries:
+                metrics.db_queries.inc(method, route, amount=timer.db_queries)
+            _request_timer.reset(token)
@@ -0,0 +1,179 @@
+"""
+Applique les migrations du schéma (Tables/migrations/NNNN_nom.sql).
+
+    python API/scripts/migrate.py             # applique les migrations en attente
+    python API/scripts/migrate.py --status    # versions appliquées / en attente
+
+Lancé par setup_db.py après la création des tables. L'API ne modifie plus
+le schéma au démarrage : elle vérifie seulement que la base est à jour
+(`pending_migrations`) et le signale sur /ready sinon.
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+from typing import List, NamedTuple
+
+import psycopg2
+from psycopg2.extensions import cursor as TupleCursor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_CONFIG = {
+    "host": "localhost",
+    "dbname": os.getenv("POSTGRES_DBNAME"),
+    "user": os.getenv("POSTGRES_USER"),
+    "password": os.getenv("POSTGRES_PASSWORD"),
+    "port": int(os.getenv("POSTGRES_PORT", 5432))
+}
+
+# =================================================================
+# ===== MIGRATIONS VERSIONNÉES =====
+# Un fichier par migration, numéroté ; chacune est appliquée une seule
+# fois, dans sa propre transaction avec sa ligne dans
+# sae.schema_migrations. Un verrou consultatif (advisory lock) sérialise
+# les lanceurs concurrents : le second attend, relit les versions
+# appliquées et n'a plus rien à faire. Les fichiers restent idempotents
+# (IF NOT EXISTS) pour les bases qui avaient déjà ces objets.
+# =================================================================
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'Tables', 'migrations')
+MIGRATION_FILE = re.compile(r"^(\d{4})_([\w-]+)\.sql$")
+LOCK_KEY = 0x5AE_3167    # clé du pg_advisory_lock propre aux migrations
+
+SCHEMA_TABLE = """
+    CREATE TABLE IF NOT EXISTS sae.schema_migrations (
+        version     INT PRIMARY KEY,
+        name        TEXT NOT NULL,
+        checksum    TEXT NOT NULL,
+        applied_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        duration_ms INT
+    )
+"""
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    path: str
+    checksum: str
+
+    def sql(self) -> str:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+
+def discover(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        path = os.path.join(directory, filename)
+        with open(path, 'rb') as f:
+            checksum = hashlib.sha256(f.read()).hexdigest()
+        migrations.append(Migration(int(match.group(1)), match.group(2), path, checksum))
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Numéros de migration en double dans {directory}")
+    return migrations
+
+
+def applied_versions(cur) -> dict:
+    """{version: checksum} des migrations appliquées ({} si la table n'existe pas encore)."""
+    cur.execute("SELECT to_regclass('sae.schema_migrations') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        return {}
+    cur.execute("SELECT version, checksum FROM sae.schema_migrations")
+    return dict(cur.fetchall())
+
+
+def pending_migrations(conn, directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Migrations pas encore appliquées sur cette base (lecture seule, pour l'API)."""
+    # Curseur à tuples même sur une connexion du pool (RealDictCursor par défaut)
+    cur = conn.cursor(cursor_factory=TupleCursor)
+    try:
+        applied = applied_versions(cur)
+    finally:
+        cur.close()
+    return [m for m in discover(directory) if m.version not in applied]
+
+
+def migrate(conn, directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Applique les migrations en attente ; renvoie celles qui l'ont été par cet appel."""
+    migrations = discover(directory)
+    conn.autocommit = True
+    cur = conn.cursor(cursor_factory=TupleCursor)
+    cur.execute("SELECT pg_advisory_lock(%s)", (LOCK_KEY,))
+    done = []
+    try:
+        conn.autocommit = False
+        cur.execute("CREATE SCHEMA IF NOT EXISTS sae")
+        cur.execute(SCHEMA_TABLE)
+        conn.commit()
+        # Relu sous le verrou : un autre lanceur a pu tout appliquer pendant l'attente
+        applied = applied_versions(cur)
+        conn.commit()
+        for migration in migrations:
+            if migration.version in applied:
+                if applied[migration.version] != migration.checksum:
+                    print(f"Attention : {os.path.basename(migration.path)} a changé depuis son application")
+                continue
+            started = time.perf_counter()
+            try:
+                cur.execute(migration.sql())
+                cur.execute(
+                    "INSERT INTO sae.schema_migrations (version, name, checksum, duration_ms) VALUES (%s, %s, %s, %s)",
+                    (migration.version, migration.name, migration.checksum,
+                     int((time.perf_counter() - started) * 1000)),
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            print(f"Migration {migration.version:04d} ({migration.name}) appliquée "
+                  f"en {time.perf_counter() - started:.2f} s")
+            done.append(migration)
+    finally:
+        conn.rollback()
+        conn.autocommit = True
+        cur.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+        cur.close()
+    return done
+
+
+def print_status(conn) -> None:
+    cur = conn.cursor(cursor_factory=TupleCursor)
+    applied = applied_versions(cur)
+    cur.close()
+    for migration in discover():
+        state = "appliquée" if migration.version in applied else "en attente"
+        if migration.version in applied and applied[migration.version] != migration.checksum:
+            state += " (fichier modifié depuis)"
+        print(f"{migration.version:04d}  {migration.name:<40} {state}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", action="store_true", help="affiche l'état sans rien appliquer")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        if args.status:
+            print_status(conn)
+            return
+        done = migrate(conn)
+        print(f"{len(done)} migration(s) appliquée(s), schéma à jour.")
+    except Exception as e:
+        print(f"Erreur de migration : {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional, Sequence
+
+# =================================================================
+# ===== PAGINATION PAR CURSEUR (KEYSET) =====
+# Au lieu de LIMIT/OFFSET (Postgres construit puis jette toutes les lignes
+# précédentes), la page suivante repart de la dernière clé de tri vue :
+#   WHERE (clé, id) < (dernière clé, dernier id) ORDER BY clé DESC, id DESC
+# Le coût d'une page ne dépend plus de sa profondeur.
+# Les clés nullables sont triées via COALESCE(col, valeur_par_défaut) pour
+# garder une comparaison de ligne simple, compatible avec un index btree.
+# =================================================================
+
+class InvalidCursor(ValueError):
+    """Curseur illisible ou qui ne correspond pas à la route."""
+
+
+class KeyColumn:
+    """Colonne de tri : expression SQL, clé dans la ligne renvoyée, valeur qui remplace NULL."""
+
+    def __init__(self, expr: str, key: str, default=None):
+        self.expr = expr
+        self.key = key
+        self.default = default
+
+    @property
+    def sql(self) -> str:
+        if self.default is None:
+            return self.expr
+        return f"COALESCE({self.expr}, {_sql_literal(self.default)})"
+
+    def value(self, row):
+        value = row[self.key]
+        return self.default if value is None else value
+
+
+def _sql_literal(value) -> str:
+    if isinstance(value, datetime):
+        return f"TIMESTAMP '{value.isoformat(sep=' ')}'"
+    if isinstance(value, date):
+        return f"DATE '{value.isoformat()}'"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    raise TypeError(f"Valeur par défaut non supportée : {value!r}")
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        raise InvalidCursor("Curseur invalide")
+    return value
+
+
+class Keyset:
+    """Ordre de tri stable d'une route + encodage/décodage de ses curseurs."""
+
+    def __init__(self, columns: Sequence[KeyColumn], descending: bool = True):
+        self.columns = list(columns)
+        self.descending = descending
+
+    def order_by(self) -> str:
+        direction = "DESC" if self.descending else "ASC"
+        return ", ".join(f"{c.sql} {direction}" for c in self.columns)
+
+    def where(self, cursor: str):
+        """Renvoie (condition SQL, paramètres) pour reprendre après le curseur."""
+        values = self.decode(cursor)
+        op = "<" if self.descending else ">"
+        exprs = ", ".join(c.sql for c in self.columns)
+        marks = ", ".join(["%s"] * len(self.columns))
+        return f"({exprs}) {op} ({marks})", values
+
+    def next_cursor(self, rows: list, limit: int) -> Optional[str]:
+        """Curseur de la page suivante, ou None si la page courante est la dernière."""
+        if not rows or len(rows) < limit:
+            return None
+        return self.encode([c.value(rows[-1]) for c in self.columns])
+
+    def encode(self, values: Sequence) -> str:
+        raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+    def decode(self, cursor: str) -> list:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        except (ValueError, binascii.Error, UnicodeError):
+            raise InvalidCursor("Curseur invalide")
+        if not isinstance(values, list) or len(values) != len(self.columns):
+            raise InvalidCursor("Curseur invalide")
+        return [_decode_value(v) for v in values]
@@ -0,0 +1,224 @@
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Literal, Optional, Sequence
+
+from psycopg2.extensions import cursor as TupleCursor
+
+# =================================================================
+# ===== PROFILAGE DES REQUÊTES SQL =====
+# Désactivé par défaut (QUERY_PROFILER=1 pour l'activer). Chaque requête
+# exécutée par les curseurs du pool (TimedCursor) ou par Database (asyncpg)
+# est regroupée par empreinte : le texte SQL normalisé, littéraux et
+# paramètres remplacés par "?", listes IN (...) repliées. Les requêtes plus
+# lentes que `threshold_ms` sont journalisées avec leurs paramètres et, pour
+# une fraction d'entre elles (`explain_rate`, au plus une fois par
+# `explain_interval` secondes et par empreinte), avec leur plan
+# EXPLAIN (ANALYZE, BUFFERS). /admin/slow-queries donne le classement.
+# EXPLAIN ANALYZE ré-exécute la requête : seules les lectures sont
+# analysées, les écritures n'ont que le plan estimé (EXPLAIN simple).
+# =================================================================
+
+SlowQueryOrder = Literal["total", "max", "mean", "slow", "calls"]
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDERS = re.compile(r"%\([^)]*\)s|%s|\$\d+")
+_NUMBERS = re.compile(r"(?<![\w.])\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ARRAYS = re.compile(r"array\s*\[\s*\?(?:\s*,\s*\?)*\s*\]")
+_SPACES = re.compile(r"\s+")
+
+_EXPLAINABLE = ("select", "with", "values", "table", "insert", "update", "delete")
+_WRITES = re.compile(r"\b(insert|update|delete|merge)\b")
+
+
+def normalize_query(query: str) -> str:
+    """Texte SQL sans valeurs : deux requêtes de même forme donnent le même texte."""
+    text = _COMMENTS.sub(" ", query)
+    text = _STRINGS.sub("?", text)
+    text = _PLACEHOLDERS.sub("?", text)
+    text = _NUMBERS.sub("?", text)
+    text = _SPACES.sub(" ", text).strip().lower()
+    text = _LISTS.sub("(...)", text)
+    return _ARRAYS.sub("array[...]", text)
+
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.md5(normalized.encode("utf-8")).hexdigest()[:12]
+
+
+def explain_prefix(normalized: str) -> Optional[str]:
+    """EXPLAIN à utiliser pour cette requête, None si elle ne s'explique pas (DDL, SET...)."""
+    first = normalized.lstrip("( ").split(" ", 1)[0]
+    if first not in _EXPLAINABLE:
+        return None
+    if _WRITES.search(normalized):
+        return "EXPLAIN "
+    return "EXPLAIN (ANALYZE, BUFFERS) "
+
+
+def _describe_params(query: str, params, limit: int = 500) -> Optional[str]:
+    if params is None:
+        return None
+    if "password" in query.lower():
+        return "<masqués : requête sur un mot de passe>"
+    text = repr(params)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+class QueryProfiler:
+    """Statistiques par empreinte (LRU de `max_fingerprints` entrées) et journal des requêtes lentes."""
+
+    def __init__(self, enabled: bool = False, threshold_ms: float = 200.0, explain_rate: float = 0.1,
+                 explain_interval: float = 60.0, max_fingerprints: int = 500):
+        self.enabled = enabled
+        self.threshold = threshold_ms / 1000
+        self.explain_rate = explain_rate
+        self.explain_interval = explain_interval
+        self.max_fingerprints = max_fingerprints
+        self._stats: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._normalized: dict = {}     # petit cache texte -> (normalisé, empreinte)
+        self.slow_total = 0
+        self.explained_total = 0
+
+    def _identify(self, query: str):
+        known = self._normalized.get(query)
+        if known is None:
+            normalized = normalize_query(query)
+            known = (normalized, fingerprint(normalized))
+            if len(self._normalized) < 4096:
+                self._normalized[query] = known
+        return known
+
+    def observe(self, query: str, params, seconds: float) -> Optional[str]:
+        """
+        Enregistre une exécution. Renvoie le préfixe EXPLAIN à lancer si la
+        requête est lente et tirée pour l'analyse, sinon None.
+        """
+        if not isinstance(query, str):
+            query = str(query)
+        normalized, fp = self._identify(query)
+        slow = seconds >= self.threshold
+        explain = None
+        now = time.time()
+        with self._lock:
+            entry = self._stats.get(fp)
+            if entry is None:
+                entry = self._stats[fp] = {
+                    "fingerprint": fp, "query": normalized, "calls": 0, "total_seconds": 0.0,
+                    "max_seconds": 0.0, "slow_calls": 0, "last_slow": None, "plan": None, "_explained_at": 0.0,
+                }
+                while len(self._stats) > self.max_fingerprints:
+                    self._stats.popitem(last=False)
+            else:
+                self._stats.move_to_end(fp)
+            entry["calls"] += 1
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            if slow:
+                self.slow_total += 1
+                entry["slow_calls"] += 1
+                entry["last_slow"] = {
+                    "at": now, "duration_ms": round(seconds * 1000, 3),
+                    "sql": query if len(query) <= 4000 else query[:4000] + "...",
+                    "params": _describe_params(query, params),
+                }
+                if (now - entry["_explained_at"] >= self.explain_interval
+                        and random.random() < self.explain_rate):
+                    explain = explain_prefix(normalized)
+                    if explain:
+                        entry["_explained_at"] = now
+        if slow:
+            print(f"[requête lente] {seconds * 1000:.1f} ms ({fp}) {normalized[:300]} -- params: {_describe_params(query, params, 200)}")
+        return explain
+
+    def attach_plan(self, query: str, seconds: float, plan_lines: Sequence[str]) -> None:
+        normalized, fp = self._identify(query)
+        plan = "\n".join(plan_lines)
+        with self._lock:
+            self.explained_total += 1
+            entry = self._stats.get(fp)
+            if entry is not None:
+                entry["plan"] = {"at": time.time(), "duration_ms": round(seconds * 1000, 3), "text": plan}
+        print(f"[requête lente] plan ({fp}) :\n{plan}")
+
+    # ---------- EXPLAIN sur la connexion qui vient d'exécuter la requête ----------
+
+    def explain_psycopg2(self, conn, prefix: str, query: str, params, seconds: float) -> None:
+        """Dans un SAVEPOINT : une erreur d'EXPLAIN ne casse pas la transaction de la route."""
+        in_transaction = not conn.autocommit
+        cur = conn.cursor(cursor_factory=TupleCursor)
+        try:
+            if in_transaction:
+                cur.execute("SAVEPOINT muse_profiler")
+            try:
+                cur.execute(prefix + query, params)
+                lines = [row[0] for row in cur.fetchall()]
+            except Exception as e:
+                if in_transaction:
+                    cur.execute("ROLLBACK TO SAVEPOINT muse_profiler")
+                lines = [f"EXPLAIN impossible : {e}"]
+            if in_transaction:
+                cur.execute("RELEASE SAVEPOINT muse_profiler")
+            self.attach_plan(query, seconds, lines)
+        except Exception:
+            pass    # le profilage ne doit jamais faire échouer la requête
+        finally:
+            cur.close()
+
+    async def explain_asyncpg(self, conn, prefix: str, query: str, asyncpg_query: str, params, seconds: float) -> None:
+        try:
+            rows = await conn.fetch(prefix + asyncpg_query, *params)
+            lines = [row[0] for row in rows]
+        except Exception as e:
+            lines = [f"EXPLAIN impossible : {e}"]
+        self.attach_plan(query, seconds, lines)
+
+    # ---------- rapport ----------
+
+    def top(self, limit: int = 20, order: str = "total") -> list:
+        keys = {
+            "total": lambda e: e["total_seconds"],
+            "max": lambda e: e["max_seconds"],
+            "mean": lambda e: e["total_seconds"] / e["calls"],
+            "slow": lambda e: e["slow_calls"],
+            "calls": lambda e: e["calls"],
+        }
+        with self._lock:
+            entries = sorted(self._stats.values(), key=keys[order], reverse=True)[:limit]
+            report = []
+            for e in entries:
+                report.append({
+                    "fingerprint": e["fingerprint"],
+                    "query": e["query"],
+                    "calls": e["calls"],
+                    "total_ms": round(e["total_seconds"] * 1000, 3),
+                    "mean_ms": round(e["total_seconds"] * 1000 / e["calls"], 3),
+                    "max_ms": round(e["max_seconds"] * 1000, 3),
+                    "slow_calls": e["slow_calls"],
+                    "last_slow": e["last_slow"],
+                    "plan": e["plan"],
+                })
+        return report
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self.slow_total = 0
+            self.explained_total = 0
+
+    def settings(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": self.threshold * 1000,
+            "explain_rate": self.explain_rate,
+            "explain_interval_seconds": self.explain_interval,
+            "fingerprints": len(self._stats),
+            "slow_total": self.slow_total,
+            "explained_total": self.explained_total,
+        }
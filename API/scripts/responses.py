@@ -0,0 +1,124 @@
+import functools
+import inspect
+import json
+import math
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from uuid import UUID
+
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # repli sur json de la bibliothèque standard
+    orjson = None
+
+# =================================================================
+# ===== SÉRIALISATION JSON DES RÉPONSES =====
+# Avant : clean_nan() (NaN -> None) parcourait la réponse, puis
+# jsonable_encoder la reparcourait, puis json.dumps une troisième fois.
+# FastJSONResponse encode en un seul passage avec orjson, qui traite
+# nativement NaN (-> null), date/datetime, UUID, dict (RealDictRow compris)
+# et les types numpy ; Decimal passe par _default.
+# FastJSONRoute fait renvoyer FastJSONResponse directement par chaque route,
+# ce qui évite le jsonable_encoder que FastAPI applique sinon à tout retour.
+# Sans orjson : même résultat (NaN -> null) avec json, plus lent.
+# =================================================================
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value):
+    """Types qu'orjson (ou json) ne connaît pas."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return jsonable_encoder(value)
+
+
+def _sanitize(obj):
+    # Repli sans orjson : NaN/Infinity -> None et types non JSON convertis
+    if isinstance(obj, float):
+        return None if math.isnan(obj) or math.isinf(obj) else obj
+    if isinstance(obj, dict):
+        return {str(k) if not isinstance(k, str) else k: _sanitize(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return [_sanitize(v) for v in obj]
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, Decimal):
+        return _sanitize(float(obj))
+    if isinstance(obj, UUID):
+        return str(obj)
+    if obj is None or isinstance(obj, (str, int, bool)):
+        return obj
+    return _sanitize(jsonable_encoder(obj))
+
+
+def dumps(content) -> bytes:
+    """Encode `content` en JSON (octets UTF-8)."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(_sanitize(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def to_jsonable(content):
+    """Équivalent de jsonable_encoder (objets JSON purs) via le même encodeur ; utilisé par le cache."""
+    if orjson is not None:
+        return orjson.loads(dumps(content))
+    return _sanitize(content)
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class FastJSONRoute(APIRoute):
+    """
+    Route dont le résultat est emballé dans FastJSONResponse avant que FastAPI
+    ne le passe à jsonable_encoder. Les routes avec un response_model, une
+    annotation de retour ou un paramètre Response gardent le chemin standard
+    (validation pydantic, en-têtes posés sur la réponse injectée).
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        signature = inspect.signature(endpoint)
+        model = kwargs.get("response_model")
+        explicit_model = model is not None and not isinstance(model, DefaultPlaceholder)
+        injects_response = any(
+            inspect.isclass(p.annotation) and issubclass(p.annotation, Response)
+            for p in signature.parameters.values()
+        )
+        if not explicit_model and signature.return_annotation is inspect.Signature.empty and not injects_response:
+            endpoint = _wrap_endpoint(endpoint, kwargs.get("status_code"))
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _wrap_endpoint(endpoint, status_code):
+    status_code = status_code or 200
+
+    def as_response(result):
+        if isinstance(result, Response):
+            return result
+        return FastJSONResponse(result, status_code=status_code)
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_endpoint(*args, **kwargs):
+            return as_response(await endpoint(*args, **kwargs))
+        return async_endpoint
+
+    @functools.wraps(endpoint)
+    def sync_endpoint(*args, **kwargs):
+        return as_response(endpoint(*args, **kwargs))
+    return sync_endpoint
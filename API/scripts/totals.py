@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Literal, Optional, Sequence
+
+# =================================================================
+# ===== TOTAUX DES RÉPONSES PAGINÉES =====
+# Le client choisit le coût du champ "total" avec ?total= :
+#   exact    : compteur tenu par triggers (sae.row_counts) quand il existe,
+#              sinon COUNT(*) gardé en cache quelques secondes
+#   estimate : estimation du planificateur (pg_class.reltuples pour une
+#              table entière, EXPLAIN pour une requête filtrée), en cache
+#   none     : pas de total du tout
+# Avec `distinct`, les trois modes comptent les valeurs distinctes d'une
+# colonne (COUNT(DISTINCT ...), estimation du nombre de groupes) plutôt que
+# les lignes, pour rester d'accord avec un compteur exact qui les compte.
+# =================================================================
+
+TotalMode = Literal["exact", "estimate", "none"]
+
+
+def row_counter(counter: str):
+    """Requête exacte lisant un compteur de sae.row_counts (voir Tables/scriptBDDcounts.sql)."""
+    return "SELECT n AS total FROM sae.row_counts WHERE counter = %s", (counter,)
+
+
+class Totals:
+    """
+    Calcule les totaux ; les résultats coûteux (COUNT filtré, estimations)
+    sont gardés `ttl` secondes dans un petit cache LRU partagé par les routes.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ---------- cache ----------
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return value
+
+    def _store(self, key, value) -> None:
+        with self._lock:
+            self._cache[key] = (value, time.monotonic() + self.ttl)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    # ---------- logique commune ----------
+
+    def _steps(self, mode: str, table: str, where: str, params: Sequence, exact, distinct: Optional[str] = None):
+        """
+        Générateur : produit les requêtes (sql, params) à exécuter et reçoit
+        la ligne résultat de chacune ; sa valeur de retour est le total.
+        Partagé par count() (psycopg2) et acount() (Database asynchrone).
+        """
+        if mode == "none":
+            return None
+
+        from_sql = f"{table} WHERE {where}" if where else table
+        params = tuple(params)
+
+        if mode == "exact" and exact is not None:
+            row = yield exact
+            if row is not None:
+                return row["total"]
+
+        key = (mode, from_sql, params, distinct)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        total = None
+        if mode == "estimate":
+            if not where and not distinct:
+                row = yield ("SELECT reltuples::bigint AS total FROM pg_class WHERE oid = %s::regclass", (table,))
+                if row is not None and row["total"] >= 0:
+                    total = row["total"]
+            if total is None:
+                selected = f"DISTINCT {distinct}" if distinct else "1"
+                row = yield (f"EXPLAIN (FORMAT JSON) SELECT {selected} FROM {from_sql}", params)
+                total = int(row["QUERY PLAN"][0]["Plan"]["Plan Rows"])
+        else:
+            counted = f"DISTINCT {distinct}" if distinct else "*"
+            row = yield (f"SELECT COUNT({counted}) AS total FROM {from_sql}", params)
+            total = row["total"]
+
+        self._store(key, total)
+        return total
+
+    # ---------- exécution ----------
+
+    def count(self, cur, mode: str, table: str, where: str = "", params: Sequence = (), exact=None,
+              distinct: Optional[str] = None) -> Optional[int]:
+        """Total via un curseur psycopg2 (RealDictCursor)."""
+        steps = self._steps(mode, table, where, params, exact, distinct)
+        try:
+            sql, args = next(steps)
+            while True:
+                cur.execute(sql, args)
+                sql, args = steps.send(cur.fetchone())
+        except StopIteration as done:
+            return done.value
+
+    async def acount(self, db, mode: str, table: str, where: str = "", params: Sequence = (), exact=None,
+                     distinct: Optional[str] = None) -> Optional[int]:
+        """Total via Database (routes async)."""
+        steps = self._steps(mode, table, where, params, exact, distinct)
+        try:
+            sql, args = next(steps)
+            while True:
+                sql, args = steps.send(await db.fetch_one(sql, args))
+        except StopIteration as done:
+            return done.value
@@ -0,0 +1,121 @@
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List, Optional
+
+# =================================================================
+# ===== PRÉCHAUFFAGE EN ARRIÈRE-PLAN =====
+# Le démarrage de l'API n'attend plus les moteurs de recommandation :
+# chaque tâche (embeddings des artistes, matrice des musiques...) tourne
+# dans un thread lancé par le lifespan, et l'API accepte les requêtes
+# tout de suite. Une tâche en échec est relancée après `retry_delay`
+# secondes (base pas encore disponible, par exemple). Les routes qui en
+# dépendent interrogent `ready(nom)` et répondent 503 (ou une version
+# dégradée) en attendant ; /ready donne l'avancement.
+# =================================================================
+
+PENDING, RUNNING, READY, FAILED = "pending", "running", "ready", "failed"
+
+
+class WarmupTask:
+    __slots__ = ("name", "func", "state", "done", "total", "error", "attempts", "started_at", "seconds")
+
+    def __init__(self, name: str, func: Callable):
+        self.name = name
+        self.func = func
+        self.state = PENDING
+        self.done = 0
+        self.total: Optional[int] = None
+        self.error: Optional[str] = None
+        self.attempts = 0
+        self.started_at: Optional[float] = None
+        self.seconds: Optional[float] = None
+
+    def progress(self, done: int, total: Optional[int] = None) -> None:
+        """Passée à la tâche : avancement (unités propres à la tâche)."""
+        self.done = done
+        if total is not None:
+            self.total = total
+
+    def report(self) -> dict:
+        elapsed = self.seconds
+        if elapsed is None and self.started_at is not None:
+            elapsed = time.time() - self.started_at
+        return {
+            "state": self.state,
+            "done": self.done,
+            "total": self.total,
+            "percent": round(100 * self.done / self.total, 1) if self.total else (100.0 if self.state == READY else None),
+            "attempts": self.attempts,
+            "seconds": round(elapsed, 3) if elapsed is not None else None,
+            "error": self.error,
+        }
+
+
+class Warmup:
+    """
+    Tâches de préchauffage exécutées l'une après l'autre dans un thread.
+    `func(progress)` : progress(done, total) est facultatif pour la tâche.
+    """
+
+    def __init__(self, retry_delay: float = 30.0):
+        self.tasks: Dict[str, WarmupTask] = {}
+        self.retry_delay = retry_delay
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, name: str, func: Callable) -> None:
+        self.tasks[name] = WarmupTask(name, func)
+
+    def ready(self, name: Optional[str] = None) -> bool:
+        if name is not None:
+            return self.tasks[name].state == READY
+        return all(task.state == READY for task in self.tasks.values())
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        pending: List[WarmupTask] = list(self.tasks.values())
+        while pending and not self._stop.is_set():
+            failed = []
+            for task in pending:
+                if self._stop.is_set():
+                    return
+                if not self._execute(task):
+                    failed.append(task)
+            pending = failed
+            if pending:
+                self._stop.wait(self.retry_delay)
+
+    def _execute(self, task: WarmupTask) -> bool:
+        task.state = RUNNING
+        task.attempts += 1
+        task.error = None
+        task.started_at = time.time()
+        task.seconds = None
+        try:
+            task.func(task.progress)
+        except Exception as e:
+            task.state = FAILED
+            task.error = str(e)
+            task.seconds = time.time() - task.started_at
+            print(f"Préchauffage '{task.name}' : échec ({e}), nouvel essai dans {self.retry_delay:g} s")
+            if task.attempts == 1:
+                traceback.print_exc()
+            return False
+        task.state = READY
+        task.seconds = time.time() - task.started_at
+        print(f"Préchauffage '{task.name}' terminé en {task.seconds:.1f} s")
+        return True
+
+    def report(self) -> dict:
+        return {name: task.report() for name, task in self.tasks.items()}
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import pytest
+from psycopg2 import extensions
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from db_pool import ConnectionPool, PoolTimeout  # noqa: E402
+
+
+class FakeInfo:
+    transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = False
+        self.info = FakeInfo()
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class FakePool(ConnectionPool):
+    def _connect(self):
+        with self._cond:
+            self._created += 1
+        return FakeConnection()
+
+
+def test_release_request_frees_broken_connections():
+    pool = FakePool({}, min_size=0, max_size=2, timeout=0.05)
+    for _ in range(2):
+        token = pool.track_request()
+        conn = pool.getconn()
+        conn._conn.closed = 2           # connexion coupée pendant la requête
+        pool.release_request(token)
+
+    stats = pool.stats()
+    assert (stats["size"], stats["in_use"]) == (0, 0)
+    assert stats["connections_reclaimed"] == 2
+    conn = pool.getconn(track=False)
+    assert not conn.closed
+    conn.close()
+
+
+def test_release_request_skips_returned_connections():
+    pool = FakePool({}, min_size=0, max_size=1, timeout=0.05)
+    token = pool.track_request()
+    pool.getconn().close()
+    pool.release_request(token)
+
+    stats = pool.stats()
+    assert (stats["size"], stats["idle"], stats["connections_reclaimed"]) == (1, 1, 0)
+
+
+def test_getconn_times_out_when_exhausted():
+    pool = FakePool({}, min_size=0, max_size=1, timeout=0.05)
+    conn = pool.getconn(track=False)
+    with pytest.raises(PoolTimeout):
+        pool.getconn(track=False)
+    conn.close()
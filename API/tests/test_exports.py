@@ -0,0 +1,76 @@
+import os
+import sys
+from collections import namedtuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from exports import ExportStream  # noqa: E402
+
+Column = namedtuple("Column", "name")
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self._rows = list(rows)
+        self.description = [Column("track_id"), Column("track_title")]
+        self.closed = False
+
+    def execute(self, query):
+        pass
+
+    def fetchmany(self, size):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.cursors = []
+        self.returned = 0
+
+    def cursor(self, name=None, cursor_factory=None):
+        cur = FakeCursor(self.rows)
+        self.cursors.append(cur)
+        return cur
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.returned += 1
+
+
+def test_stream_returns_connection_once():
+    conn = FakeConnection([(i, f"Titre {i}") for i in range(5)])
+    stream = ExportStream(conn, "tracks", "csv", chunk_rows=2)
+    data = b"".join(stream)
+    stream.release()                    # tâche de fond après un envoi complet
+
+    assert data.decode().splitlines()[0] == "track_id,track_title"
+    assert len(data.decode().splitlines()) == 6
+    assert conn.returned == 1
+
+
+def test_release_after_disconnect_leaves_connection_to_generator():
+    conn = FakeConnection([(i, f"Titre {i}") for i in range(5)])
+    stream = ExportStream(conn, "tracks", "ndjson", chunk_rows=2)
+    generator = iter(stream)
+    next(generator)                     # envoi commencé, puis le client coupe
+    stream.release()
+    assert conn.returned == 0
+    generator.close()                   # finalisation du générateur, plus tard
+    assert conn.returned == 1
+    assert conn.cursors[0].closed
+
+
+def test_release_before_start_keeps_generator_off_the_connection():
+    conn = FakeConnection([(1, "Titre")])
+    stream = ExportStream(conn, "tracks", "ndjson")
+    stream.release()                    # client parti avant le premier paquet
+    assert list(stream) == []
+    assert conn.returned == 1
+    assert conn.cursors == []
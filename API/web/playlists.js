@@ -736,19 +736,23 @@ function showPlaylistModal(playlist) {
     function preFetchAllTracks() {
         if (plPreFetchStarted) return;
         plPreFetchStarted = true;
-        tracks.forEach(t => {
-            if (plFetchedTracks[t.track_id]) return;
-            fetch(`${API_BASE_URL}/tracks/${t.track_id}`)
+        const missingIds = tracks.map(t => t.track_id).filter(id => !plFetchedTracks[id]);
+        // Par lots de 200 (limite de GET /tracks?ids=)
+        for (let i = 0; i < missingIds.length; i += 200) {
+            const batch = missingIds.slice(i, i + 200);
+            fetch(`${API_BASE_URL}/tracks?${batch.map(id => 'ids=' + id).join('&')}`)
                 .then(r => r.json())
-                .then(track => {
-                    plFetchedTracks[t.track_id] = {
-                        url: track.track_file,
-                        title: track.track_title,
-                        artist: track.artist_info?.artist_name || 'Artiste inconnu'
-                    };
+                .then(data => {
+                    (data.results || []).forEach(track => {
+                        plFetchedTracks[track.track_id] = {
+                            url: track.track_file,
+                            title: track.track_title,
+                            artist: track.artist_info?.artist_name || 'Artiste inconnu'
+                        };
+                    });
                 })
                 .catch(() => { });
-        });
+        }
     }
 
     function closeModal() {
@@ -0,0 +1,156 @@
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# ==================================================
+# RECHERCHE DES PLUS PROCHES VOISINS (embeddings d'artistes)
+# Backends interchangeables, choisis par RECO_ANN_BACKEND :
+#   exact : produit scalaire avec toute la matrice (référence)
+#   ivf   : index inversé. Les vecteurs sont répartis entre `nlist`
+#           centroïdes (k-means sphérique) ; une requête ne compare que
+#           les vecteurs des `nprobe` listes les plus proches. nprobe
+#           règle le compromis rappel / latence (RECO_ANN_NPROBE).
+# Les tableaux de l'index (préfixe ivf_) sont enregistrés dans le même
+# artefact que la matrice (artifacts.py) : même version, même mmap.
+# Les versions suivantes reprennent les centroïdes et n'affectent que les
+# vecteurs ajoutés (index_arrays), jusqu'à ce que le catalogue ait grossi
+# de RETRAIN_GROWTH depuis l'entraînement.
+# ==================================================
+
+BACKEND = os.getenv("RECO_ANN_BACKEND", "ivf")
+NLIST = int(os.getenv("RECO_ANN_NLIST", 0))           # 0 : 4 x racine(N)
+NPROBE = int(os.getenv("RECO_ANN_NPROBE", 8))
+MIN_ROWS = int(os.getenv("RECO_ANN_MIN_ROWS", 5000))    # en dessous : recherche exacte
+RETRAIN_GROWTH = 1.5
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices des k meilleurs scores, triés (argpartition puis tri des k seuls)."""
+    k = min(k, scores.size)
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    top = np.argpartition(scores, scores.size - k)[-k:]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class ExactIndex:
+    name = "exact"
+
+    def __init__(self, matrix: np.ndarray, arrays: Optional[Dict[str, np.ndarray]] = None):
+        self.matrix = matrix
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = self.matrix @ query
+        top = _top(scores, k)
+        return top, scores[top]
+
+
+class IVFIndex:
+    name = "ivf"
+
+    def __init__(self, matrix: np.ndarray, arrays: Dict[str, np.ndarray], nprobe: int = NPROBE):
+        self.matrix = matrix
+        self.centroids = arrays["ivf_centroids"]
+        self.offsets = arrays["ivf_offsets"]
+        self.rows = arrays["ivf_rows"]
+        self.nprobe = nprobe
+
+    # ---------- construction ----------
+
+    @staticmethod
+    def train(matrix: np.ndarray, nlist: Optional[int] = None, iterations: int = 10,
+              sample: int = 50000, seed: int = 0) -> np.ndarray:
+        """Centroïdes (nlist, D) normalisés, k-means sphérique sur un échantillon."""
+        n = len(matrix)
+        nlist = max(1, min(nlist or int(4 * np.sqrt(n)), n))
+        rng = np.random.default_rng(seed)
+        data = np.asarray(matrix[np.sort(rng.choice(n, min(n, sample), replace=False))], dtype=np.float32)
+        centroids = data[rng.choice(len(data), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = IVFIndex.assign(data, centroids)
+            order = np.argsort(labels, kind="stable")
+            counts = np.bincount(labels, minlength=nlist)
+            empty = counts == 0
+            # Somme des vecteurs de chaque liste non vide (lignes triées par liste)
+            sums = np.zeros_like(centroids)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            sums[~empty] = np.add.reduceat(data[order], starts[~empty], axis=0)
+            # Liste vide : centroïde replacé sur un vecteur tiré au hasard
+            sums[empty] = data[rng.choice(len(data), int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.where(norms == 0, 1.0, norms)
+        return centroids.astype(np.float32)
+
+    @staticmethod
+    def assign(matrix: np.ndarray, centroids: np.ndarray, block: int = 8192) -> np.ndarray:
+        labels = np.empty(len(matrix), dtype=np.int32)
+        for start in range(0, len(matrix), block):
+            labels[start:start + block] = np.argmax(matrix[start:start + block] @ centroids.T, axis=1)
+        return labels
+
+    @staticmethod
+    def _pack(labels: np.ndarray, nlist: int) -> Dict[str, np.ndarray]:
+        rows = np.argsort(labels, kind="stable").astype(np.int64)
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=nlist), out=offsets[1:])
+        return {"ivf_offsets": offsets, "ivf_rows": rows, "ivf_labels": labels}
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, nlist: Optional[int] = None) -> Dict[str, np.ndarray]:
+        centroids = cls.train(matrix, nlist)
+        return {"ivf_centroids": centroids, "ivf_trained_rows": np.array(len(matrix), dtype=np.int64),
+                **cls._pack(cls.assign(matrix, centroids), len(centroids))}
+
+    # ---------- recherche ----------
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        probes = _top(self.centroids @ query, self.nprobe)
+        # Lignes triées : lecture du mmap dans l'ordre du fichier
+        rows = np.sort(np.concatenate([self.rows[self.offsets[p]:self.offsets[p + 1]] for p in probes]))
+        scores = self.matrix[rows] @ query
+        top = _top(scores, k)
+        return rows[top], scores[top]
+
+
+BACKENDS = {"exact": ExactIndex, "ivf": IVFIndex}
+
+
+def index_arrays(matrix: np.ndarray, previous: Optional[Dict[str, np.ndarray]] = None,
+                 previous_rows: int = 0, changed_rows=None) -> Dict[str, np.ndarray]:
+    """
+    Tableaux d'index à publier avec `matrix` ({} pour exact ou petit catalogue).
+    Les centroïdes de `previous` (index d'une version antérieure) sont repris
+    tant que le catalogue n'a pas grossi de RETRAIN_GROWTH ; si `previous`
+    indexait les `previous_rows` premières lignes, seules les suivantes et
+    les lignes `changed_rows` (vecteur remplacé) sont affectées à une liste.
+    """
+    if BACKEND != "ivf" or len(matrix) < MIN_ROWS:
+        return {}
+    centroids = previous.get("ivf_centroids") if previous else None
+    if centroids is None or centroids.shape[1] != matrix.shape[1] \
+            or len(matrix) > RETRAIN_GROWTH * int(previous["ivf_trained_rows"]):
+        return IVFIndex.build(matrix, NLIST or None)
+    centroids = np.asarray(centroids)
+    if previous_rows and len(previous["ivf_labels"]) == previous_rows:
+        labels = np.concatenate([previous["ivf_labels"], IVFIndex.assign(matrix[previous_rows:], centroids)])
+        if changed_rows is not None and len(changed_rows):
+            labels[changed_rows] = IVFIndex.assign(matrix[changed_rows], centroids)
+    else:
+        labels = IVFIndex.assign(matrix, centroids)
+    return {"ivf_centroids": centroids, "ivf_trained_rows": np.asarray(previous["ivf_trained_rows"]),
+            **IVFIndex._pack(labels, len(centroids))}
+
+
+def open_index(matrix: np.ndarray, arrays: Dict[str, np.ndarray]):
+    """Index de recherche d'une version de l'artefact (exact si ses tableaux ivf_ manquent)."""
+    backend = BACKENDS.get(BACKEND, ExactIndex)
+    if backend is IVFIndex and "ivf_centroids" not in arrays:
+        backend = ExactIndex
+    return backend(matrix, arrays)
+
+
+def describe(index) -> dict:
+    if isinstance(index, IVFIndex):
+        return {"backend": index.name, "nlist": len(index.centroids), "nprobe": index.nprobe}
+    return {"backend": index.name}
@@ -0,0 +1,244 @@
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import numpy as np
+
+# ==================================================
+# ARTEFACTS PARTAGÉS ENTRE WORKERS
+# Les matrices des moteurs de recommandation sont écrites une fois sur
+# disque (un .npy par tableau) et ouvertes en mmap lecture seule par
+# chaque worker : chargement quasi immédiat, et les pages sont partagées
+# par le cache du système au lieu d'être copiées N fois.
+#
+#   <RECO_ARTIFACTS_DIR>/<nom>/<version>/*.npy + meta.json
+#   <RECO_ARTIFACTS_DIR>/<nom>/CURRENT      -> version active
+#
+# Une version est écrite dans un dossier temporaire puis renommée ;
+# CURRENT est remplacé par os.replace (atomique). Les workers relisent
+# CURRENT au plus toutes les `check_interval` secondes et basculent sur
+# la nouvelle version sans redémarrage.
+# ==================================================
+
+ARTIFACTS_DIR = os.getenv(
+    "RECO_ARTIFACTS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifacts"),
+)
+KEEP_VERSIONS = 3
+
+
+# ==================================================
+# COLONNES DE TEXTE (mmap impossible pour un tableau d'objets)
+# ==================================================
+def encode_strings(prefix: str, values) -> Dict[str, np.ndarray]:
+    """Textes (None admis) -> octets UTF-8 concaténés + décalages + masque des None."""
+    encoded = [b"" if v is None else str(v).encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return {
+        f"{prefix}_data": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        f"{prefix}_offsets": offsets,
+        f"{prefix}_null": np.array([v is None for v in values], dtype=bool),
+    }
+
+
+def append_strings(arrays: Dict[str, np.ndarray], prefix: str, values) -> Dict[str, np.ndarray]:
+    """Colonne `prefix` de `arrays` suivie de `values`, sans décoder l'existant."""
+    added = encode_strings(prefix, values)
+    offsets = arrays[f"{prefix}_offsets"]
+    return {
+        f"{prefix}_data": np.concatenate([arrays[f"{prefix}_data"], added[f"{prefix}_data"]]),
+        f"{prefix}_offsets": np.concatenate([offsets, added[f"{prefix}_offsets"][1:] + offsets[-1]]),
+        f"{prefix}_null": np.concatenate([arrays[f"{prefix}_null"], added[f"{prefix}_null"]]),
+    }
+
+
+class StringColumn:
+    """Vue indexable sur une colonne encodée par encode_strings."""
+
+    __slots__ = ("_data", "_offsets", "_null")
+
+    def __init__(self, arrays: Dict[str, np.ndarray], prefix: str):
+        self._data = arrays[f"{prefix}_data"]
+        self._offsets = arrays[f"{prefix}_offsets"]
+        self._null = arrays[f"{prefix}_null"]
+
+    def __len__(self) -> int:
+        return len(self._null)
+
+    def __getitem__(self, i) -> Optional[str]:
+        if self._null[i]:
+            return None
+        start, end = self._offsets[i], self._offsets[i + 1]
+        return self._data[start:end].tobytes().decode("utf-8")
+
+
+# ==================================================
+# STOCKAGE
+# ==================================================
+class Artifact:
+    """Une version chargée : tableaux en mmap (lecture seule) + métadonnées."""
+
+    def __init__(self, name: str, version: str, arrays: Dict[str, np.ndarray], meta: dict):
+        self.name = name
+        self.version = version
+        self.arrays = arrays
+        self.meta = meta
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        return self.arrays[key]
+
+    def strings(self, prefix: str) -> StringColumn:
+        return StringColumn(self.arrays, prefix)
+
+    @property
+    def built_at(self) -> float:
+        # Version complétée à partir d'une autre (ajout de lignes) : date de la
+        # dernière construction complète, pour que is_stale la déclenche encore
+        return self.meta.get("base_built_at", self.meta.get("built_at", 0.0))
+
+    def nbytes(self) -> int:
+        return int(sum(a.nbytes for a in self.arrays.values()))
+
+
+class ArtifactStore:
+    def __init__(self, root: str = ARTIFACTS_DIR):
+        self.root = root
+
+    def _dir(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def current_version(self, name: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self._dir(name), "CURRENT"), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def save(self, name: str, arrays: Dict[str, np.ndarray], meta: Optional[dict] = None) -> str:
+        """Écrit une nouvelle version et la rend active ; renvoie la version."""
+        base = self._dir(name)
+        os.makedirs(base, exist_ok=True)
+        version = time.strftime("%Y%m%dT%H%M%S") + f"-{os.getpid()}-{time.perf_counter_ns() % 1000000:06d}"
+        tmp = os.path.join(base, f".tmp-{version}")
+        os.makedirs(tmp)
+        try:
+            for key, array in arrays.items():
+                array = np.asarray(array)
+                if array.dtype == object:
+                    raise TypeError(f"{name}.{key} : tableau d'objets, utiliser encode_strings")
+                np.save(os.path.join(tmp, f"{key}.npy"), array, allow_pickle=False)
+            with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({**(meta or {}), "version": version, "built_at": time.time()}, f)
+            os.rename(tmp, os.path.join(base, version))
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        pointer = os.path.join(base, f".CURRENT-{version}")
+        with open(pointer, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(pointer, os.path.join(base, "CURRENT"))
+        self._prune(name, keep=version)
+        return version
+
+    def _prune(self, name: str, keep: str) -> None:
+        # Anciennes versions : un worker peut encore les avoir en mmap (Linux : sans
+        # conséquence ; Windows refuse la suppression, on réessaiera au prochain save)
+        base = self._dir(name)
+        versions = sorted(v for v in os.listdir(base) if not v.startswith(".") and v != "CURRENT")
+        for version in versions[:-KEEP_VERSIONS]:
+            if version != keep:
+                shutil.rmtree(os.path.join(base, version), ignore_errors=True)
+
+    def load(self, name: str, version: Optional[str] = None) -> Optional[Artifact]:
+        version = version or self.current_version(name)
+        if version is None:
+            return None
+        path = os.path.join(self._dir(name), version)
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {
+            filename[:-4]: np.load(os.path.join(path, filename), mmap_mode="r", allow_pickle=False)
+            for filename in os.listdir(path) if filename.endswith(".npy")
+        }
+        return Artifact(name, version, arrays, meta)
+
+    def status(self) -> dict:
+        report = {}
+        if not os.path.isdir(self.root):
+            return report
+        for name in sorted(os.listdir(self.root)):
+            base = self._dir(name)
+            if not os.path.isdir(base):
+                continue
+            versions = sorted(v for v in os.listdir(base) if not v.startswith(".") and v != "CURRENT")
+            report[name] = {"current": self.current_version(name), "versions": versions}
+        return report
+
+
+class MappedArtifact:
+    """
+    Version active d'un artefact pour ce process. get() relit CURRENT au plus
+    toutes les `check_interval` secondes et bascule si la version a changé
+    (simple réaffectation : un appel en cours garde l'ancienne version).
+    """
+
+    def __init__(self, store: ArtifactStore, name: str, check_interval: float = 5.0):
+        self.store = store
+        self.name = name
+        self.check_interval = check_interval
+        self.artifact: Optional[Artifact] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[Artifact]:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self.refresh()
+        return self.artifact
+
+    def refresh(self) -> Optional[Artifact]:
+        with self._lock:
+            self._checked_at = time.monotonic()
+            version = self.store.current_version(self.name)
+            if version is not None and (self.artifact is None or self.artifact.version != version):
+                try:
+                    self.artifact = self.store.load(self.name, version)
+                except FileNotFoundError:
+                    pass    # version supprimée entre-temps : on garde l'actuelle
+        return self.artifact
+
+    def publish(self, arrays: Dict[str, np.ndarray], meta: Optional[dict] = None) -> Artifact:
+        """Écrit une nouvelle version et la charge immédiatement dans ce process."""
+        version = self.store.save(self.name, arrays, meta)
+        with self._lock:
+            self.artifact = self.store.load(self.name, version)
+            self._checked_at = time.monotonic()
+        return self.artifact
+
+
+# ==================================================
+# VERROU DE CONSTRUCTION (un seul worker construit)
+# ==================================================
+@contextmanager
+def build_lock(conn, name: str):
+    """pg_advisory_lock propre à l'artefact : les autres workers attendent puis relisent CURRENT."""
+    cur = conn.cursor()
+    cur.execute("SELECT pg_advisory_lock(hashtext(%s))", (f"reco_artifact:{name}",))
+    try:
+        yield
+    finally:
+        conn.rollback()     # transaction éventuellement en échec : le verrou de session reste
+        cur.execute("SELECT pg_advisory_unlock(hashtext(%s))", (f"reco_artifact:{name}",))
+        cur.close()
+
+
+def is_stale(artifact: Optional[Artifact], max_age_hours: float) -> bool:
+    if artifact is None:
+        return True
+    return max_age_hours > 0 and time.time() - artifact.built_at > max_age_hours * 3600
@@ -0,0 +1,227 @@
+"""
+Vecteurs audio réduits pour la présélection de /reco/tracks/audio.
+
+    python Recommendation/audio_reduction.py                      # RECO_AUDIO_DIMS dimensions, ACP
+    python Recommendation/audio_reduction.py --dims 32 64 --method random
+    python Recommendation/audio_reduction.py --missing            # projette seulement les nouvelles musiques
+
+Les 224 dimensions de temporal_features_vectors sont projetées sur --dims
+dimensions, par ACP ou par projection aléatoire, puis écrites dans
+sae.temporal_features_reduced (Tables/scriptBDDaudio.sql) avec un index
+HNSW partiel par taille. Le moteur audio y cherche ses candidats avant de
+les reclasser sur les vecteurs complets (item_based_alexis.recommend_audio).
+Une taille est remplacée dans une seule transaction : les requêtes en cours
+continuent de lire l'ancienne version jusqu'au COMMIT.
+"""
+import argparse
+import io
+import struct
+import time
+
+import numpy as np
+import psycopg2
+
+import item_based_alexis
+
+FULL_DIMS = 224
+FIT_SAMPLE = 50000
+LOAD_BATCH = 10000
+INDEX_BUILD_MEMORY = "512MB"    # graphe HNSW construit en mémoire (64 Mo par défaut : construction sur disque, lente)
+METHODS = ("pca", "random")
+# vector_send / vector_recv : dimension (int16), réservé (int16), puis les float32 big-endian
+_VECTOR_HEADER = 4
+
+
+def index_name(dims: int) -> str:
+    return f"idx_tfr_hnsw_{int(dims)}"
+
+
+# ==================================================
+# LECTURE DES VECTEURS COMPLETS
+# ==================================================
+
+def load_vectors(conn, missing_dims: int = 0):
+    """
+    (track_ids, matrice float32 normalisée) de temporal_features_vectors,
+    lue en binaire par paquets avec un curseur côté serveur. Avec
+    `missing_dims`, seulement les musiques sans vecteur réduit de cette taille.
+    """
+    where = ""
+    if missing_dims:
+        where = ("WHERE NOT EXISTS (SELECT 1 FROM sae.temporal_features_reduced r "
+                 f"WHERE r.dims = {int(missing_dims)} AND r.track_id = v.track_id)")
+    cur = conn.cursor(name="audio_vectors")
+    cur.itersize = LOAD_BATCH
+    cur.execute(f"SELECT v.track_id, sae.vector_send(v.audio_vector) FROM sae.temporal_features_vectors v {where} ORDER BY v.track_id")
+    ids, blocks = [], []
+    while True:
+        rows = cur.fetchmany(LOAD_BATCH)
+        if not rows:
+            break
+        ids.extend(r[0] for r in rows)
+        # Une ligne = en-tête de 4 octets (la place d'un float) + FULL_DIMS floats
+        raw = np.frombuffer(b"".join(bytes(r[1]) for r in rows), dtype=">f4").reshape(len(rows), FULL_DIMS + 1)
+        blocks.append(raw[:, 1:].astype(np.float32))
+    cur.close()
+    conn.rollback()
+    matrix = np.concatenate(blocks) if blocks else np.empty((0, FULL_DIMS), dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms == 0, 1.0, norms)
+    return np.asarray(ids, dtype=np.int64), matrix
+
+
+# ==================================================
+# PROJECTION
+# ==================================================
+
+def fit_projection(matrix: np.ndarray, dims: int, method: str = "pca", seed: int = 0):
+    """
+    Matrice de projection (dims, 224) float32 et part de variance conservée.
+    pca    : ACP non centrée (vecteurs propres de XᵀX) : la meilleure
+             approximation de rang `dims` des produits scalaires, donc des
+             distances cosinus entre vecteurs normalisés. Une ACP centrée et
+             réduite (Python/Graphs/acp.py) décrirait l'écart à la moyenne,
+             pas l'angle entre deux musiques.
+    random : projection gaussienne (Johnson-Lindenstrauss), sans apprentissage.
+    """
+    if not 0 < dims < matrix.shape[1]:
+        raise ValueError(f"dims doit être entre 1 et {matrix.shape[1] - 1}")
+    rng = np.random.default_rng(seed)
+    if method == "random":
+        components = rng.standard_normal((dims, matrix.shape[1])) / np.sqrt(dims)
+        return components.astype(np.float32), None
+    if method != "pca":
+        raise ValueError(f"méthode inconnue : {method}")
+    sample = matrix
+    if len(matrix) > FIT_SAMPLE:
+        sample = matrix[np.sort(rng.choice(len(matrix), FIT_SAMPLE, replace=False))]
+    sample = sample.astype(np.float64)
+    eigenvalues, eigenvectors = np.linalg.eigh(sample.T @ sample)
+    top = np.argsort(eigenvalues)[::-1][:dims]
+    explained = float(eigenvalues[top].sum() / eigenvalues.sum()) if eigenvalues.sum() > 0 else 0.0
+    return eigenvectors[:, top].T.astype(np.float32), explained
+
+
+def project(matrix: np.ndarray, components: np.ndarray) -> np.ndarray:
+    return np.asarray(matrix @ components.T, dtype=np.float32)
+
+
+def read_projection(conn, dims: int) -> np.ndarray:
+    cur = conn.cursor()
+    cur.execute("SELECT components FROM sae.audio_projection WHERE dims = %s", (dims,))
+    row = cur.fetchone()
+    cur.close()
+    conn.rollback()
+    if row is None:
+        raise LookupError(f"Aucune projection en {dims} dimensions : lancer audio_reduction.py --dims {dims}")
+    return np.frombuffer(bytes(row[0]), dtype=">f4").reshape(dims, FULL_DIMS).astype(np.float32)
+
+
+# ==================================================
+# ÉCRITURE (COPY binaire)
+# ==================================================
+
+def _copy_stream(dims: int, ids: np.ndarray, reduced: np.ndarray) -> io.BytesIO:
+    """Flux COPY ... (FORMAT binary) des lignes (dims, track_id, reduced_vector)."""
+    row = np.dtype([
+        ("fields", ">i2"),
+        ("dims_len", ">i4"), ("dims", ">i4"),
+        ("track_len", ">i4"), ("track_id", ">i4"),
+        ("vector_len", ">i4"), ("vector_dim", ">i2"), ("unused", ">i2"), ("vector", ">f4", (dims,)),
+    ])
+    rows = np.zeros(len(ids), dtype=row)
+    rows["fields"] = 3
+    rows["dims_len"] = 4
+    rows["dims"] = dims
+    rows["track_len"] = 4
+    rows["track_id"] = ids
+    rows["vector_len"] = _VECTOR_HEADER + 4 * dims
+    rows["vector_dim"] = dims
+    rows["vector"] = reduced
+    header = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+    return io.BytesIO(header + rows.tobytes() + struct.pack(">h", -1))
+
+
+def write_reduced(cur, dims: int, ids: np.ndarray, reduced: np.ndarray) -> None:
+    cur.copy_expert(
+        "COPY sae.temporal_features_reduced (dims, track_id, reduced_vector) FROM STDIN WITH (FORMAT binary)",
+        _copy_stream(dims, ids, reduced),
+    )
+
+
+def build(conn, dims: int, method: str = "pca", ids=None, matrix=None) -> dict:
+    """
+    (Re)calcule la taille `dims` : projection ajustée sur tout le catalogue,
+    vecteurs réduits et index HNSW partiel, dans une transaction.
+    `ids` / `matrix` : vecteurs déjà lus par load_vectors (benchmark).
+    """
+    started = time.perf_counter()
+    if matrix is None:
+        ids, matrix = load_vectors(conn)
+    if len(ids) == 0:
+        raise RuntimeError("temporal_features_vectors est vide : lancer populateFinalDLC.py")
+    components, explained = fit_projection(matrix, dims, method)
+    reduced = project(matrix, components)
+
+    cur = conn.cursor()
+    # Lignes de l'ancienne version supprimées en cascade
+    cur.execute("DELETE FROM sae.audio_projection WHERE dims = %s", (dims,))
+    cur.execute(
+        "INSERT INTO sae.audio_projection (dims, method, explained_variance, tracks, components) "
+        "VALUES (%s, %s, %s, %s, %s)",
+        (dims, method, explained, len(ids), psycopg2.Binary(components.astype(">f4").tobytes())),
+    )
+    write_reduced(cur, dims, ids, reduced)
+    # Créé une fois : les versions suivantes sont insérées dans l'index existant
+    # (pas de DROP INDEX, qui bloquerait les lectures de toutes les tailles)
+    cur.execute("SELECT set_config('maintenance_work_mem', %s, true)", (INDEX_BUILD_MEMORY,))
+    cur.execute(
+        f"CREATE INDEX IF NOT EXISTS {index_name(dims)} ON sae.temporal_features_reduced "
+        f"USING hnsw ((reduced_vector::vector({int(dims)})) vector_cosine_ops) WHERE dims = {int(dims)}"
+    )
+    cur.execute("ANALYZE sae.temporal_features_reduced")
+    conn.commit()
+    cur.close()
+    return {"dims": dims, "method": method, "tracks": len(ids), "explained_variance": explained,
+            "seconds": round(time.perf_counter() - started, 2)}
+
+
+def project_missing(conn, dims: int) -> int:
+    """Projette les musiques ajoutées depuis le dernier ajustement (projection en base)."""
+    components = read_projection(conn, dims)
+    ids, matrix = load_vectors(conn, missing_dims=dims)
+    if len(ids):
+        cur = conn.cursor()
+        write_reduced(cur, dims, ids, project(matrix, components))
+        conn.commit()
+        cur.close()
+    return len(ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dims", type=int, nargs="+", default=[item_based_alexis.AUDIO_DIMS or 64],
+                        help="tailles des vecteurs réduits")
+    parser.add_argument("--method", choices=METHODS, default="pca")
+    parser.add_argument("--missing", action="store_true",
+                        help="projette seulement les musiques sans vecteur réduit, sans réajuster")
+    args = parser.parse_args()
+
+    conn = item_based_alexis.get_connection()
+    try:
+        if args.missing:
+            for dims in args.dims:
+                print(f"{dims} dimensions : {project_missing(conn, dims)} musique(s) projetée(s)")
+            return
+        ids, matrix = load_vectors(conn)
+        for dims in args.dims:
+            report = build(conn, dims, args.method, ids, matrix)
+            explained = report["explained_variance"]
+            print(f"{dims} dimensions ({args.method}) : {report['tracks']} musiques en {report['seconds']:.1f} s"
+                  + (f", variance conservée {explained:.1%}" if explained is not None else ""))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
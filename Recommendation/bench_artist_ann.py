@@ -0,0 +1,79 @@
+"""
+Rappel et latence de l'index approché des embeddings d'artistes (ann.py)
+par rapport à la recherche exacte.
+
+    python Recommendation/bench_artist_ann.py                       # artefact 'artists' (.env)
+    python Recommendation/bench_artist_ann.py --synthetic 200000 --nprobe 1 4 8 16 32
+
+Pour chaque nprobe : rappel@k moyen (part des k vrais plus proches voisins
+retrouvés) et latence moyenne d'une requête, sur --queries profils tirés
+au hasard (moyenne de 1 à 3 artistes, comme /reco/artists).
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ann import ExactIndex, IVFIndex
+
+
+def synthetic(n: int, dim: int = 384, clusters: int = 500) -> np.ndarray:
+    # Embeddings regroupés par thèmes, comme ceux des biographies d'artistes
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    matrix = centers[rng.integers(0, clusters, n)] + 0.9 * rng.standard_normal((n, dim)).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix
+
+
+def from_artifact() -> np.ndarray:
+    import item_based_stanislas
+    artifact = item_based_stanislas._get_cache()
+    if artifact is None or artifact["ids"].size == 0:
+        raise SystemExit("Aucun embedding d'artiste : lancer l'API ou initialize_artist_system() d'abord")
+    return np.asarray(artifact["matrix"])
+
+
+def queries(matrix: np.ndarray, count: int) -> np.ndarray:
+    rng = np.random.default_rng(1)
+    result = np.empty((count, matrix.shape[1]), dtype=np.float32)
+    for i in range(count):
+        profile = matrix[rng.choice(len(matrix), rng.integers(1, 4), replace=False)].mean(axis=0)
+        result[i] = profile / (np.linalg.norm(profile) or 1.0)
+    return result
+
+
+def run(index, targets: np.ndarray, k: int):
+    started = time.perf_counter()
+    found = [index.search(q, k)[0] for q in targets]
+    return found, (time.perf_counter() - started) / len(targets) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="nombre d'artistes générés au lieu de l'artefact")
+    parser.add_argument("--k", type=int, default=10, help="voisins demandés")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nlist", type=int, default=0, help="listes de l'index (0 : 4 x racine(N))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    matrix = synthetic(args.synthetic) if args.synthetic else from_artifact()
+    targets = queries(matrix, args.queries)
+
+    started = time.perf_counter()
+    arrays = IVFIndex.build(matrix, args.nlist or None)
+    build_s = time.perf_counter() - started
+    nlist = len(arrays["ivf_centroids"])
+    print(f"{len(matrix)} artistes x {matrix.shape[1]}, index IVF nlist={nlist} construit en {build_s:.1f} s")
+
+    truth, exact_ms = run(ExactIndex(matrix), targets, args.k)
+    print(f"exact          : rappel@{args.k} 1.000, {exact_ms:.2f} ms/requête")
+    for nprobe in args.nprobe:
+        found, ms = run(IVFIndex(matrix, arrays, nprobe=nprobe), targets, args.k)
+        recall = np.mean([np.isin(t, f).mean() for t, f in zip(truth, found)])
+        print(f"ivf nprobe={nprobe:<4}: rappel@{args.k} {recall:.3f}, {ms:.2f} ms/requête (x{exact_ms / ms:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Rappel et latence de /reco/tracks/audio selon la taille des vecteurs réduits
+de la présélection (audio_reduction.py), par rapport à la recherche exacte.
+
+    python Recommendation/bench_audio_reduction.py                     # base du .env
+    python Recommendation/bench_audio_reduction.py --dims 16 32 64 128 --method random --queries 500
+
+Chaque taille de --dims est (re)calculée en base comme le ferait
+audio_reduction.py, puis --queries musiques tirées au hasard servent de
+point de départ. Référence : les k plus proches voisins exacts (cosinus sur
+les 224 dimensions, calculés en numpy). Pour chaque configuration (0 =
+index HNSW des vecteurs complets) : rappel@k moyen, latence médiane et p95
+d'un appel à recommend_audio, taille de l'index HNSW.
+"""
+import argparse
+import time
+
+import numpy as np
+import psycopg2.extras
+
+import audio_reduction
+import item_based_alexis
+
+
+def exact_neighbours(matrix: np.ndarray, rows: np.ndarray, ids: np.ndarray, k: int) -> list:
+    truth = []
+    for row in rows:
+        scores = matrix @ matrix[row]
+        scores[row] = -np.inf           # la musique de départ est exclue
+        top = np.argpartition(scores, len(scores) - k)[-k:]
+        truth.append(set(ids[top].tolist()))
+    return truth
+
+
+def index_size(cur, name: str) -> int:
+    cur.execute("SELECT pg_relation_size(to_regclass(%s)) AS size", (f"sae.{name}",))
+    return cur.fetchone()["size"] or 0
+
+
+def run(conn, cur, seeds: list, truth: list, k: int, ef_search: int, dims: int):
+    latencies, recalls = [], []
+    for seed, expected in zip(seeds, truth):
+        started = time.perf_counter()
+        found = item_based_alexis.recommend_audio(cur, [[seed]], limit=k, ef_search=ef_search, dims=dims)[0]
+        latencies.append((time.perf_counter() - started) * 1000)
+        conn.rollback()
+        recalls.append(len(expected & {r["track_id"] for r in found}) / k)
+    return float(np.mean(recalls)), float(np.median(latencies)), float(np.percentile(latencies, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dims", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("--method", choices=audio_reduction.METHODS, default="pca")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10, help="voisins demandés")
+    parser.add_argument("--ef-search", type=int, default=item_based_alexis.EF_SEARCH_DEFAULT)
+    parser.add_argument("--rerank-factor", type=int, default=item_based_alexis.RERANK_FACTOR,
+                        help="candidats présélectionnés = k x facteur")
+    parser.add_argument("--reuse", action="store_true", help="garde les tailles déjà calculées en base")
+    args = parser.parse_args()
+    item_based_alexis.RERANK_FACTOR = args.rerank_factor
+
+    conn = item_based_alexis.get_connection()
+    ids, matrix = audio_reduction.load_vectors(conn)
+    if len(ids) <= args.k:
+        raise SystemExit("Pas assez de vecteurs audio : lancer populateFinalDLC.py")
+    print(f"{len(ids)} musiques x {matrix.shape[1]} dimensions")
+
+    builds = {}
+    for dims in args.dims:
+        if args.reuse and dims in item_based_alexis.reduced_dims(conn.cursor()):
+            builds[dims] = {"explained_variance": None}
+            continue
+        builds[dims] = audio_reduction.build(conn, dims, args.method, ids, matrix)
+        print(f"{dims} dimensions calculées en {builds[dims]['seconds']:.1f} s")
+    item_based_alexis._REDUCED_DIMS = (0.0, frozenset())
+
+    rows = np.random.default_rng(0).choice(len(ids), min(args.queries, len(ids)), replace=False)
+    seeds = ids[rows].tolist()
+    truth = exact_neighbours(matrix, rows, ids, args.k)
+
+    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    run(conn, cur, seeds[:10], truth[:10], args.k, args.ef_search, 0)       # cache chaud
+    print(f"{'config':<24} {'rappel@' + str(args.k):>9} {'médiane':>10} {'p95':>10} {'index':>9}")
+    configs = [(0, "complets (224)", "idx_vectors_cosine")]
+    configs += [(d, f"{d} dim. (x{args.rerank_factor})", audio_reduction.index_name(d)) for d in args.dims]
+    for dims, label, index in configs:
+        recall, median, p95 = run(conn, cur, seeds, truth, args.k, args.ef_search, dims)
+        size = index_size(cur, index)
+        conn.rollback()
+        extra = ""
+        if dims and builds[dims]["explained_variance"] is not None:
+            extra = f"  variance {builds[dims]['explained_variance']:.1%}"
+        print(f"{label:<24} {recall:>9.3f} {median:>8.2f}ms {p95:>8.2f}ms {size / 2**20:>7.1f}Mo{extra}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
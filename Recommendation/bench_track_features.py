@@ -0,0 +1,105 @@
+"""
+Compare la construction de la matrice des musiques d'item_based_pierre :
+ancienne boucle Python (create_track_feature_vector, une ligne par couple
+musique/artiste, float64) et build_track_arrays (vectorisée, float32).
+
+    python Recommendation/bench_track_features.py                 # catalogue de la base (.env)
+    python Recommendation/bench_track_features.py --synthetic 110000
+
+Mesures : durée de construction et pic mémoire (tracemalloc) à partir des
+lignes déjà lues, plus la taille de la matrice obtenue.
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from item_based_pierre import TRACKS_QUERY, build_track_arrays, db_connect
+
+OLD_QUERY = """
+    SELECT DISTINCT t.track_id, t.track_title, t.track_duration, t.track_genre_top, t.track_bit_rate,
+           aat.artist_id, a.artist_name
+    FROM sae.tracks t
+    LEFT JOIN sae.artist_album_track aat ON t.track_id = aat.track_id
+    LEFT JOIN sae.artist a ON aat.artist_id = a.artist_id;
+"""
+
+GENRES = ["Rock", "Electronic", "Experimental", "Hip-Hop", "Folk", "Instrumental", "Pop", "International",
+          "Classical", "Old-Time / Historic", "Jazz", "Country", "Soul-RnB", "Spoken", "Blues", "Easy Listening", None]
+
+
+def create_track_feature_vector(track):
+    # Ancienne version d'item_based_pierre.py
+    duration = track[2] or 0
+    bitrate = track[4] or 0
+    features = [min(duration / 600, 1.0), min(bitrate / 320, 1.0)]
+    genres = f"{track[3] or ''}".lower().replace(",", " ").split()
+    genre_vec = np.zeros(16)
+    for g in genres:
+        genre_vec[abs(hash(g)) % 16] = 1
+    return np.concatenate([features, genre_vec])
+
+
+def old_build(rows):
+    all_features = []
+    index_map = {}
+    for idx, track in enumerate(rows):
+        all_features.append(create_track_feature_vector(track))
+        index_map[track[0]] = idx
+    return np.array(all_features), index_map
+
+
+def synthetic(n: int):
+    rng = random.Random(0)
+    old_rows, new_rows = [], []
+    for track_id in range(1, n + 1):
+        base = (track_id, f"Titre {track_id}", rng.randint(30, 900), rng.choice(GENRES), rng.choice([128, 192, 256, 320]))
+        artists = [rng.randint(1, n // 5) for _ in range(1 if rng.random() < 0.9 else 2)]
+        old_rows.extend(base + (a, f"Artiste {a}") for a in artists)
+        new_rows.append(base + (min(artists), f"Artiste {min(artists)}"))
+    columns = ["track_id", "track_title", "track_duration", "track_genre_top", "track_bit_rate", "artist_id", "artist_name"]
+    return old_rows, pd.DataFrame(new_rows, columns=columns)
+
+
+def from_database():
+    conn = db_connect()
+    cur = conn.cursor()
+    cur.execute(OLD_QUERY)
+    old_rows = cur.fetchall()
+    cur.close()
+    df = pd.read_sql(TRACKS_QUERY, conn)
+    conn.close()
+    return old_rows, df
+
+
+def measure(func, data):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(data)
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="nombre de musiques générées au lieu de la base")
+    args = parser.parse_args()
+
+    old_rows, df = synthetic(args.synthetic) if args.synthetic else from_database()
+    (old_matrix, _), old_s, old_peak = measure(old_build, old_rows)
+    new_arrays, new_s, new_peak = measure(build_track_arrays, df)
+    new_matrix = new_arrays["matrix"]
+
+    print(f"Ancienne boucle : {len(old_rows)} lignes, {old_s:.2f} s, pic {old_peak / 2**20:.0f} Mo, "
+          f"matrice {old_matrix.nbytes / 2**20:.1f} Mo ({old_matrix.dtype})")
+    print(f"Vectorisée      : {len(df)} lignes, {new_s:.2f} s, pic {new_peak / 2**20:.0f} Mo, "
+          f"matrice {new_matrix.nbytes / 2**20:.1f} Mo ({new_matrix.dtype}) (x{old_s / new_s:.0f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Encodage en masse des embeddings d'artistes, hors de l'API (premier
+remplissage d'un gros catalogue, changement de modèle).
+
+    python Recommendation/embed_artists.py                    # reprend au dernier point de contrôle
+    python Recommendation/embed_artists.py --workers 8 --chunk 4096
+    python Recommendation/embed_artists.py --restart          # ignore le point de contrôle
+
+Les artistes à encoder (sans embedding ou dont le texte a changé, voir
+item_based_stanislas.STALE_SQL) sont lus par paquets de --chunk avec un
+curseur côté serveur, dans l'ordre des artist_id. Dans chaque paquet, les
+textes sont triés par longueur puis découpés en lots de --batch : chaque
+lot encodé par un process du pool contient des textes de taille proche,
+donc peu de remplissage (padding). Chaque paquet est écrit par UPDATE
+batch et validé, puis le dernier artist_id traité est noté dans le fichier
+de --checkpoint : une relance reprend après lui. À la fin, la matrice
+'artists' est republiée pour les workers de l'API.
+"""
+import argparse
+import json
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+import item_based_stanislas as stanislas
+
+DEFAULT_CHECKPOINT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifacts", "embed_artists.checkpoint.json")
+
+
+def read_checkpoint(path: str):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return None
+    # Point de contrôle d'un autre modèle : tout est à refaire
+    return checkpoint if checkpoint.get("model") == stanislas.MODEL_NAME else None
+
+
+def write_checkpoint(path: str, last_artist_id: int, encoded: int) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"model": stanislas.MODEL_NAME, "last_artist_id": last_artist_id, "encoded": encoded}, f)
+    os.replace(tmp, path)
+
+
+def read_chunks(conn, after: int, chunk: int):
+    """Paquets (artist_ids, textes) des artistes à encoder d'id > after, par curseur côté serveur."""
+    columns = ("artist_id",) + stanislas._TEXT_FIELDS
+    cur = conn.cursor(name="embed_artists")
+    cur.itersize = chunk
+    cur.execute(
+        "SELECT " + ", ".join(columns) +
+        " FROM sae.artist WHERE artist_id > %(after)s AND " + stanislas.STALE_SQL +
+        " ORDER BY artist_id",
+        {"model": stanislas.MODEL_NAME, "after": after},
+    )
+    try:
+        while True:
+            rows = cur.fetchmany(chunk)
+            if not rows:
+                return
+            records = [dict(zip(columns, row)) for row in rows]
+            yield [r["artist_id"] for r in records], [stanislas.build_artist_text(r) for r in records]
+    finally:
+        cur.close()
+
+
+def submit_chunk(pool, ids, texts, batch: int):
+    """Lots de textes de longueur proche envoyés au pool ; renvoie ce qu'il faut pour réassembler."""
+    order = np.argsort([len(t) for t in texts], kind="stable")
+    batches = [order[start:start + batch] for start in range(0, len(order), batch)]
+    futures = [pool.submit(stanislas._encode_texts, [texts[i] for i in rows]) for rows in batches]
+    return ids, texts, batches, futures
+
+
+def collect_chunk(ids, texts, batches, futures) -> np.ndarray:
+    embeddings = None
+    for rows, future in zip(batches, futures):
+        result = future.result()
+        if embeddings is None:
+            embeddings = np.empty((len(texts), result.shape[1]), dtype=np.float32)
+        embeddings[rows] = result      # retour à l'ordre des artist_id
+    return embeddings
+
+
+def count_pending(conn, after: int) -> int:
+    cur = conn.cursor()
+    cur.execute("SELECT count(*) FROM sae.artist WHERE artist_id > %(after)s AND " + stanislas.STALE_SQL,
+                {"model": stanislas.MODEL_NAME, "after": after})
+    total = cur.fetchone()[0]
+    cur.close()
+    conn.rollback()
+    return total
+
+
+def write_chunk(conn, pending, checkpoint: str, encoded: int) -> int:
+    ids, texts, batches, futures = pending
+    embeddings = collect_chunk(ids, texts, batches, futures)
+    cur = conn.cursor()
+    stanislas.write_embeddings(cur, ids, texts, embeddings)
+    conn.commit()
+    cur.close()
+    write_checkpoint(checkpoint, int(ids[-1]), encoded + len(ids))
+    return len(ids)
+
+
+def report(done: int, total: int, started: float) -> None:
+    seconds = time.perf_counter() - started
+    print(f"  {done}/{total} artistes, {done / seconds if seconds else 0:.1f} artistes/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="process d'encodage (un modèle chacun)")
+    parser.add_argument("--chunk", type=int, default=2048, help="artistes lus, encodés et validés par paquet")
+    parser.add_argument("--batch", type=int, default=128, help="textes par lot envoyé à un process")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="fichier du point de contrôle")
+    parser.add_argument("--restart", action="store_true", help="ignore le point de contrôle existant")
+    parser.add_argument("--no-publish", action="store_true", help="ne republie pas la matrice 'artists' à la fin")
+    args = parser.parse_args()
+
+    checkpoint = None if args.restart else read_checkpoint(args.checkpoint)
+    after = checkpoint["last_artist_id"] if checkpoint else 0
+    encoded = checkpoint["encoded"] if checkpoint else 0
+    if checkpoint:
+        print(f"Reprise après l'artiste {after} ({encoded} déjà encodés)")
+
+    read_conn = stanislas.db_connect()
+    write_conn = stanislas.db_connect()
+    total = count_pending(read_conn, after)
+    print(f"{total} artiste(s) à encoder, {args.workers} process, paquets de {args.chunk}")
+    started = time.perf_counter()
+    done = 0
+    try:
+        # Chaque process charge son modèle ; deux paquets en vol pour ne pas
+        # laisser le pool inactif pendant la lecture et l'écriture en base
+        with stanislas.encode_pool(args.workers) as pool:
+            in_flight = deque()
+            chunks = read_chunks(read_conn, after, args.chunk)
+            for ids, texts in chunks:
+                in_flight.append(submit_chunk(pool, ids, texts, args.batch))
+                if len(in_flight) < 2:
+                    continue
+                done += write_chunk(write_conn, in_flight.popleft(), args.checkpoint, encoded + done)
+                report(done, total, started)
+            while in_flight:
+                done += write_chunk(write_conn, in_flight.popleft(), args.checkpoint, encoded + done)
+                report(done, total, started)
+    finally:
+        read_conn.close()
+        write_conn.close()
+
+    seconds = time.perf_counter() - started
+    print(f"Terminé : {done} artiste(s) en {seconds:.1f} s ({done / seconds if seconds else 0:.1f} artistes/s)")
+    if os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    if done and not args.no_publish:
+        stanislas.rebuild_artifact()
+        print(f"Matrice 'artists' republiée : {stanislas.artifact_status()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Rafraîchissement des embeddings d'artistes en arrière-plan.
+
+    python Recommendation/embedding_worker.py            # une passe puis quitte
+    python Recommendation/embedding_worker.py --loop     # une passe toutes les RECO_EMBEDDING_REFRESH_SECONDS
+
+L'API lance le même thread dans son lifespan. Chaque passe réencode les
+artistes dont le texte a changé depuis leur encodage (empreinte, voir
+item_based_stanislas.refresh_embeddings) et publie une nouvelle version de
+la matrice ; les workers de l'API y basculent sans interrompre les
+recommandations en cours.
+"""
+import argparse
+import os
+import threading
+import time
+import traceback
+from typing import Optional
+
+import item_based_stanislas
+
+REFRESH_SECONDS = float(os.getenv("RECO_EMBEDDING_REFRESH_SECONDS", 600))
+
+
+class EmbeddingWorker:
+    def __init__(self, interval: float = REFRESH_SECONDS):
+        self.interval = interval
+        self.runs = 0
+        self.encoded = 0            # artistes encodés depuis le démarrage
+        self.last_run: Optional[dict] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="embedding-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        # Première passe après `interval` : celle du démarrage est faite par le préchauffage
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def run_once(self) -> int:
+        started = time.time()
+        report = {"started_at": started, "encoded": 0, "seconds": None, "error": None}
+        try:
+            report["encoded"] = item_based_stanislas.refresh_embeddings()
+        except Exception as e:
+            report["error"] = str(e)
+            print(f"Rafraîchissement des embeddings : échec ({e})")
+            if self.runs == 0:
+                traceback.print_exc()
+        report["seconds"] = round(time.time() - started, 3)
+        self.runs += 1
+        self.encoded += report["encoded"]
+        self.last_run = report
+        if report["encoded"]:
+            print(f"Embeddings : {report['encoded']} artiste(s) réencodé(s) en {report['seconds']:.1f} s")
+        return report["encoded"]
+
+    def status(self) -> dict:
+        return {
+            "interval": self.interval,
+            "running": self._thread is not None,
+            "runs": self.runs,
+            "encoded": self.encoded,
+            "last_run": self.last_run,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loop", action="store_true", help="relance une passe toutes les RECO_EMBEDDING_REFRESH_SECONDS")
+    args = parser.parse_args()
+    if args.loop and REFRESH_SECONDS <= 0:
+        parser.error("--loop demande RECO_EMBEDDING_REFRESH_SECONDS > 0")
+
+    worker = EmbeddingWorker()
+    worker.run_once()
+    print(worker.last_run)
+    if args.loop:
+        worker.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            worker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import json
+import os
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import psycopg2
+
+import item_based_alexis
+import item_based_pierre
+import item_based_stanislas
+from artifacts import ARTIFACTS_DIR
+
+# ==================================================
+# MOTEUR HYBRIDE (/reco/tracks/hybrid)
+# Trois sources de candidats pour les mêmes musiques de départ :
+#   audio    : voisins pgvector des vecteurs echonest (item_based_alexis),
+#              score = 1 - distance cosinus
+#   metadata : durée, bitrate et genre, matrice 'tracks' (item_based_pierre)
+#   artists  : musiques des artistes des musiques de départ (score 1) et
+#              des artistes les plus proches dans l'espace des embeddings
+#              MiniLM (item_based_stanislas), score = similarité de l'artiste
+# Chaque source propose au plus CANDIDATES musiques. Les scores sont
+# ramenés sur [0, 1] par source (min-max, les échelles des trois moteurs
+# n'ont rien à voir), rangés dans une matrice candidats x SOURCES (0 quand
+# une source n'a pas proposé la musique), puis fusionnés par un seul
+# produit matrice-vecteur avec les poids.
+# Poids : ceux de la requête, sinon ceux de tune_hybrid.py (WEIGHTS_FILE),
+# sinon RECO_HYBRID_WEIGHTS.
+# ==================================================
+
+SOURCES = ("audio", "metadata", "artists")
+CANDIDATES = int(os.getenv("RECO_HYBRID_CANDIDATES", 50))
+ARTIST_NEIGHBOURS = 20
+DEFAULT_WEIGHTS = os.getenv("RECO_HYBRID_WEIGHTS", "audio=0.5,metadata=0.2,artists=0.3")
+WEIGHTS_FILE = os.path.join(ARTIFACTS_DIR, "hybrid_weights.json")
+
+_EMPTY = (np.array([], dtype=np.int64), np.array([], dtype=np.float32))
+_tuned = (None, None)           # (mtime, poids) de WEIGHTS_FILE
+
+
+# ==================================================
+# POIDS
+# ==================================================
+
+def parse_weights(text: str) -> Dict[str, float]:
+    """'audio=0.5,metadata=0.2,artists=0.3' -> dict ; sources absentes à 0."""
+    weights = dict.fromkeys(SOURCES, 0.0)
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        name, _, value = part.partition("=")
+        if name.strip() not in weights:
+            raise ValueError(f"source inconnue : {name.strip()} (attendu : {', '.join(SOURCES)})")
+        weights[name.strip()] = float(value)
+    return weights
+
+
+def normalize_weights(weights: Dict[str, float]) -> Dict[str, float]:
+    total = sum(max(0.0, weights.get(s, 0.0)) for s in SOURCES)
+    if total <= 0:
+        raise ValueError("au moins un poids doit être positif")
+    return {s: round(max(0.0, weights.get(s, 0.0)) / total, 4) for s in SOURCES}
+
+
+def current_weights() -> Dict[str, float]:
+    """Poids réglés par tune_hybrid.py s'ils existent (relus quand le fichier change), sinon RECO_HYBRID_WEIGHTS."""
+    global _tuned
+    try:
+        mtime = os.stat(WEIGHTS_FILE).st_mtime
+    except FileNotFoundError:
+        return normalize_weights(parse_weights(DEFAULT_WEIGHTS))
+    if _tuned[0] != mtime:
+        with open(WEIGHTS_FILE, "r", encoding="utf-8") as f:
+            _tuned = (mtime, normalize_weights(json.load(f)["weights"]))
+    return dict(_tuned[1])
+
+
+# ==================================================
+# SOURCES DE CANDIDATS : (track_ids, scores), musiques de départ exclues
+# ==================================================
+
+def _audio(cur, track_ids, n: int):
+    results = item_based_alexis.recommend_audio(cur, [track_ids], limit=n)[0]
+    return (np.array([r["track_id"] for r in results], dtype=np.int64),
+            1.0 - np.array([r["distance"] for r in results], dtype=np.float32))
+
+
+def _metadata(artifact, track_ids, n: int):
+    return item_based_pierre.similar_track_scores(artifact, track_ids, n)
+
+
+def _artists(artifact, track_ids, n: int):
+    lookup_ids, lookup_rows = artifact["lookup_ids"], artifact["lookup_rows"]
+    wanted = np.asarray(track_ids, dtype=np.int64)
+    pos = np.minimum(np.searchsorted(lookup_ids, wanted), len(lookup_ids) - 1)
+    artist_col = artifact["artist_id"]
+    seeds = artist_col[lookup_rows[pos[lookup_ids[pos] == wanted]]]
+    seeds = np.unique(seeds[seeds != item_based_pierre.NO_ARTIST])
+    if seeds.size == 0:
+        return _EMPTY
+
+    similar, similarities = item_based_stanislas.similar_artist_scores(seeds.tolist(), ARTIST_NEIGHBOURS)
+    artists = np.concatenate([seeds, similar])
+    scores = np.concatenate([np.ones(seeds.size, dtype=np.float32), similarities])
+    order = np.argsort(artists)
+    artists, scores = artists[order], scores[order]
+
+    # Toutes les musiques de ces artistes, en une recherche triée sur la colonne artist_id
+    pos = np.minimum(np.searchsorted(artists, artist_col), artists.size - 1)
+    rows = np.flatnonzero(artists[pos] == artist_col)
+    ids, track_scores = artifact["track_id"][rows], scores[pos[rows]]
+    keep = ~np.isin(ids, wanted)
+    ids, track_scores = ids[keep], track_scores[keep]
+    top = np.lexsort((ids, -track_scores))[:n]
+    return ids[top], track_scores[top]
+
+
+def gather(artifact, track_ids: Sequence[int], cur=None, n: int = CANDIDATES,
+           sources: Sequence[str] = SOURCES, timings: Optional[dict] = None,
+           errors: Optional[dict] = None) -> Dict[str, tuple]:
+    """
+    Candidats de chaque source de `sources` : {source: (track_ids, scores)}.
+    Sans curseur, pas de source audio. Une source en erreur (pgvector
+    absent...) est omise, son message noté dans `errors`. Durée de chaque
+    source en ms dans `timings`.
+    """
+    timings = {} if timings is None else timings
+    errors = {} if errors is None else errors
+    candidates = {}
+    for source in sources:
+        if source == "audio" and cur is None:
+            continue
+        started = time.perf_counter()
+        try:
+            if source == "audio":
+                candidates[source] = _audio(cur, track_ids, n)
+            elif source == "metadata":
+                candidates[source] = _metadata(artifact, track_ids, n)
+            elif source == "artists":
+                candidates[source] = _artists(artifact, track_ids, n)
+        except (RuntimeError, psycopg2.Error) as e:
+            # Curseur inutilisable après une erreur SQL : la transaction est annulée par l'appelant
+            errors[source] = str(e).splitlines()[0]
+        finally:
+            timings[source] = round((time.perf_counter() - started) * 1000, 3)
+    return candidates
+
+
+# ==================================================
+# FUSION
+# ==================================================
+
+def _min_max(scores: np.ndarray) -> np.ndarray:
+    low, high = scores.min(), scores.max()
+    if high <= low:
+        return np.ones_like(scores, dtype=np.float32)
+    return ((scores - low) / (high - low)).astype(np.float32)
+
+
+def score_matrix(candidates: Dict[str, tuple]):
+    """(track_ids uniques, matrice len(ids) x len(SOURCES) des scores normalisés)."""
+    parts = [(j, candidates[s]) for j, s in enumerate(SOURCES) if s in candidates and len(candidates[s][0])]
+    if not parts:
+        return np.array([], dtype=np.int64), np.zeros((0, len(SOURCES)), dtype=np.float32)
+    ids, inverse = np.unique(np.concatenate([p[1][0] for p in parts]), return_inverse=True)
+    matrix = np.zeros((ids.size, len(SOURCES)), dtype=np.float32)
+    offset = 0
+    for j, (source_ids, scores) in parts:
+        matrix[inverse[offset:offset + source_ids.size], j] = _min_max(scores)
+        offset += source_ids.size
+    return ids, matrix
+
+
+def weight_vector(weights: Dict[str, float]) -> np.ndarray:
+    return np.array([weights.get(s, 0.0) for s in SOURCES], dtype=np.float32)
+
+
+def recommend_hybrid(track_ids, limit: int = 10, weights: Optional[Dict[str, float]] = None,
+                     cur=None, sources: Sequence[str] = SOURCES) -> dict:
+    """
+    Recommandations fusionnées : {results, weights, sources, errors, timings_ms}.
+    results : [{track_id, track_title, artist_id, artist_name, score,
+    scores: {source: score normalisé}}] par score décroissant. `cur` renvoie
+    des dicts (RealDictCursor) ; la transaction est terminée par l'appelant.
+    """
+    started = time.perf_counter()
+    if isinstance(track_ids, int):
+        track_ids = [track_ids]
+    weights = normalize_weights(weights) if weights else current_weights()
+    timings, errors = {}, {}
+    empty = {"results": [], "weights": weights, "sources": {}, "errors": errors, "timings_ms": timings}
+
+    stage = time.perf_counter()
+    artifact = item_based_pierre.tracks_snapshot()
+    timings["snapshot"] = round((time.perf_counter() - stage) * 1000, 3)
+    if artifact is None:
+        return empty
+    wanted = [s for s in sources if weights[s] > 0]
+    candidates = gather(artifact, track_ids, cur, max(CANDIDATES, limit), wanted, timings, errors)
+
+    stage = time.perf_counter()
+    ids, matrix = score_matrix(candidates)
+    fused = matrix @ weight_vector(weights)
+    top = np.lexsort((ids, -fused))[:limit]
+    timings["fusion"] = round((time.perf_counter() - stage) * 1000, 3)
+
+    lookup_ids, lookup_rows = artifact["lookup_ids"], artifact["lookup_rows"]
+    titles, artist_names, artist_col = artifact.strings("title"), artifact.strings("artist_name"), artifact["artist_id"]
+    results = []
+    for i in top:
+        tid = int(ids[i])
+        pos = int(np.searchsorted(lookup_ids, tid))
+        row = int(lookup_rows[pos]) if pos < len(lookup_ids) and lookup_ids[pos] == tid else None
+        artist_id = None if row is None else int(artist_col[row])
+        results.append({
+            "track_id": tid,
+            "track_title": None if row is None else titles[row],
+            "artist_id": None if artist_id in (None, item_based_pierre.NO_ARTIST) else artist_id,
+            "artist_name": None if row is None else artist_names[row],
+            "score": round(float(fused[i]), 4),
+            "scores": {s: round(float(matrix[i, j]), 4) for j, s in enumerate(SOURCES) if s in candidates},
+        })
+    timings["total"] = round((time.perf_counter() - started) * 1000, 3)
+    return {
+        "results": results,
+        "weights": weights,
+        "sources": {s: int(candidates[s][0].size) for s in candidates},
+        "errors": errors,
+        "timings_ms": timings,
+    }
@@ -1,5 +1,8 @@
 import psycopg2
+import psycopg2.extras
 import sys
+import time
+from typing import Optional
 from dotenv import load_dotenv
 import os
 
@@ -64,21 +67,161 @@ def search_track(conn, term):
         cur.execute(query, (f"%{term}%",))
         return cur.fetchall()
 
-def get_recommendations(conn, track_id):
-    query = """
-        SELECT 
-            t.track_title,
-            -- Calcul de distance Cosinus via pgvector
-            (tfv.audio_vector <=> (SELECT audio_vector FROM sae.temporal_features_vectors WHERE track_id = %s)) as distance
-        FROM sae.temporal_features_vectors tfv
-        JOIN sae.tracks t ON t.track_id = tfv.track_id
-        WHERE t.track_id != %s
-        ORDER BY distance ASC
-        LIMIT 5;
+# ============================================================
+# MOTEUR AUDIO (pgvector)
+# Plusieurs groupes de musiques de départ en une requête : chaque groupe
+# est résumé par son centroïde (moyenne des vecteurs normalisés), puis un
+# LATERAL parcourt l'index HNSW (scriptBDDdlc.sql) depuis ce centroïde.
+# hnsw.ef_search (taille de la liste de candidats) est réglable par appel :
+# plus grand = meilleur rappel, plus lent. Avec un filtre de genre, le
+# parcours itératif de pgvector >= 0.8 évite de renvoyer moins de `limit`
+# résultats quand les premiers candidats sont filtrés.
+# Si des vecteurs réduits existent (audio_reduction.py, scriptBDDaudio.sql),
+# la recherche se fait en deux temps : limit x RERANK_FACTOR candidats tirés
+# de l'index HNSW des vecteurs de `dims` dimensions (plus petit, parcouru
+# plus vite), puis reclassés par distance sur les vecteurs complets.
+# ============================================================
+EF_SEARCH_DEFAULT = 40      # valeur par défaut de pgvector
+EF_SEARCH_MAX = 1000        # au-delà, pgvector refuse hnsw.ef_search
+AUDIO_DIMS = int(os.getenv("RECO_AUDIO_DIMS", 64))              # 0 : vecteurs complets seulement
+RERANK_FACTOR = int(os.getenv("RECO_AUDIO_RERANK_FACTOR", 4))
+REDUCED_DIMS_TTL = 60       # secondes entre deux lectures de sae.audio_projection
+_PGVECTOR_VERSION = None
+_REDUCED_DIMS = (0.0, frozenset())
+
+def pgvector_version(cur) -> tuple:
+    global _PGVECTOR_VERSION
+    if _PGVECTOR_VERSION is None:
+        cur.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        row = cur.fetchone()
+        if row is None:
+            raise RuntimeError("Extension pgvector absente : lancer Tables/scriptBDDdlc.sql")
+        version = row["extversion"] if isinstance(row, dict) else row[0]
+        _PGVECTOR_VERSION = tuple(int(p) for p in version.split(".")[:2])
+    return _PGVECTOR_VERSION
+
+def reduced_dims(cur) -> frozenset:
+    """Tailles de vecteurs réduits disponibles (vide sans scriptBDDaudio.sql)."""
+    global _REDUCED_DIMS
+    checked_at, dims = _REDUCED_DIMS
+    if time.monotonic() - checked_at < REDUCED_DIMS_TTL:
+        return dims
+    # to_regclass plutôt qu'une erreur UndefinedTable, qui annulerait la transaction
+    cur.execute("SELECT to_regclass('sae.audio_projection') IS NOT NULL AS ready")
+    row = cur.fetchone()
+    dims = frozenset()
+    if (row["ready"] if isinstance(row, dict) else row[0]):
+        cur.execute("SELECT dims FROM sae.audio_projection")
+        dims = frozenset((r["dims"] if isinstance(r, dict) else r[0]) for r in cur.fetchall())
+    _REDUCED_DIMS = (time.monotonic(), dims)
+    return dims
+
+def recommend_audio(cur, groups, limit: int = 10, ef_search: int = EF_SEARCH_DEFAULT, genres=None,
+                    dims: Optional[int] = None) -> list[list[dict]]:
     """
-    with conn.cursor() as cur:
-        cur.execute(query, (track_id, track_id))
-        return cur.fetchall()
+    Recommandations audio pour chaque groupe de `groups` (listes de track_id),
+    dans l'ordre des groupes : [{track_id, track_title, track_genre_top,
+    distance}], distance cosinus croissante, musiques du groupe exclues.
+    Groupe sans vecteur connu : liste vide. `dims` : taille des vecteurs
+    réduits de la présélection (None : RECO_AUDIO_DIMS, 0 ou taille absente
+    de la base : recherche directe sur les vecteurs complets). `cur` renvoie
+    des dicts (RealDictCursor) ; la transaction est terminée par l'appelant.
+    """
+    version = pgvector_version(cur)
+    dims = AUDIO_DIMS if dims is None else int(dims)
+    if dims and dims not in reduced_dims(cur):
+        dims = 0
+    candidates = limit * RERANK_FACTOR
+    group_idx = [i for i, group in enumerate(groups) for _ in group]
+    track_ids = [int(tid) for group in groups for tid in group]
+
+    # SET LOCAL : réglages limités à la transaction en cours ; pgvector (type,
+    # opérateur <=>, fonctions) est installé dans le schéma sae.
+    # HNSW renvoie au plus ef_search voisins, musiques du groupe comprises
+    # (exclues après le parcours) : il en faut `candidates` (ou `limit`) de plus,
+    # dans la limite acceptée par pgvector
+    seeds = max((len(group) for group in groups), default=0)
+    ef_search = min(EF_SEARCH_MAX, max(ef_search, (candidates if dims else limit) + seeds))
+    cur.execute("SELECT set_config('search_path', 'sae, public', true)")
+    cur.execute("SELECT set_config('hnsw.ef_search', %s, true)", (str(ef_search),))
+    if genres and version >= (0, 8):
+        cur.execute("SELECT set_config('hnsw.iterative_scan', 'relaxed_order', true)")
+
+    def normalize(column: str) -> str:
+        return f"l2_normalize({column})" if version >= (0, 7) else column
+
+    # Filtre en sous-requête scalaire (pas de jointure) : le LATERAL reste un
+    # parcours ordonné de l'index HNSW ; titres et genres joints ensuite
+    def genre_filter(alias: str) -> str:
+        if not genres:
+            return ""
+        return f"AND (SELECT t.track_genre_top FROM sae.tracks t WHERE t.track_id = {alias}.track_id) = ANY(%(genres)s)"
+
+    def full_search(condition: str = "") -> str:
+        return f"""
+            SELECT tfv.track_id, tfv.audio_vector <=> s.centroid AS distance
+            FROM sae.temporal_features_vectors tfv
+            WHERE tfv.track_id <> ALL(s.track_ids) {genre_filter("tfv")} {condition}
+            ORDER BY tfv.audio_vector <=> s.centroid
+            LIMIT %(limit)s"""
+    reduced_centroid = ""
+    reduced_join = ""
+    lateral = full_search()
+    if dims:
+        # Le cast vector(dims) et le filtre dims = <littéral> désignent l'index
+        # partiel idx_tfr_hnsw_<dims>. Groupe dont aucune musique n'a de vecteur
+        # réduit (ajoutée depuis le dernier audio_reduction.py) : recherche directe
+        reduced_centroid = f", avg({normalize(f'r.reduced_vector::vector({dims})')}) AS reduced_centroid"
+        reduced_join = f"LEFT JOIN sae.temporal_features_reduced r ON r.dims = {dims} AND r.track_id = g.track_id"
+        lateral = f"""
+            (SELECT c.track_id, tfv.audio_vector <=> s.centroid AS distance
+             FROM (
+                 SELECT rv.track_id
+                 FROM sae.temporal_features_reduced rv
+                 WHERE rv.dims = {dims} AND rv.track_id <> ALL(s.track_ids) {genre_filter("rv")}
+                 ORDER BY rv.reduced_vector::vector({dims}) <=> s.reduced_centroid
+                 LIMIT %(candidates)s
+             ) c
+             JOIN sae.temporal_features_vectors tfv ON tfv.track_id = c.track_id
+             WHERE s.reduced_centroid IS NOT NULL
+             ORDER BY distance
+             LIMIT %(limit)s)
+            UNION ALL
+            ({full_search("AND s.reduced_centroid IS NULL")})"""
+
+    cur.execute(f"""
+        WITH seeds AS (
+            SELECT g.idx, avg({normalize("v.audio_vector")}) AS centroid{reduced_centroid},
+                   array_agg(g.track_id) AS track_ids
+            FROM unnest(%(idx)s::int[], %(track_ids)s::int[]) AS g(idx, track_id)
+            JOIN sae.temporal_features_vectors v ON v.track_id = g.track_id
+            {reduced_join}
+            GROUP BY g.idx
+        )
+        SELECT s.idx, r.track_id, t.track_title, t.track_genre_top, r.distance
+        FROM seeds s
+        CROSS JOIN LATERAL ({lateral}
+        ) r
+        JOIN sae.tracks t ON t.track_id = r.track_id
+        ORDER BY s.idx, r.distance
+    """, {"idx": group_idx, "track_ids": track_ids, "limit": limit, "candidates": candidates,
+          "genres": list(genres or [])})
+
+    results = [[] for _ in groups]
+    for row in cur.fetchall():
+        results[row["idx"]].append({
+            "track_id": row["track_id"],
+            "track_title": row["track_title"],
+            "track_genre_top": row["track_genre_top"],
+            "distance": round(float(row["distance"]), 4),
+        })
+    return results
+
+def get_recommendations(conn, track_id):
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        results = recommend_audio(cur, [[track_id]], limit=5)[0]
+    conn.rollback()
+    return [(r["track_title"], r["distance"]) for r in results]
 
 # ============================================================
 # MAIN
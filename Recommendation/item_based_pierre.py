@@ -1,9 +1,14 @@
 import psycopg2
 from dotenv import load_dotenv
 import os
-from sklearn.metrics.pairwise import cosine_similarity
+import threading
+import time
+import zlib
+import pandas as pd
 import numpy as np
 from psycopg2.extras import RealDictCursor
+from artifacts import ArtifactStore, MappedArtifact, build_lock, encode_strings, is_stale
+from track_neighbours import DEFAULT_K, compute_neighbours, cosine_scores, normalize_rows
 
 load_dotenv()
 
@@ -15,102 +20,275 @@ DB_CONFIG = {
     'port': os.getenv("POSTGRES_PORT", '5432')
 }
 
-_TRACK_CACHE = None
-_FEATURE_MATRIX = None
-_TRACK_INDEX_MAP = {}
+# Matrice partagée entre workers via un artefact sur disque en mmap (artifacts.py)
+_TRACKS = MappedArtifact(ArtifactStore(), "tracks")
+# Top-K voisins précalculés de chaque musique (track_neighbours.py), liés à une version de 'tracks'
+_NEIGHBOURS = MappedArtifact(ArtifactStore(), "track_neighbours")
+_LOAD_LOCK = threading.Lock()
+ARTIFACT_MAX_AGE_HOURS = float(os.getenv("RECO_ARTIFACT_MAX_AGE_HOURS", 24))
+NO_ARTIST = -1
 
 def db_connect():
     return psycopg2.connect(**DB_CONFIG)
 
-def create_track_feature_vector(track):
-    # track index: 0:id, 1:title, 2:duration, 3:genre, 4:bitrate
-    duration = track[2] or 0
-    bitrate = track[4] or 0
+# ==================================================
+# FEATURES DES MUSIQUES (construction vectorisée)
+# Une ligne par musique, float32 : durée et bitrate normalisés puis 16
+# cases de genre. Chaque mot du genre (minuscules, séparé par espaces ou
+# virgules) allume la case crc32(mot) % 16 : même encodage dans tous les
+# process, contrairement à hash() dont la graine change à chaque
+# lancement. Le calcul par mot ne porte que sur les genres distincts.
+# ==================================================
+GENRE_BINS = 16
+# Change quand l'encodage change : un artefact d'une autre version est reconstruit
+FEATURES_VERSION = "crc32-16-v1"
 
-    features = [
-        min(duration / 600, 1.0),
-        min(bitrate / 320, 1.0)
-    ]
+# Une ligne par musique : l'artiste retenu est celui de plus petit artist_id
+TRACKS_QUERY = """
+    SELECT DISTINCT ON (t.track_id)
+           t.track_id, t.track_title, t.track_duration, t.track_genre_top, t.track_bit_rate,
+           aat.artist_id, a.artist_name
+    FROM sae.tracks t
+    LEFT JOIN sae.artist_album_track aat ON t.track_id = aat.track_id
+    LEFT JOIN sae.artist a ON aat.artist_id = a.artist_id
+    ORDER BY t.track_id, aat.artist_id;
+"""
 
-    genres_text = f"{track[3] or ''}".lower()
-    genres = genres_text.replace(",", " ").split()
+def genre_bins(genre) -> np.ndarray:
+    vec = np.zeros(GENRE_BINS, dtype=np.float32)
+    for word in f"{genre or ''}".lower().replace(",", " ").split():
+        vec[zlib.crc32(word.encode("utf-8")) % GENRE_BINS] = 1
+    return vec
 
-    genre_vec = np.zeros(16)
-    for g in genres:
-        genre_vec[abs(hash(g)) % 16] = 1
+def build_track_features(df: pd.DataFrame) -> np.ndarray:
+    """Colonnes track_duration, track_bit_rate, track_genre_top -> matrice (N, 2 + GENRE_BINS) float32."""
+    duration = pd.to_numeric(df["track_duration"], errors="coerce").fillna(0).to_numpy(np.float32)
+    bitrate = pd.to_numeric(df["track_bit_rate"], errors="coerce").fillna(0).to_numpy(np.float32)
 
-    return np.concatenate([features, genre_vec])
+    codes, genres = pd.factorize(df["track_genre_top"].fillna(""))
+    genre_table = np.vstack([genre_bins(g) for g in genres] + [np.zeros((0, GENRE_BINS), np.float32)])
 
-def load_data_into_cache():
-    global _TRACK_CACHE, _FEATURE_MATRIX, _TRACK_INDEX_MAP
-    query = """
-    SELECT DISTINCT t.track_id, t.track_title, t.track_duration, t.track_genre_top, t.track_bit_rate, 
-           aat.artist_id, a.artist_name
-    FROM sae.tracks t
-    LEFT JOIN sae.artist_album_track aat ON t.track_id = aat.track_id
-    LEFT JOIN sae.artist a ON aat.artist_id = a.artist_id;
+    matrix = np.empty((len(df), 2 + GENRE_BINS), dtype=np.float32)
+    np.minimum(duration / 600, 1.0, out=matrix[:, 0])
+    np.minimum(bitrate / 320, 1.0, out=matrix[:, 1])
+    matrix[:, 2:] = genre_table[codes]
+    return matrix
+
+def _text_column(series: pd.Series) -> list:
+    return [None if pd.isna(v) else v for v in series.tolist()]
+
+def build_track_arrays(df: pd.DataFrame) -> dict:
+    """Résultat de TRACKS_QUERY -> tableaux de l'artefact 'tracks' (colonnes, aucun objet Python)."""
+    track_ids = df["track_id"].to_numpy(np.int64)
+    # Recherche par track_id : ids triés -> ligne
+    order = np.argsort(track_ids, kind="stable")
+    return {
+        "matrix": build_track_features(df),
+        "track_id": track_ids,
+        "artist_id": df["artist_id"].fillna(NO_ARTIST).to_numpy(np.int64),
+        "lookup_ids": track_ids[order],
+        "lookup_rows": order,
+        **encode_strings("title", _text_column(df["track_title"])),
+        **encode_strings("artist_name", _text_column(df["artist_name"])),
+    }
+
+def load_data_into_cache(progress=None, force=False):
     """
-    try:
+    Ouvre l'artefact 'tracks' en mmap ; s'il manque, date de plus de
+    RECO_ARTIFACT_MAX_AGE_HOURS, vient d'un autre FEATURES_VERSION (ou
+    force=True), le reconstruit depuis la base.
+    Un seul worker construit (verrou Postgres) : les autres attendent puis
+    ouvrent sa version.
+    """
+    def outdated(artifact):
+        return (force or is_stale(artifact, ARTIFACT_MAX_AGE_HOURS)
+                or artifact.meta.get("features") != FEATURES_VERSION)
+
+    artifact = _TRACKS.refresh()
+    if outdated(artifact):
         conn = db_connect()
-        cur = conn.cursor()
-        cur.execute(query)
-        _TRACK_CACHE = cur.fetchall()
-        cur.close()
+        try:
+            with build_lock(conn, "tracks"):
+                artifact = _TRACKS.refresh()
+                if outdated(artifact):
+                    df = pd.read_sql(TRACKS_QUERY, conn)
+                    if progress:
+                        progress(0, len(df))
+                    artifact = _TRACKS.publish(build_track_arrays(df),
+                                               {"rows": len(df), "features": FEATURES_VERSION})
+        finally:
+            conn.close()
+    if progress:
+        rows = len(artifact["track_id"])
+        progress(rows, rows)
+
+def cache_loaded():
+    return _TRACKS.artifact is not None
+
+def _neighbours_for(artifact):
+    """Table des voisins si elle correspond à cette version de 'tracks', sinon None (périmée)."""
+    neighbours = _NEIGHBOURS.get()
+    if neighbours is None or artifact is None or neighbours.meta.get("tracks_version") != artifact.version:
+        return None
+    return neighbours
+
+def ensure_neighbours(k=DEFAULT_K, force=False, progress=None):
+    """
+    Recalcule la table des voisins si elle manque, si elle a été calculée sur
+    une autre version de 'tracks' ou avec moins de k voisins. Renvoie True
+    si ce process l'a recalculée.
+    """
+    def fresh():
+        neighbours = _NEIGHBOURS.refresh()
+        return (neighbours is not None and neighbours.meta.get("tracks_version") == _TRACKS.artifact.version
+                and neighbours.meta.get("k", 0) >= k)
+
+    _TRACKS.refresh()
+    if _TRACKS.artifact is None:
+        raise RuntimeError("matrice des musiques non chargée")
+    if not force and fresh():
+        return False
+    conn = db_connect()
+    try:
+        with build_lock(conn, "track_neighbours"):
+            artifact = _TRACKS.refresh()
+            if not force and fresh():
+                return False
+            started = time.perf_counter()
+            table = compute_neighbours(artifact["matrix"], artifact["track_id"], artifact["lookup_rows"],
+                                       k=k, progress=progress)
+            _NEIGHBOURS.publish(table, {"tracks_version": artifact.version, "k": int(table["rows"].shape[1]),
+                                        "seconds": round(time.perf_counter() - started, 3)})
+    finally:
         conn.close()
+    return True
 
-        all_features = []
-        for idx, track in enumerate(_TRACK_CACHE):
-            vec = create_track_feature_vector(track)
-            all_features.append(vec)
-            _TRACK_INDEX_MAP[track[0]] = idx
-        
-        _FEATURE_MATRIX = np.array(all_features)
-    except Exception as e:
-        print(f"Error loading cache: {e}")
+def artifact_status():
+    artifact = _TRACKS.artifact
+    if artifact is None:
+        return None
+    neighbours = _NEIGHBOURS.artifact
+    return {
+        "version": artifact.version, "rows": len(artifact["track_id"]), "bytes": artifact.nbytes(),
+        "neighbours": None if neighbours is None else {
+            "version": neighbours.version, "k": neighbours.meta.get("k"), "bytes": neighbours.nbytes(),
+            "seconds": neighbours.meta.get("seconds"), "fresh": _neighbours_for(artifact) is not None,
+        },
+    }
+
+def _ensure_cache():
+    if _TRACKS.artifact is None:
+        with _LOAD_LOCK:
+            if _TRACKS.artifact is None:
+                try:
+                    load_data_into_cache()
+                except Exception as e:
+                    print(f"Error loading cache: {e}")
+
+def _from_neighbours(neighbours, matrix, lookup_rows, seeds, existing_ids, artifact):
+    """
+    Une musique source : sa liste précalculée, telle quelle. Plusieurs :
+    union de leurs listes, re-notée par le profil moyen (même score que le
+    calcul complet, sur quelques centaines de lignes au lieu de N).
+    """
+    rows = neighbours["rows"]
+    if len(set(seeds)) == 1:
+        candidates = rows[seeds[0]]
+        valid = candidates >= 0
+        return candidates[valid], neighbours["scores"][seeds[0]][valid]
+
+    candidates = np.unique(rows[seeds].ravel())
+    candidates = candidates[candidates >= 0]
+    track_id_col = artifact["track_id"]
+    candidates = candidates[~np.isin(track_id_col[candidates], list(existing_ids))]
+    if candidates.size == 0:
+        return candidates, np.array([], dtype=np.float32)
+    profile_vec = normalize_rows(np.mean([matrix[lookup_rows[pos]] for pos in seeds], axis=0).reshape(1, -1))
+    scores = cosine_scores(normalize_rows(matrix[candidates]), profile_vec)[0]
+    order = np.lexsort((candidates, -scores))
+    return candidates[order], scores[order]
+
+def tracks_snapshot():
+    """Version courante de l'artefact 'tracks' (chargée si besoin), None si indisponible."""
+    _ensure_cache()
+    return _TRACKS.get()
+
+def _similar_rows(artifact, track_ids, top_n):
+    """
+    (lignes, similarités) des musiques proches du profil de track_ids, triées ;
+    les musiques de départ peuvent y figurer. None si aucune n'est connue.
+    """
+    matrix, lookup_ids = artifact["matrix"], artifact["lookup_ids"]
+    existing_ids = set(track_ids)
+    lookup_rows = artifact["lookup_rows"]
+    positions = np.searchsorted(lookup_ids, track_ids)
+    seeds = [
+        pos for tid, pos in zip(track_ids, positions)
+        if pos < len(lookup_ids) and lookup_ids[pos] == tid
+    ]
+    if not seeds:
+        return None
+
+    neighbours = _neighbours_for(artifact)
+    if neighbours is not None and top_n <= neighbours["rows"].shape[1]:
+        return _from_neighbours(neighbours, matrix, lookup_rows, seeds, existing_ids, artifact)
+    # Pas de table à jour (ou top_n > k) : calcul complet sur toute la matrice
+    target_vectors = [matrix[lookup_rows[pos]] for pos in seeds]
+    # Calculate mean profile vector (works for 1 or many tracks)
+    profile_vec = normalize_rows(np.mean(target_vectors, axis=0).reshape(1, -1))
+    # Même score que la table des voisins (cosine_scores), au bit près
+    similarities = cosine_scores(normalize_rows(matrix), profile_vec)[0]
+    # Ex aequo par ligne croissante, comme la table des voisins (track_neighbours.py)
+    related_indices = np.lexsort((np.arange(len(similarities)), -similarities))
+    return related_indices, similarities[related_indices]
+
+def similar_track_scores(artifact, track_ids, top_n):
+    """(track_ids, similarités) des top_n musiques les plus proches, musiques de départ exclues."""
+    ranked = _similar_rows(artifact, list(track_ids), top_n)
+    if ranked is None:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+    rows, similarities = ranked[0][:top_n + len(track_ids)], ranked[1][:top_n + len(track_ids)]
+    ids = artifact["track_id"][rows]
+    keep = ~np.isin(ids, list(track_ids))
+    return ids[keep][:top_n], np.asarray(similarities[keep][:top_n], dtype=np.float32)
 
 def recommend_similar_tracks(track_ids, top_n=10):
     """
     Unified function: Accepts a single int or a list of ints.
     """
-    global _TRACK_CACHE, _FEATURE_MATRIX, _TRACK_INDEX_MAP
-
-    if _TRACK_CACHE is None:
-        load_data_into_cache()
+    _ensure_cache()
+    # Instantané : une nouvelle version peut être publiée pendant l'appel
+    artifact = _TRACKS.get()
+    if artifact is None:
+        return []
 
     # Convert single ID to list for uniform processing
     if isinstance(track_ids, int):
         track_ids = [track_ids]
 
-    target_vectors = []
     existing_ids = set(track_ids)
-    
-    for tid in track_ids:
-        if tid in _TRACK_INDEX_MAP:
-            idx = _TRACK_INDEX_MAP[tid]
-            target_vectors.append(_FEATURE_MATRIX[idx])
-
-    if not target_vectors:
+    ranked = _similar_rows(artifact, track_ids, top_n)
+    if ranked is None:
         return []
+    related_indices, related_similarities = ranked
 
-    # Calculate mean profile vector (works for 1 or many tracks)
-    profile_vec = np.mean(target_vectors, axis=0).reshape(1, -1)
-    similarities = cosine_similarity(profile_vec, _FEATURE_MATRIX)[0]
-    related_indices = np.argsort(similarities)[::-1]
+    track_id_col, artist_id_col = artifact["track_id"], artifact["artist_id"]
+    titles, artist_names = artifact.strings("title"), artifact.strings("artist_name")
 
     results = []
-    for idx in related_indices:
-        track = _TRACK_CACHE[idx]
-        tid = track[0]
+    for idx, similarity in zip(related_indices, related_similarities):
+        tid = int(track_id_col[idx])
         
         if tid in existing_ids:
             continue
             
+        artist_id = int(artist_id_col[idx])
         results.append({
             "track_id": tid,
-            "track_title": track[1],
-            "artist_id": track[5],
-            "artist_name": track[6],
-            "similarity": round(float(similarities[idx]), 4)
+            "track_title": titles[idx],
+            "artist_id": None if artist_id == NO_ARTIST else artist_id,
+            "artist_name": artist_names[idx],
+            "similarity": round(float(similarity), 4)
         })
 
         if len(results) >= top_n:
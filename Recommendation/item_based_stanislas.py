@@ -2,13 +2,38 @@ import psycopg2
 import psycopg2.extras
 import pandas as pd
 import numpy as np
+import hashlib
+import multiprocessing
 import os
-from sentence_transformers import SentenceTransformer
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
+import ann
+from artifacts import ArtifactStore, MappedArtifact, append_strings, build_lock, encode_strings, is_stale
 
 load_dotenv()
 
-MODEL = SentenceTransformer("all-MiniLM-L6-v2")
+# ==================================================
+# MODÈLE (chargé au premier encodage)
+# L'import de sentence_transformers (torch) et le chargement du modèle
+# prennent plusieurs secondes : ils n'ont lieu que s'il y a des
+# embeddings à calculer, pas à l'import du module.
+# ==================================================
+MODEL_NAME = "all-MiniLM-L6-v2"
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer(MODEL_NAME)
+    return _model
+
+def model_loaded() -> bool:
+    return _model is not None
 
 # ==================================================
 # DB CONFIG
@@ -22,15 +47,18 @@ DB_CONFIG = {
 }
 
 # ==================================================
-# IN-MEMORY CACHE
-# Cache invalidé uniquement si de nouveaux embeddings sont écrits en DB.
+# MATRICE DES EMBEDDINGS
+# Artefact 'artists' sur disque ouvert en mmap par chaque worker
+# (artifacts.py) : ids (N,), order (ids triés, pour searchsorted),
+# name_* (textes), matrix (N, D) float32 aux lignes L2-normalisées et
+# l'index de recherche approchée ivf_* (ann.py). Les nouveaux embeddings
+# sont ajoutés à la fin d'une nouvelle version ; reconstruction complète
+# après RECO_ARTIFACT_MAX_AGE_HOURS.
 # ==================================================
-_cache: dict = {
-    "ids": None,       # np.ndarray (N,)
-    "names": None,     # np.ndarray (N,)
-    "matrix": None,    # np.ndarray (N, D) — lignes L2-normalisées
-}
-_embedding_col_checked: bool = False
+_ARTISTS = MappedArtifact(ArtifactStore(), "artists")
+ARTIFACT_MAX_AGE_HOURS = float(os.getenv("RECO_ARTIFACT_MAX_AGE_HOURS", 24))
+_invalidated = False
+_index = None       # (version de l'artefact, index ann) de ce process
 
 # ==================================================
 # DB CONNECTION
@@ -38,29 +66,6 @@ _embedding_col_checked: bool = False
 def db_connect():
     return psycopg2.connect(**DB_CONFIG)
 
-# ==================================================
-# COLONNE EMBEDDING (vérifiée une seule fois par process)
-# ==================================================
-def ensure_embedding_column():
-    global _embedding_col_checked
-    if _embedding_col_checked:
-        return
-    conn = db_connect()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT column_name
-        FROM information_schema.columns
-        WHERE table_schema = 'sae'
-          AND table_name   = 'artist'
-          AND column_name  = 'artist_embedding';
-    """)
-    if not cur.fetchone():
-        cur.execute("ALTER TABLE sae.artist ADD COLUMN artist_embedding FLOAT8[];")
-        conn.commit()
-    cur.close()
-    conn.close()
-    _embedding_col_checked = True
-
 # ==================================================
 # BUILD ARTIST TEXT
 # ==================================================
@@ -79,147 +84,399 @@ def build_artist_text(row) -> str:
     )
 
 # ==================================================
-# COMPUTE MISSING EMBEDDINGS  (batch UPDATE)
+# EMPREINTE DU TEXTE ENCODÉ
+# md5('<modèle>:' || texte), rangée dans artist_embedding_fingerprint à
+# chaque encodage. _FINGERPRINT_SQL calcule la même chose côté base
+# (concat_ws ignore les NULL comme build_artist_text) pour ne transférer
+# que les artistes dont le texte ou le modèle a changé.
 # ==================================================
-def compute_missing_embeddings(df: pd.DataFrame, model: SentenceTransformer) -> None:
-    missing = df[df["artist_embedding"].isnull()]
-    if missing.empty:
-        return
+def text_fingerprint(text: str) -> str:
+    return hashlib.md5(f"{MODEL_NAME}:{text}".encode("utf-8")).hexdigest()
 
-    texts = missing.apply(build_artist_text, axis=1).tolist()
-    embeddings = model.encode(texts, show_progress_bar=False, batch_size=64)
+_FINGERPRINT_SQL = "md5(%(model)s || ':' || concat_ws(' ', " + ", ".join(_TEXT_FIELDS) + "))"
+# Artistes à (ré)encoder, paramètre %(model)s = MODEL_NAME
+STALE_SQL = "(artist_embedding IS NULL OR artist_embedding_fingerprint IS DISTINCT FROM " + _FINGERPRINT_SQL + ")"
 
-    # Un seul UPDATE batch via execute_values
+# ==================================================
+# STOCKAGE DES EMBEDDINGS
+# Colonne BYTEA : float32 big-endian (ordre réseau, celui de float4send),
+# 4 octets par dimension (Tables/migrations/0006_artist_embedding_float32.sql).
+# ==================================================
+EMBEDDING_DTYPE = np.dtype(">f4")
+
+def encode_embedding(embedding) -> bytes:
+    return np.asarray(embedding, dtype=EMBEDDING_DTYPE).tobytes()
+
+def decode_embedding(data) -> np.ndarray:
+    return np.frombuffer(data, dtype=EMBEDDING_DTYPE).astype(np.float32)
+
+# ==================================================
+# ENCODAGE  (batch UPDATE)
+# Avec RECO_ENCODE_WORKERS > 1, les paquets sont encodés par un pool de
+# process (chacun charge son modèle) ; le process appelant écrit les
+# résultats au fil de l'eau.
+# ==================================================
+ENCODE_CHUNK = 512
+ENCODE_WORKERS = int(os.getenv("RECO_ENCODE_WORKERS", 1))
+
+def encode_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Pool de `workers` process d'encodage. torch lance par défaut un thread
+    par cœur dans chaque process : les cœurs sont partagés entre les process
+    (un thread chacun avec workers = os.cpu_count()) pour ne pas lancer
+    cœurs x cœurs threads.
+    """
+    threads = max(1, (os.cpu_count() or 1) // max(1, workers))
+    # spawn : pas de fork d'un process qui a déjà des threads (torch, pool DB)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_encode_worker, initargs=(threads,))
+
+def _init_encode_worker(threads: int) -> None:
+    # Avant l'import de torch (get_model) : lu à l'initialisation d'OpenMP / MKL
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[name] = str(threads)
+
+def _encode_texts(texts: list[str]) -> np.ndarray:
+    # Exécutée dans un process du pool : modèle chargé une fois par process
+    return np.asarray(get_model().encode(texts, show_progress_bar=False, batch_size=64), dtype=np.float32)
+
+def write_embeddings(cur, artist_ids, texts, embeddings) -> None:
+    """Un UPDATE batch : embedding + empreinte de son texte (commit à la charge de l'appelant)."""
     rows = [
-        (emb.tolist(), int(aid))
-        for emb, aid in zip(embeddings, missing["artist_id"])
+        (psycopg2.Binary(encode_embedding(emb)), text_fingerprint(text), int(aid))
+        for emb, text, aid in zip(embeddings, texts, artist_ids)
     ]
-    conn = db_connect()
-    cur = conn.cursor()
     psycopg2.extras.execute_values(
         cur,
-        "UPDATE sae.artist SET artist_embedding = data.emb "
-        "FROM (VALUES %s) AS data(emb, artist_id) "
+        "UPDATE sae.artist SET artist_embedding = data.emb, "
+        "artist_embedding_fingerprint = data.fingerprint "
+        "FROM (VALUES %s) AS data(emb, fingerprint, artist_id) "
         "WHERE sae.artist.artist_id = data.artist_id",
         rows,
-        template="(%s::float8[], %s)",
+        template="(%s::bytea, %s, %s)",
+        page_size=len(rows) or 1,
     )
-    conn.commit()
-    cur.close()
-    conn.close()
 
-# ==================================================
-# CACHE : chargement et normalisation L2
-# ==================================================
-def _load_cache() -> None:
-    """Charge la matrice d'embeddings en mémoire et la normalise (dot product = cosine)."""
+def encode_artists(df: pd.DataFrame, model=None, progress=None, workers: int = ENCODE_WORKERS) -> list[int]:
+    """
+    Encode les artistes de `df` (artist_id + champs de _TEXT_FIELDS) par
+    paquets de ENCODE_CHUNK et écrit embedding + empreinte (un UPDATE batch
+    par paquet : un arrêt en cours de route garde le travail fait).
+    `progress(done, total)` reçoit l'avancement. Renvoie les artist_id encodés.
+    """
+    total = len(df)
+    if progress:
+        progress(0, total)
+    if df.empty:
+        return []
+    texts = df.apply(build_artist_text, axis=1).tolist()
+    batches = [texts[start:start + ENCODE_CHUNK] for start in range(0, total, ENCODE_CHUNK)]
+
+    pool = None
+    if model is None and workers > 1 and len(batches) > 1:
+        pool = encode_pool(min(workers, len(batches)))
+        results = pool.map(_encode_texts, batches)
+    else:
+        model = model or get_model()
+        results = (model.encode(batch, show_progress_bar=False, batch_size=64) for batch in batches)
+
     conn = db_connect()
+    cur = conn.cursor()
+    try:
+        for start, embeddings in zip(range(0, total, ENCODE_CHUNK), results):
+            chunk_ids = df["artist_id"].iloc[start:start + ENCODE_CHUNK]
+            write_embeddings(cur, chunk_ids, texts[start:start + ENCODE_CHUNK], embeddings)
+            conn.commit()
+            if progress:
+                progress(start + len(chunk_ids), total)
+    finally:
+        cur.close()
+        conn.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return [int(aid) for aid in df["artist_id"]]
+
+def compute_missing_embeddings(df: pd.DataFrame, model=None, progress=None) -> list[int]:
+    """Encode les artistes de `df` sans embedding (voir encode_artists)."""
+    return encode_artists(df[df["artist_embedding"].isnull()], model=model, progress=progress)
+
+def stale_artists(conn) -> pd.DataFrame:
+    """Artistes sans embedding ou dont le texte a changé depuis l'encodage."""
     df = pd.read_sql(
-        "SELECT artist_id, artist_name, artist_embedding "
-        "FROM sae.artist WHERE artist_embedding IS NOT NULL;",
+        "SELECT artist_id, artist_embedding_fingerprint, " + ", ".join(_TEXT_FIELDS) +
+        " FROM sae.artist WHERE " + STALE_SQL + ";",
         conn,
+        params={"model": MODEL_NAME},
     )
-    conn.close()
+    # L'empreinte Python fait foi : un écart de calcul côté SQL ne fait pas réencoder en boucle
+    changed = df.apply(build_artist_text, axis=1).map(text_fingerprint) != df["artist_embedding_fingerprint"]
+    return df[changed]
 
-    if df.empty:
-        _cache["ids"] = np.array([], dtype=np.int64)
-        _cache["names"] = np.array([], dtype=object)
-        _cache["matrix"] = np.empty((0, 0), dtype=np.float32)
-        return
+# ==================================================
+# CACHE : chargement et normalisation L2
+# ==================================================
+def _outdated(artifact) -> bool:
+    # Version d'avant l'index ann (pas de tableau order) : reconstruite aussi
+    return is_stale(artifact, ARTIFACT_MAX_AGE_HOURS) or "order" not in artifact.arrays
 
-    ids   = df["artist_id"].values.astype(np.int64)
-    names = df["artist_name"].values
-    matrix = np.vstack(df["artist_embedding"].values).astype(np.float32)
+LOAD_BATCH = 5000
+
+def _read_embeddings(conn, artist_ids=None):
+    """
+    (ids, noms, matrice normalisée) des artistes encodés, ou seulement de
+    `artist_ids`. Les lignes arrivent par paquets de LOAD_BATCH (curseur
+    côté serveur) et les octets de chaque paquet sont copiés d'un coup dans
+    une matrice float32 préallouée : ni DataFrame ni liste Python par ligne.
+    """
+    where = "artist_embedding IS NOT NULL"
+    params = None
+    if artist_ids is not None:
+        where += " AND artist_id = ANY(%s)"
+        params = (list(artist_ids),)
+
+    cur = conn.cursor()
+    cur.execute("SELECT count(*), max(length(artist_embedding)) FROM sae.artist WHERE " + where, params)
+    count, width = cur.fetchone()
+    cur.close()
+    if not count:
+        return np.array([], dtype=np.int64), [], np.empty((0, 0), dtype=np.float32)
+
+    dim = width // EMBEDDING_DTYPE.itemsize
+    ids = np.empty(count, dtype=np.int64)
+    matrix = np.empty((count, dim), dtype=np.float32)
+    names = []
+    n = 0
+    with conn.cursor(name="artist_embeddings") as cur:
+        cur.itersize = LOAD_BATCH
+        cur.execute("SELECT artist_id, artist_name, artist_embedding FROM sae.artist WHERE " + where, params)
+        while True:
+            rows = cur.fetchmany(LOAD_BATCH)
+            if not rows:
+                break
+            # Embedding d'une autre dimension (ancien modèle) : ignoré, il sera réencodé
+            rows = [row for row in rows if len(row[2]) == width]
+            if n + len(rows) > len(ids):
+                # Artistes encodés entre le comptage et la lecture
+                extra = n + len(rows) - len(ids)
+                ids = np.concatenate([ids, np.empty(extra, dtype=np.int64)])
+                matrix = np.concatenate([matrix, np.empty((extra, dim), dtype=np.float32)])
+            ids[n:n + len(rows)] = [row[0] for row in rows]
+            names.extend(row[1] for row in rows)
+            matrix[n:n + len(rows)] = np.frombuffer(b"".join(row[2] for row in rows),
+                                                    dtype=EMBEDDING_DTYPE).reshape(len(rows), dim)
+            n += len(rows)
+    ids, matrix = ids[:n], matrix[:n]
 
     # Normalisation L2 → cosine similarity = simple dot product
     norms = np.linalg.norm(matrix, axis=1, keepdims=True)
     norms = np.where(norms == 0, 1.0, norms)   # évite division par zéro
     matrix /= norms
+    return ids, names, matrix
+
+def _publish_artifact(conn) -> None:
+    """Lit tous les embeddings et publie une version (index ann compris)."""
+    global _invalidated
+    ids, names, matrix = _read_embeddings(conn)
+    previous = _ARTISTS.refresh()
+    index = ann.index_arrays(matrix, previous.arrays if previous is not None else None)
+    _ARTISTS.publish(
+        {"ids": ids, "order": np.argsort(ids, kind="stable"), "matrix": matrix,
+         **encode_strings("name", names), **index},
+        {"rows": len(ids)},
+    )
+    _invalidated = False
+
+def _update_artifact(conn, artist_ids) -> bool:
+    """
+    Publie la version courante avec les vecteurs des artistes `artist_ids`
+    remplacés (ou ajoutés à la fin), sans relire les autres embeddings ;
+    l'index ann ne réaffecte que ces lignes. False si une reconstruction
+    complète est nécessaire.
+    """
+    artifact = _ARTISTS.refresh()
+    if artifact is None or _invalidated or _outdated(artifact):
+        return False
+    ids, names, matrix = _read_embeddings(conn, artist_ids)
+    if ids.size == 0:
+        return True
+    old_ids, old_matrix, order = artifact["ids"], artifact["matrix"], artifact["order"]
+    if old_ids.size == 0 or matrix.shape[1] != old_matrix.shape[1]:
+        return False
+
+    pos = np.minimum(np.searchsorted(old_ids[order], ids), old_ids.size - 1)
+    existing = old_ids[order[pos]] == ids
+    rows = order[pos[existing]]
+    old_names = artifact.strings("name")
+    if any(old_names[row] != name for row, name in zip(rows, np.asarray(names, dtype=object)[existing])):
+        return False    # artiste renommé : colonne de textes à réécrire entièrement
+
+    added = ~existing
+    all_ids = np.concatenate([old_ids, ids[added]])
+    all_matrix = np.concatenate([old_matrix, matrix[added]])
+    all_matrix[rows] = matrix[existing]
+    index = ann.index_arrays(all_matrix, artifact.arrays, previous_rows=len(old_ids), changed_rows=rows)
+    _ARTISTS.publish(
+        {"ids": all_ids, "order": np.argsort(all_ids, kind="stable"), "matrix": all_matrix,
+         **append_strings(artifact.arrays, "name", [n for n, a in zip(names, added) if a]), **index},
+        {"rows": len(all_ids), "updated": int(existing.sum()), "appended": int(added.sum()),
+         "base_built_at": artifact.built_at},
+    )
+    return True
 
-    _cache["ids"]    = ids
-    _cache["names"]  = names
-    _cache["matrix"] = matrix
+def _load_cache(force: bool = False) -> None:
+    """Ouvre l'artefact ; le (re)construit s'il manque, est périmé ou si force=True."""
+    artifact = _ARTISTS.refresh()
+    if not force and not _outdated(artifact):
+        return
+    conn = db_connect()
+    try:
+        with build_lock(conn, "artists"):
+            # Un autre worker a pu publier pendant l'attente du verrou
+            artifact = _ARTISTS.refresh()
+            if force or _outdated(artifact):
+                _publish_artifact(conn)
+    finally:
+        conn.close()
 
 def _get_cache():
-    """Retourne le cache, le charge si nécessaire."""
-    if _cache["ids"] is None:
-        _load_cache()
-    return _cache
+    """Retourne l'artefact courant, le charge si nécessaire."""
+    artifact = _ARTISTS.get()
+    if artifact is None or _invalidated:
+        _load_cache(force=_invalidated)
+        artifact = _ARTISTS.artifact
+    return artifact
+
+def cache_loaded() -> bool:
+    return _ARTISTS.artifact is not None
+
+def _search_index(artifact):
+    """Index ann de la version `artifact`, ouvert une fois par process et par version."""
+    global _index
+    current = _index
+    if current is None or current[0] != artifact.version:
+        current = (artifact.version, ann.open_index(artifact["matrix"], artifact.arrays))
+        _index = current
+    return current[1]
+
+def artifact_status():
+    artifact = _ARTISTS.artifact
+    if artifact is None:
+        return None
+    return {"version": artifact.version, "rows": len(artifact["ids"]), "bytes": artifact.nbytes(),
+            "ann": ann.describe(_search_index(artifact))}
+
+def rebuild_artifact() -> None:
+    """Republie l'artefact depuis la base (les autres workers basculent d'eux-mêmes)."""
+    _load_cache(force=True)
 
 def invalidate_cache() -> None:
-    """À appeler si la DB est modifiée en dehors du process."""
-    _cache["ids"] = None
+    """À appeler si la DB est modifiée en dehors du process : reconstruction au prochain appel."""
+    global _invalidated
+    _invalidated = True
 
 # ==================================================
 # INITIALIZE
 # ==================================================
-def initialize_artist_system() -> None:
+def refresh_embeddings(progress=None) -> int:
     """
-    Vérifie le schéma DB, calcule les embeddings manquants, précharge le cache.
+    Réencode les artistes sans embedding ou dont le texte a changé
+    (empreinte), puis publie une version de l'artefact avec leurs nouveaux
+    vecteurs : recommend_artists continue sur l'ancienne version jusqu'à la
+    bascule. Renvoie le nombre d'artistes encodés.
     """
-    print("Création des embeddings d'artistes...")
-    ensure_embedding_column()
-
+    # Un seul worker encode et publie l'artefact ; les autres attendent le verrou
     conn = db_connect()
-    df = pd.read_sql("SELECT * FROM sae.artist;", conn)
-    conn.close()
-
-    compute_missing_embeddings(df, MODEL)
-    _load_cache()   # préchauffe le cache
+    try:
+        with build_lock(conn, "artists"):
+            encoded = encode_artists(stale_artists(conn), progress=progress)
+            # Vecteurs remplacés / ajoutés dans la version courante quand c'est possible
+            updated = bool(encoded) and _update_artifact(conn, encoded)
+            if not updated and (encoded or _invalidated or _outdated(_ARTISTS.refresh())):
+                _publish_artifact(conn)
+    finally:
+        conn.close()
+    return len(encoded)
+
+def initialize_artist_system(progress=None) -> None:
+    """
+    Calcule les embeddings manquants ou périmés, précharge le cache.
+    Lancée en arrière-plan par l'API (voir API/scripts/warmup.py), puis
+    refresh_embeddings est relancée périodiquement (embedding_worker.py).
+    Colonnes : Tables/migrations/0005 à 0007.
+    """
+    print("Création des embeddings d'artistes...")
+    refresh_embeddings(progress)
     print("Recommendation d'artistes prête.")
 
 # ==================================================
 # PUBLIC API
 # ==================================================
-def recommend_artists(artist_ids, top_k: int = 5) -> list[dict]:
-    """
-    Recommande des artistes similaires.
-    Accepte un artist_id (int) ou une liste d'artist_ids.
-    """
-    ensure_embedding_column()
-
-    if isinstance(artist_ids, int):
-        artist_ids = [artist_ids]
-    input_ids_set = set(artist_ids)
-
-    cache = _get_cache()
-    ids    = cache["ids"]
-    names  = cache["names"]
-    matrix = cache["matrix"]
+def _similar_artist_rows(artifact, artist_ids, top_k: int):
+    """(lignes, similarités) des top_k artistes les plus proches du profil de artist_ids, sans eux."""
+    ids    = artifact["ids"]
+    matrix = artifact["matrix"]
+    empty = (np.array([], dtype=np.int64), np.array([], dtype=np.float32))
 
     if ids.size == 0:
-        return []
+        return empty
 
-    # Masque booléen des artistes en entrée
-    input_mask = np.isin(ids, list(input_ids_set))
-    if not input_mask.any():
-        return []
+    # Lignes des artistes en entrée (ids triés via `order`)
+    order = artifact["order"]
+    wanted = np.unique(np.asarray(artist_ids, dtype=np.int64))
+    pos = np.minimum(np.searchsorted(ids[order], wanted), ids.size - 1)
+    input_rows = order[pos][ids[order[pos]] == wanted]
+    if input_rows.size == 0:
+        return empty
 
     # Profil cible = moyenne des embeddings normalisés → re-normalisation
-    target_emb = matrix[input_mask].mean(axis=0)
+    target_emb = matrix[input_rows].mean(axis=0)
     norm = np.linalg.norm(target_emb)
     if norm > 0:
         target_emb /= norm
 
-    # Cosine similarity via dot product (matrice déjà normalisée)
-    similarities = matrix @ target_emb   # (N,)
+    n_candidates = min(top_k, ids.size - input_rows.size)
+    if n_candidates <= 0:
+        return empty
+
+    # Cosine similarity via dot product (matrice déjà normalisée), sur les
+    # listes les plus proches seulement si un index approché est publié ;
+    # les artistes en entrée peuvent en faire partie : on en demande plus
+    index = _search_index(artifact)
+    rows, similarities = index.search(target_emb, n_candidates + input_rows.size)
+    keep = ~np.isin(rows, input_rows)
+    if keep.sum() < n_candidates and index.name != "exact":
+        rows, similarities = ann.ExactIndex(matrix).search(target_emb, n_candidates + input_rows.size)
+        keep = ~np.isin(rows, input_rows)
+    return rows[keep][:n_candidates], similarities[keep][:n_candidates]
+
+def similar_artist_scores(artist_ids, top_k: int):
+    """(artist_ids, similarités) des top_k artistes les plus proches, artistes en entrée exclus."""
+    artifact = _get_cache()
+    if artifact is None:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+    rows, similarities = _similar_artist_rows(artifact, artist_ids, top_k)
+    return np.asarray(artifact["ids"][rows], dtype=np.int64), np.asarray(similarities, dtype=np.float32)
 
-    # Exclure les artistes en entrée avant de chercher le top-k
-    similarities[input_mask] = -1.0
+def recommend_artists(artist_ids, top_k: int = 5) -> list[dict]:
+    """
+    Recommande des artistes similaires.
+    Accepte un artist_id (int) ou une liste d'artist_ids.
+    """
+    if isinstance(artist_ids, int):
+        artist_ids = [artist_ids]
 
-    # np.argpartition : O(N) au lieu de O(N log N) pour le tri complet
-    n_candidates = min(top_k, ids.size - input_mask.sum())
-    if n_candidates <= 0:
+    artifact = _get_cache()
+    if artifact is None:
         return []
-
-    top_indices = np.argpartition(similarities, -n_candidates)[-n_candidates:]
-    top_indices = top_indices[np.argsort(similarities[top_indices])[::-1]]
+    ids   = artifact["ids"]
+    names = artifact.strings("name")
+    rows, similarities = _similar_artist_rows(artifact, artist_ids, top_k)
 
     return [
         {
             "artist_id":   int(ids[i]),
             "artist_name": str(names[i]),
-            "similarity":  float(round(float(similarities[i]), 4)),
+            "similarity":  float(round(float(sim), 4)),
         }
-        for i in top_indices
-    ]
\ No newline at end of file
+        for i, sim in zip(rows, similarities)
+    ]
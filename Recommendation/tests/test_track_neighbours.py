@@ -0,0 +1,43 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import item_based_pierre  # noqa: E402
+from bench_track_features import synthetic  # noqa: E402
+from track_neighbours import compute_neighbours  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def catalogue():
+    # Catalogue synthétique : beaucoup de musiques de mêmes durée, bitrate et genre (ex aequo)
+    _, df = synthetic(3000)
+    artifact = item_based_pierre.build_track_arrays(df)
+    table = compute_neighbours(artifact["matrix"], artifact["track_id"], artifact["lookup_rows"], k=50)
+    return artifact, table
+
+
+def test_table_matches_full_computation(catalogue, monkeypatch):
+    artifact, table = catalogue
+    seeds = np.random.default_rng(1).choice(artifact["lookup_ids"], 200, replace=False)
+
+    monkeypatch.setattr(item_based_pierre, "_neighbours_for", lambda a: table)
+    from_table = [item_based_pierre.similar_track_scores(artifact, [int(s)], 10) for s in seeds]
+    monkeypatch.setattr(item_based_pierre, "_neighbours_for", lambda a: None)
+    full = [item_based_pierre.similar_track_scores(artifact, [int(s)], 10) for s in seeds]
+
+    for (table_ids, table_scores), (full_ids, full_scores) in zip(from_table, full):
+        assert table_ids.tolist() == full_ids.tolist()
+        assert table_scores.tolist() == full_scores.tolist()
+
+
+def test_ties_ordered_by_row(catalogue):
+    _, table = catalogue
+    rows, scores = table["rows"], table["scores"]
+    tied = scores[:, 1:] == scores[:, :-1]
+    assert tied.any()
+    assert (rows[:, 1:][tied] > rows[:, :-1][tied]).all()
+    assert (scores[:, 1:] <= scores[:, :-1]).all()
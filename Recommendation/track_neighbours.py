@@ -0,0 +1,124 @@
+"""
+Calcule la table des K plus proches voisins de chaque musique (artefact
+'track_neighbours', voir artifacts.py) à partir de l'artefact 'tracks'.
+
+    python Recommendation/track_neighbours.py            # si la table est périmée
+    python Recommendation/track_neighbours.py --force --k 300
+
+L'API la lance aussi en arrière-plan au démarrage (préchauffage) et après
+une reconstruction de la matrice des musiques.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# ==================================================
+# TOP-K PAR BLOCS
+# Similarité cosinus = produit de la matrice L2-normalisée par sa
+# transposée, calculé par blocs de `block` lignes (mémoire bornée à
+# block x N float64 par thread : 100 Mo pour 128 x 100 000) ; les
+# blocs sont répartis sur `workers` threads (numpy relâche le GIL pendant
+# les produits et les partitions). Une musique n'est jamais sa propre
+# voisine, même si elle avait plusieurs lignes dans la matrice.
+# Ex aequo (fréquents : durée, bitrate et genre identiques) départagés par
+# ligne croissante, comme le calcul complet d'item_based_pierre : pour une
+# musique source, la table et ce calcul donnent la même liste.
+# ==================================================
+
+DEFAULT_K = int(os.getenv("RECO_NEIGHBOURS_K", 200))
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def cosine_scores(normalized: np.ndarray, profiles: np.ndarray) -> np.ndarray:
+    """
+    Similarités (len(profiles), len(normalized)) float32 entre profils et
+    lignes L2-normalisés. Produit en float64 puis arrondi : en float32, BLAS
+    ne somme pas dans le même ordre pour un bloc et pour un profil seul, et
+    les quasi ex aequo changeraient d'ordre d'un calcul à l'autre.
+    """
+    profiles = np.asarray(profiles, dtype=np.float64).reshape(-1, normalized.shape[1])
+    return (profiles @ np.asarray(normalized, dtype=np.float64).T).astype(np.float32)
+
+
+def _top_k_block(normalized, track_ids, seeds, k, extra):
+    """Voisins des lignes `seeds` : (indices de lignes, similarités), triés."""
+    scores = cosine_scores(normalized, normalized[seeds])           # (B, N)
+    width = min(k + extra, scores.shape[1])
+    # Toutes les lignes au moins aussi proches que la width-ième (un
+    # argpartition garderait une partie arbitraire des ex aequo de la coupure)
+    threshold = np.partition(scores, scores.shape[1] - width, axis=1)[:, scores.shape[1] - width]
+    block_rows, candidates = np.nonzero(scores >= threshold[:, None])
+    candidate_scores = scores[block_rows, candidates]
+    # Écarte les lignes de la même musique
+    keep = track_ids[candidates] != track_ids[seeds][block_rows]
+    block_rows, candidates, candidate_scores = block_rows[keep], candidates[keep], candidate_scores[keep]
+    # Par ligne du bloc : similarité décroissante puis indice croissant, k premières
+    order = np.lexsort((candidates, -candidate_scores, block_rows))
+    block_rows, candidates, candidate_scores = block_rows[order], candidates[order], candidate_scores[order]
+    rank = np.arange(len(block_rows)) - np.searchsorted(block_rows, block_rows)
+    first = rank < k
+    rows = np.full((len(seeds), k), -1, dtype=np.int32)             # moins de k voisins
+    sims = np.zeros((len(seeds), k), dtype=np.float32)
+    rows[block_rows[first], rank[first]] = candidates[first]
+    sims[block_rows[first], rank[first]] = candidate_scores[first]
+    return rows, sims
+
+
+def compute_neighbours(matrix, track_ids, seed_rows, k: int = DEFAULT_K,
+                       block: int = 128, workers: int = 0, progress=None):
+    """
+    Top-k des lignes `seed_rows` de `matrix` (une par musique) parmi toutes
+    les lignes. Renvoie {"rows": (S, k) int32, "scores": (S, k) float32} ;
+    -1 dans rows quand il y a moins de k voisins.
+    """
+    normalized = normalize_rows(matrix).astype(np.float64)     # converti une fois (cosine_scores)
+    track_ids = np.asarray(track_ids)
+    seed_rows = np.asarray(seed_rows, dtype=np.int64)
+    k = max(1, min(k, len(track_ids)))
+    # Marge pour les lignes de la même musique écartées ensuite
+    extra = int(np.unique(track_ids, return_counts=True)[1].max()) if len(track_ids) else 0
+
+    rows = np.full((len(seed_rows), k), -1, dtype=np.int32)
+    scores = np.zeros((len(seed_rows), k), dtype=np.float32)
+    starts = range(0, len(seed_rows), block)
+    done = 0
+
+    def run(start):
+        seeds = seed_rows[start:start + block]
+        rows[start:start + len(seeds)], scores[start:start + len(seeds)] = _top_k_block(
+            normalized, track_ids, seeds, k, extra)
+        return len(seeds)
+
+    with ThreadPoolExecutor(max_workers=workers or min(4, os.cpu_count() or 1)) as pool:
+        for count in pool.map(run, starts):
+            done += count
+            if progress:
+                progress(done, len(seed_rows))
+    return {"rows": rows, "scores": scores}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help="voisins gardés par musique")
+    parser.add_argument("--force", action="store_true", help="recalcule même si la table est à jour")
+    args = parser.parse_args()
+
+    import item_based_pierre
+    started = time.perf_counter()
+    item_based_pierre.load_data_into_cache()
+    built = item_based_pierre.ensure_neighbours(k=args.k, force=args.force)
+    status = item_based_pierre.artifact_status()
+    print(f"{'Table recalculée' if built else 'Table déjà à jour'} : {status['neighbours']} "
+          f"({time.perf_counter() - started:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
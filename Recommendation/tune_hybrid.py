@@ -0,0 +1,131 @@
+"""
+Réglage hors ligne des poids du moteur hybride (hybrid.py).
+
+    python Recommendation/tune_hybrid.py                         # écrit les poids dans hybrid.WEIGHTS_FILE
+    python Recommendation/tune_hybrid.py --queries 1000 --step 0.05 --k 20
+    python Recommendation/tune_hybrid.py --dry-run               # affiche seulement le classement
+
+Vérité terrain : les playlists et les musiques aimées ou écoutées de chaque
+utilisateur (user_reaction, users_track), d'au moins 3 musiques. Pour
+--queries listes tirées au hasard, une musique est mise de côté et jusqu'à
+--seeds autres servent de départ ; une combinaison de poids est notée sur le
+rang de la musique mise de côté : taux de réussite@k (retrouvée dans les k
+premières), puis MRR@k. Les candidats de chaque source sont calculés une
+fois par requête : toutes les combinaisons de la grille (poids multiples de
+--step, somme 1) sont évaluées ensemble par un produit matriciel.
+L'API relit le fichier de poids à la requête suivante, sans redémarrage.
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+import psycopg2.extras
+
+import hybrid
+import item_based_alexis
+import item_based_pierre
+
+BASKETS_QUERY = """
+    SELECT 'playlist:' || playlist_id AS basket, array_agg(track_id) AS track_ids
+    FROM sae.playlist_track
+    GROUP BY playlist_id
+    HAVING count(*) >= 3
+    UNION ALL
+    SELECT 'user:' || user_id, array_agg(DISTINCT track_id)
+    FROM (
+        SELECT user_id, target_id AS track_id FROM sae.user_reaction
+        WHERE target_type = 'track' AND (liked OR favorite)
+        UNION
+        SELECT user_id, track_id FROM sae.users_track
+    ) liked
+    GROUP BY user_id
+    HAVING count(DISTINCT track_id) >= 3
+"""
+
+
+def weight_grid(step: float) -> np.ndarray:
+    """Combinaisons (len(SOURCES) colonnes) de multiples de `step` dont la somme vaut 1."""
+    units = int(round(1 / step))
+    grid = [c for c in itertools.product(range(units + 1), repeat=len(hybrid.SOURCES)) if sum(c) == units]
+    return np.array(grid, dtype=np.float32) / units
+
+
+def target_ranks(ids: np.ndarray, matrix: np.ndarray, target: int, grid: np.ndarray) -> np.ndarray:
+    """Rang (1 = premier) de `target` pour chaque combinaison de `grid` ; inf s'il n'est pas candidat."""
+    hit = np.flatnonzero(ids == target)
+    if hit.size == 0:
+        return np.full(len(grid), np.inf)
+    fused = matrix @ grid.T                         # candidats x combinaisons
+    mine = fused[hit[0]]
+    # Ex aequo : rang moyen, pour ne pas favoriser les poids qui écrasent les scores
+    return (fused > mine).sum(axis=0) + ((fused == mine).sum(axis=0) - 1) / 2 + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=500, help="listes tirées au hasard")
+    parser.add_argument("--seeds", type=int, default=5, help="musiques de départ par requête, au plus")
+    parser.add_argument("--k", type=int, default=10, help="rang retenu pour la réussite et le MRR")
+    parser.add_argument("--step", type=float, default=0.1, help="pas de la grille des poids")
+    parser.add_argument("--candidates", type=int, default=hybrid.CANDIDATES, help="candidats par source")
+    parser.add_argument("--dry-run", action="store_true", help="n'écrit pas le fichier de poids")
+    args = parser.parse_args()
+
+    conn = item_based_alexis.get_connection()
+    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cur.execute(BASKETS_QUERY)
+    baskets = [row["track_ids"] for row in cur.fetchall()]
+    conn.rollback()
+    if not baskets:
+        raise SystemExit("Aucune playlist ni liste de musiques aimées d'au moins 3 musiques")
+    artifact = item_based_pierre.tracks_snapshot()
+    if artifact is None:
+        raise SystemExit("Matrice 'tracks' indisponible")
+
+    rng = np.random.default_rng(0)
+    grid = weight_grid(args.step)
+    ranks, timings = [], []
+    started = time.perf_counter()
+    for b in rng.integers(0, len(baskets), args.queries):
+        tracks = rng.permutation(baskets[b])
+        target, seeds = int(tracks[0]), [int(t) for t in tracks[1:args.seeds + 1]]
+        stage = {}
+        candidates = hybrid.gather(artifact, seeds, cur, args.candidates, timings=stage)
+        conn.rollback()
+        ranks.append(target_ranks(*hybrid.score_matrix(candidates), target, grid))
+        timings.append(stage)
+    ranks = np.array(ranks)                           # requêtes x combinaisons
+    print(f"{len(ranks)} requêtes sur {len(baskets)} listes en {time.perf_counter() - started:.1f} s, "
+          f"{len(grid)} combinaisons de poids")
+    for source in hybrid.SOURCES:
+        ms = [t[source] for t in timings if source in t]
+        if ms:
+            print(f"  {source:<9}: {np.median(ms):.2f} ms médiane, {np.percentile(ms, 95):.2f} ms p95")
+
+    hits = (ranks <= args.k).mean(axis=0)
+    mrr = np.where(ranks <= args.k, 1 / ranks, 0).mean(axis=0)
+    order = np.lexsort((-mrr, -hits))
+    print(f"\n{'poids (' + '/'.join(hybrid.SOURCES) + ')':<36} {'réussite@' + str(args.k):>12} {'MRR@' + str(args.k):>8}")
+    singles = [i for i, w in enumerate(grid) if w.max() == 1]
+    for i in list(order[:5]) + [i for i in singles if i not in order[:5]]:
+        label = " / ".join(f"{w:.2f}" for w in grid[i]) + ("  (source seule)" if i in singles else "")
+        print(f"{label:<36} {hits[i]:>12.3f} {mrr[i]:>8.3f}")
+
+    best = grid[order[0]]
+    weights = {s: round(float(w), 4) for s, w in zip(hybrid.SOURCES, best)}
+    if args.dry_run:
+        return
+    os.makedirs(os.path.dirname(hybrid.WEIGHTS_FILE), exist_ok=True)
+    tmp = f"{hybrid.WEIGHTS_FILE}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"weights": weights, "k": args.k, "hit_rate": round(float(hits[order[0]]), 4),
+                   "mrr": round(float(mrr[order[0]]), 4), "queries": len(ranks), "tuned_at": time.time()}, f)
+    os.replace(tmp, hybrid.WEIGHTS_FILE)
+    print(f"\nPoids enregistrés dans {hybrid.WEIGHTS_FILE} : {weights}")
+
+
+if __name__ == "__main__":
+    main()
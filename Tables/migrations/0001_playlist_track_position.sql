@@ -0,0 +1,11 @@
+-- Ordre des musiques dans une playlist (anciennement ajouté au démarrage de l'API)
+ALTER TABLE sae.playlist_track ADD COLUMN IF NOT EXISTS position INT DEFAULT 0;
+
+-- Numérotation des lignes existantes, dans l'ordre des track_id
+WITH numbered AS (
+    SELECT ctid, ROW_NUMBER() OVER (PARTITION BY playlist_id ORDER BY track_id) - 1 AS pos
+    FROM sae.playlist_track
+    WHERE position = 0
+)
+UPDATE sae.playlist_track SET position = numbered.pos
+FROM numbered WHERE sae.playlist_track.ctid = numbered.ctid AND sae.playlist_track.position = 0;
@@ -0,0 +1,2 @@
+-- Image de couverture des playlists (/playlists/{id}/image)
+ALTER TABLE sae.playlist ADD COLUMN IF NOT EXISTS playlist_image TEXT;
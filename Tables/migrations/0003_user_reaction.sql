@@ -0,0 +1,12 @@
+-- Likes, dislikes et favoris des utilisateurs sur les musiques, artistes et albums
+CREATE TABLE IF NOT EXISTS sae.user_reaction (
+    user_id INT REFERENCES sae.users(user_id),
+    target_type VARCHAR(20) NOT NULL,
+    target_id INT NOT NULL,
+    liked BOOLEAN DEFAULT FALSE,
+    disliked BOOLEAN DEFAULT FALSE,
+    favorite BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (user_id, target_type, target_id)
+);
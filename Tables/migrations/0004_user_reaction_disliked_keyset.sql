@@ -0,0 +1,4 @@
+-- Pagination par curseur des titres dislikés (/users/{id}/disliked_tracks)
+CREATE INDEX IF NOT EXISTS idx_user_reaction_disliked_keyset
+ON sae.user_reaction (user_id, (COALESCE(updated_at, TIMESTAMP '0001-01-01 00:00:00')) DESC, target_id DESC)
+WHERE target_type = 'track' AND disliked = TRUE;
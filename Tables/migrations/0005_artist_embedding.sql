@@ -0,0 +1,2 @@
+-- Embeddings des artistes (Recommendation/item_based_stanislas.py), remplis par l'API
+ALTER TABLE sae.artist ADD COLUMN IF NOT EXISTS artist_embedding FLOAT8[];
@@ -0,0 +1,20 @@
+-- Embeddings des artistes en float32 binaire (BYTEA, 4 octets par valeur,
+-- ordre réseau) au lieu de FLOAT8[] : moitié moins de stockage, 8 fois
+-- moins d'octets transférés qu'en texte, et lecture directe par numpy
+-- (np.frombuffer(..., '>f4')) sans analyser de tableau ligne par ligne.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.columns
+               WHERE table_schema = 'sae' AND table_name = 'artist'
+                 AND column_name = 'artist_embedding' AND data_type = 'ARRAY') THEN
+        ALTER TABLE sae.artist ADD COLUMN artist_embedding_f32 BYTEA;
+        UPDATE sae.artist a
+        SET artist_embedding_f32 = (
+            SELECT string_agg(float4send(x::float4), ''::bytea ORDER BY i)
+            FROM unnest(a.artist_embedding) WITH ORDINALITY AS u(x, i)
+        )
+        WHERE a.artist_embedding IS NOT NULL;
+        ALTER TABLE sae.artist DROP COLUMN artist_embedding;
+        ALTER TABLE sae.artist RENAME COLUMN artist_embedding_f32 TO artist_embedding;
+    END IF;
+END $$;
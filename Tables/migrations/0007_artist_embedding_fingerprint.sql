@@ -0,0 +1,11 @@
+-- Empreinte du texte encodé dans artist_embedding : md5('<modèle>:' || texte),
+-- texte = champs non NULL séparés par un espace (build_artist_text dans
+-- Recommendation/item_based_stanislas.py). Un artiste dont l'empreinte ne
+-- correspond plus à son texte actuel est réencodé en arrière-plan.
+ALTER TABLE sae.artist ADD COLUMN IF NOT EXISTS artist_embedding_fingerprint TEXT;
+
+-- Embeddings déjà présents : supposés calculés sur le texte actuel
+UPDATE sae.artist
+SET artist_embedding_fingerprint = md5('all-MiniLM-L6-v2:' || concat_ws(' ',
+        artist_bio, artist_related_project, artist_location, artist_associated_label, artist_tags))
+WHERE artist_embedding IS NOT NULL AND artist_embedding_fingerprint IS NULL;
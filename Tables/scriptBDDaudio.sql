@@ -0,0 +1,36 @@
+SET SCHEMA 'sae';
+
+/* ##################################################################### */
+/* VECTEURS AUDIO RÉDUITS                                                */
+/* ##################################################################### */
+
+/*
+   /reco/tracks/audio présélectionne ses candidats dans un index HNSW de
+   petits vecteurs (16 à 128 dimensions au lieu de 224), puis les reclasse
+   avec audio_vector (voir Recommendation/item_based_alexis.py).
+   Les vecteurs réduits sont calculés par Recommendation/audio_reduction.py
+   (ACP ou projection aléatoire de temporal_features_vectors) :
+   - audio_projection : une ligne par taille, avec la matrice de projection
+     (float32 big-endian, dims x 224) pour projeter de nouvelles musiques
+   - temporal_features_reduced : une ligne par (taille, musique). Le nombre
+     de dimensions d'un index pgvector est fixe : audio_reduction.py crée un
+     index HNSW partiel par taille (idx_tfr_hnsw_<dims>, WHERE dims = <dims>)
+   Plusieurs tailles peuvent coexister (comparaison, changement de taille
+   sans interruption). Ce script s'exécute après scriptBDDdlc.sql.
+*/
+
+CREATE TABLE IF NOT EXISTS audio_projection (
+    dims               INT PRIMARY KEY,
+    method             TEXT NOT NULL,
+    explained_variance DOUBLE PRECISION,
+    tracks             INT NOT NULL,
+    components         BYTEA NOT NULL,
+    fitted_at          TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS temporal_features_reduced (
+    dims           INT NOT NULL REFERENCES audio_projection(dims) ON DELETE CASCADE,
+    track_id       INT NOT NULL REFERENCES tracks(track_id) ON DELETE CASCADE,
+    reduced_vector vector NOT NULL,
+    PRIMARY KEY (dims, track_id)
+);
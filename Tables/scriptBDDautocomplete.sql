@@ -0,0 +1,86 @@
+SET SCHEMA 'sae';
+
+/* ##################################################################### */
+/* NOTIFICATIONS DE L'AUTOCOMPLÉTION                                     */
+/* ##################################################################### */
+
+/*
+   L'API garde en mémoire un index de préfixes des titres, artistes et
+   albums (API/scripts/autocomplete.py). Ces triggers lui signalent les
+   changements du catalogue par NOTIFY sur le canal 'sae_catalog' :
+   payload '<table>:<id>,<id>,...', ou '<table>:*' quand la liste ne tient
+   pas dans une notification (l'API reconstruit alors toute la table).
+   Une mise à jour ne notifie que si le nom ou le poids a changé.
+   Les notifications partent au COMMIT, jamais pour une transaction annulée.
+*/
+
+CREATE OR REPLACE FUNCTION sae.notify_catalog_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    id_col TEXT := TG_ARGV[0];
+    label_col TEXT := TG_ARGV[1];
+    weight_col TEXT := TG_ARGV[2];
+    ids TEXT;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM pg_notify('sae_catalog', TG_TABLE_NAME || ':*');
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'INSERT' THEN
+        EXECUTE format('SELECT string_agg(%1$I::text, '','') FROM new_rows', id_col) INTO ids;
+    ELSIF TG_OP = 'DELETE' THEN
+        EXECUTE format('SELECT string_agg(%1$I::text, '','') FROM old_rows', id_col) INTO ids;
+    ELSE
+        EXECUTE format(
+            'SELECT string_agg(n.%1$I::text, '','')
+             FROM new_rows n
+             LEFT JOIN old_rows o ON o.%1$I = n.%1$I
+             WHERE o.%1$I IS NULL
+                OR o.%2$I IS DISTINCT FROM n.%2$I
+                OR o.%3$I IS DISTINCT FROM n.%3$I',
+            id_col, label_col, weight_col
+        ) INTO ids;
+    END IF;
+
+    IF ids IS NOT NULL THEN
+        -- Limite d'une notification : 8000 octets
+        IF length(ids) > 7900 THEN
+            ids := '*';
+        END IF;
+        PERFORM pg_notify('sae_catalog', TG_TABLE_NAME || ':' || ids);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION sae.create_catalog_triggers(table_name TEXT, id_col TEXT, label_col TEXT, weight_col TEXT)
+RETURNS VOID AS $$
+DECLARE
+    args TEXT := format('%L, %L, %L', id_col, label_col, weight_col);
+BEGIN
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON sae.%I', table_name || '_catalog_ins', table_name);
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON sae.%I', table_name || '_catalog_upd', table_name);
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON sae.%I', table_name || '_catalog_del', table_name);
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON sae.%I', table_name || '_catalog_trunc', table_name);
+
+    EXECUTE format('CREATE TRIGGER %I AFTER INSERT ON sae.%I REFERENCING NEW TABLE AS new_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION sae.notify_catalog_change(%s)',
+                   table_name || '_catalog_ins', table_name, args);
+    EXECUTE format('CREATE TRIGGER %I AFTER UPDATE ON sae.%I REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION sae.notify_catalog_change(%s)',
+                   table_name || '_catalog_upd', table_name, args);
+    EXECUTE format('CREATE TRIGGER %I AFTER DELETE ON sae.%I REFERENCING OLD TABLE AS old_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION sae.notify_catalog_change(%s)',
+                   table_name || '_catalog_del', table_name, args);
+    EXECUTE format('CREATE TRIGGER %I AFTER TRUNCATE ON sae.%I
+                    FOR EACH STATEMENT EXECUTE FUNCTION sae.notify_catalog_change(%s)',
+                   table_name || '_catalog_trunc', table_name, args);
+END;
+$$ LANGUAGE plpgsql;
+
+
+SELECT sae.create_catalog_triggers('tracks', 'track_id', 'track_title', 'track_listens');
+SELECT sae.create_catalog_triggers('artist', 'artist_id', 'artist_name', 'artist_favorites');
+SELECT sae.create_catalog_triggers('album', 'album_id', 'album_title', 'album_listens');
@@ -0,0 +1,115 @@
+SET SCHEMA 'sae';
+
+/* ##################################################################### */
+/* COMPTEURS DE LIGNES                                                   */
+/* ##################################################################### */
+
+/*
+   Les réponses paginées de l'API renvoient un total. Plutôt qu'un COUNT(*)
+   à chaque requête, les totaux sans filtre sont lus dans row_counts, tenue
+   à jour par des triggers par instruction.
+   Clés : '<table>' pour la table entière, '<table>:<valeur>' pour un
+   compteur par groupe (ex. 'track_genre:12' = nombre de titres du genre 12).
+   sae.recount_rows() recalcule un compteur depuis la table en cas de dérive.
+   Ce script s'exécute après le peuplement de la base.
+*/
+
+CREATE TABLE IF NOT EXISTS row_counts (
+    counter TEXT PRIMARY KEY,
+    n       BIGINT NOT NULL DEFAULT 0
+);
+
+
+CREATE OR REPLACE FUNCTION sae.count_rows()
+RETURNS TRIGGER AS $$
+DECLARE
+    group_col TEXT := TG_ARGV[0];
+    key_expr TEXT;
+    changes TEXT;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM sae.row_counts WHERE counter = TG_TABLE_NAME OR counter LIKE TG_TABLE_NAME || ':%';
+        RETURN NULL;
+    END IF;
+
+    IF group_col IS NULL THEN
+        key_expr := quote_literal(TG_TABLE_NAME);
+    ELSE
+        key_expr := format('%L || '':'' || %I', TG_TABLE_NAME, group_col);
+    END IF;
+
+    changes := CASE TG_OP
+        WHEN 'INSERT' THEN format('SELECT %s AS k, 1 AS d FROM new_rows', key_expr)
+        WHEN 'DELETE' THEN format('SELECT %s AS k, -1 AS d FROM old_rows', key_expr)
+        ELSE format('SELECT %1$s AS k, 1 AS d FROM new_rows UNION ALL SELECT %1$s, -1 FROM old_rows', key_expr)
+    END;
+
+    -- ORDER BY : verrous pris toujours dans le même ordre entre transactions concurrentes
+    EXECUTE format(
+        'INSERT INTO sae.row_counts (counter, n)
+         SELECT k, SUM(d) FROM (%s) c WHERE k IS NOT NULL GROUP BY k HAVING SUM(d) <> 0 ORDER BY k
+         ON CONFLICT (counter) DO UPDATE SET n = row_counts.n + EXCLUDED.n',
+        changes
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION sae.recount_rows(table_name TEXT, group_col TEXT DEFAULT NULL)
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM sae.row_counts WHERE counter = table_name OR counter LIKE table_name || ':%';
+    IF group_col IS NULL THEN
+        EXECUTE format('INSERT INTO sae.row_counts (counter, n) SELECT %L, COUNT(*) FROM sae.%I', table_name, table_name);
+    ELSE
+        EXECUTE format(
+            'INSERT INTO sae.row_counts (counter, n)
+             SELECT %1$L || '':'' || %2$I, COUNT(*) FROM sae.%1$I WHERE %2$I IS NOT NULL GROUP BY %2$I',
+            table_name, group_col
+        );
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+
+/*
+   Transition tables : un trigger par évènement. Le trigger UPDATE n'existe
+   que pour les compteurs par groupe (une ligne peut changer de groupe).
+*/
+CREATE OR REPLACE FUNCTION sae.create_count_triggers(table_name TEXT, group_col TEXT DEFAULT NULL)
+RETURNS VOID AS $$
+DECLARE
+    args TEXT := CASE WHEN group_col IS NULL THEN '' ELSE quote_literal(group_col) END;
+BEGIN
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON sae.%I', table_name || '_count_ins', table_name);
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON sae.%I', table_name || '_count_upd', table_name);
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON sae.%I', table_name || '_count_del', table_name);
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON sae.%I', table_name || '_count_trunc', table_name);
+
+    EXECUTE format('CREATE TRIGGER %I AFTER INSERT ON sae.%I REFERENCING NEW TABLE AS new_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION sae.count_rows(%s)',
+                   table_name || '_count_ins', table_name, args);
+    EXECUTE format('CREATE TRIGGER %I AFTER DELETE ON sae.%I REFERENCING OLD TABLE AS old_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION sae.count_rows(%s)',
+                   table_name || '_count_del', table_name, args);
+    EXECUTE format('CREATE TRIGGER %I AFTER TRUNCATE ON sae.%I
+                    FOR EACH STATEMENT EXECUTE FUNCTION sae.count_rows(%s)',
+                   table_name || '_count_trunc', table_name, args);
+    IF group_col IS NOT NULL THEN
+        EXECUTE format('CREATE TRIGGER %I AFTER UPDATE ON sae.%I REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION sae.count_rows(%s)',
+                       table_name || '_count_upd', table_name, args);
+    END IF;
+
+    PERFORM sae.recount_rows(table_name, group_col);
+END;
+$$ LANGUAGE plpgsql;
+
+
+SELECT sae.create_count_triggers('tracks');
+SELECT sae.create_count_triggers('album');
+SELECT sae.create_count_triggers('artist');
+SELECT sae.create_count_triggers('genre');
+SELECT sae.create_count_triggers('users');
+SELECT sae.create_count_triggers('track_genre', 'genre_id');
@@ -0,0 +1,216 @@
+SET SCHEMA 'sae';
+
+/* ##################################################################### */
+/* VUES MATÉRIALISÉES (tracks / album / artist features)                 */
+/* ##################################################################### */
+
+/*
+   Les vues tracks_features, album_features et artist_features agrègent
+   plusieurs jointures : les relire à chaque requête de l'API recalcule tout
+   le catalogue. Leur résultat est donc stocké dans des tables *_mat,
+   tenues à jour par des triggers qui ne recalculent que les lignes touchées.
+   sae.refresh_all_features() reconstruit tout sans bloquer les lectures
+   (secours après un chargement massif ou une désynchronisation).
+   Ce script s'exécute après le peuplement de la base.
+*/
+
+DROP TABLE IF EXISTS tracks_features_mat;
+DROP TABLE IF EXISTS album_features_mat;
+DROP TABLE IF EXISTS artist_features_mat;
+
+CREATE TABLE tracks_features_mat AS SELECT * FROM tracks_features WITH NO DATA;
+ALTER TABLE tracks_features_mat ADD PRIMARY KEY (track_id);
+
+CREATE TABLE album_features_mat AS SELECT * FROM album_features WITH NO DATA;
+ALTER TABLE album_features_mat ADD PRIMARY KEY (album_id);
+
+CREATE TABLE artist_features_mat AS SELECT * FROM artist_features WITH NO DATA;
+ALTER TABLE artist_features_mat ADD PRIMARY KEY (artist_id);
+
+
+/* ========================== RAFRAÎCHISSEMENT  ========================== */
+
+/*
+   Recalcule les lignes `ids` de <vue>_mat à partir de <vue> (ids NULL = tout).
+   Upsert + suppression des clés disparues de la table source : jamais de
+   TRUNCATE, les lectures concurrentes voient toujours une table complète.
+*/
+CREATE OR REPLACE FUNCTION sae.refresh_features(view_name TEXT, key_col TEXT, base_table TEXT, ids INT[] DEFAULT NULL)
+RETURNS VOID AS $$
+DECLARE
+    mat TEXT := view_name || '_mat';
+    assignments TEXT;
+    filter TEXT := '';
+BEGIN
+    IF ids IS NOT NULL THEN
+        IF cardinality(ids) = 0 THEN
+            RETURN;
+        END IF;
+        filter := format(' AND %I = ANY($1)', key_col);
+    END IF;
+
+    SELECT string_agg(format('%I = EXCLUDED.%I', attname, attname), ', ' ORDER BY attnum)
+    INTO assignments
+    FROM pg_attribute
+    WHERE attrelid = format('sae.%I', mat)::regclass
+      AND attnum > 0 AND NOT attisdropped AND attname <> key_col;
+
+    EXECUTE format(
+        'DELETE FROM sae.%1$I m WHERE NOT EXISTS (SELECT 1 FROM sae.%2$I b WHERE b.%3$I = m.%3$I)%4$s',
+        mat, base_table, key_col, filter
+    ) USING ids;
+
+    -- WHERE ... IS DISTINCT FROM : une ligne inchangée n'est pas réécrite
+    EXECUTE format(
+        'INSERT INTO sae.%1$I SELECT * FROM sae.%2$I WHERE TRUE%3$s
+         ON CONFLICT (%4$I) DO UPDATE SET %5$s
+         WHERE ROW(%1$I.*) IS DISTINCT FROM ROW(EXCLUDED.*)',
+        mat, view_name, filter, key_col, assignments
+    ) USING ids;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION sae.refresh_tracks_features(ids INT[] DEFAULT NULL)
+RETURNS VOID AS $$
+    SELECT sae.refresh_features('tracks_features', 'track_id', 'tracks', ids);
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION sae.refresh_album_features(ids INT[] DEFAULT NULL)
+RETURNS VOID AS $$
+    SELECT sae.refresh_features('album_features', 'album_id', 'album', ids);
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION sae.refresh_artist_features(ids INT[] DEFAULT NULL)
+RETURNS VOID AS $$
+    SELECT sae.refresh_features('artist_features', 'artist_id', 'artist', ids);
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION sae.refresh_all_features()
+RETURNS VOID AS $$
+BEGIN
+    PERFORM sae.refresh_tracks_features();
+    PERFORM sae.refresh_album_features();
+    PERFORM sae.refresh_artist_features();
+END;
+$$ LANGUAGE plpgsql;
+
+
+/* ========================== TRIGGERS DE SYNCHRONISATION  ========================== */
+
+/*
+   Trigger par instruction (transition tables) : un INSERT de 10 000 lignes
+   déclenche un seul recalcul groupé. Arguments : couples (vue, colonne) —
+   les valeurs de <colonne> des lignes modifiées désignent les lignes de <vue>
+   à recalculer. Si <colonne> n'est pas la clé de la vue (ex. album_id pour
+   tracks_features), la correspondance passe par artist_album_track.
+*/
+CREATE OR REPLACE FUNCTION sae.sync_features()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed TEXT;
+    view_name TEXT;
+    src_col TEXT;
+    key_col TEXT;
+    ids INT[];
+    i INT := 0;
+BEGIN
+    changed := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT * FROM new_rows'
+        WHEN 'DELETE' THEN 'SELECT * FROM old_rows'
+        ELSE 'SELECT * FROM new_rows UNION ALL SELECT * FROM old_rows'
+    END;
+
+    WHILE i < TG_NARGS LOOP
+        view_name := TG_ARGV[i];
+        src_col := TG_ARGV[i + 1];
+        key_col := CASE view_name
+            WHEN 'tracks_features' THEN 'track_id'
+            WHEN 'album_features' THEN 'album_id'
+            ELSE 'artist_id'
+        END;
+
+        IF src_col = key_col THEN
+            EXECUTE format('SELECT array_agg(DISTINCT %I) FROM (%s) s WHERE %I IS NOT NULL', src_col, changed, src_col)
+            INTO ids;
+        ELSE
+            EXECUTE format(
+                'SELECT array_agg(DISTINCT aat.%I) FROM sae.artist_album_track aat
+                 WHERE aat.%I IN (SELECT %I FROM (%s) s)',
+                key_col, src_col, src_col, changed
+            ) INTO ids;
+        END IF;
+
+        IF ids IS NOT NULL THEN
+            PERFORM sae.refresh_features(view_name, key_col,
+                CASE view_name WHEN 'tracks_features' THEN 'tracks' WHEN 'album_features' THEN 'album' ELSE 'artist' END,
+                ids);
+        END IF;
+        i := i + 2;
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+/*
+   Une transition table n'est autorisée que sur un seul évènement par trigger :
+   trois triggers (INSERT / UPDATE / DELETE) par table source.
+*/
+CREATE OR REPLACE FUNCTION sae.create_features_triggers(source_table TEXT, VARIADIC targets TEXT[])
+RETURNS VOID AS $$
+DECLARE
+    args TEXT := (SELECT string_agg(quote_literal(t), ', ') FROM unnest(targets) t);
+BEGIN
+    EXECUTE format('DROP TRIGGER IF EXISTS %1$I ON sae.%2$I', source_table || '_features_ins', source_table);
+    EXECUTE format('DROP TRIGGER IF EXISTS %1$I ON sae.%2$I', source_table || '_features_upd', source_table);
+    EXECUTE format('DROP TRIGGER IF EXISTS %1$I ON sae.%2$I', source_table || '_features_del', source_table);
+
+    EXECUTE format('CREATE TRIGGER %I AFTER INSERT ON sae.%I REFERENCING NEW TABLE AS new_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION sae.sync_features(%s)',
+                   source_table || '_features_ins', source_table, args);
+    EXECUTE format('CREATE TRIGGER %I AFTER UPDATE ON sae.%I REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION sae.sync_features(%s)',
+                   source_table || '_features_upd', source_table, args);
+    EXECUTE format('CREATE TRIGGER %I AFTER DELETE ON sae.%I REFERENCING OLD TABLE AS old_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION sae.sync_features(%s)',
+                   source_table || '_features_del', source_table, args);
+END;
+$$ LANGUAGE plpgsql;
+
+
+SELECT sae.create_features_triggers('tracks',             'tracks_features', 'track_id');
+SELECT sae.create_features_triggers('audio',              'tracks_features', 'track_id');
+SELECT sae.create_features_triggers('song_social_score',  'tracks_features', 'track_id');
+SELECT sae.create_features_triggers('song_rank',          'tracks_features', 'track_id');
+SELECT sae.create_features_triggers('artist_album_track', 'tracks_features', 'track_id',
+                                                          'album_features', 'album_id',
+                                                          'artist_features', 'artist_id');
+SELECT sae.create_features_triggers('album',              'album_features', 'album_id',
+                                                          'tracks_features', 'album_id');
+SELECT sae.create_features_triggers('artist',             'artist_features', 'artist_id',
+                                                          'album_features', 'artist_id',
+                                                          'tracks_features', 'artist_id');
+SELECT sae.create_features_triggers('artist_social_score', 'artist_features', 'artist_id');
+SELECT sae.create_features_triggers('artist_rank',        'artist_features', 'artist_id');
+
+
+/* ========================== CHARGEMENT INITIAL + INDEX  ========================== */
+
+SELECT sae.refresh_all_features();
+
+CREATE INDEX IF NOT EXISTS idx_tracks_features_mat_listens
+ON tracks_features_mat ((COALESCE(track_listens, -1)) DESC, track_id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_album_features_mat_released
+ON album_features_mat ((COALESCE(album_date_released, DATE '0001-01-01')) DESC, album_id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_artist_features_mat_favorites
+ON artist_features_mat ((COALESCE(artist_favorites, -1)) DESC, artist_id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_artist_album_track_album
+ON artist_album_track (album_id);
+
+ANALYZE tracks_features_mat;
+ANALYZE album_features_mat;
+ANALYZE artist_features_mat;
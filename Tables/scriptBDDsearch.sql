@@ -0,0 +1,123 @@
+SET SCHEMA 'sae';
+
+/* ##################################################################### */
+/* INDEX DE RECHERCHE DES MUSIQUES                                       */
+/* ##################################################################### */
+
+/*
+   /search/tracks ne parcourt plus tracks + jointures avec des ILIKE '%...%' :
+   chaque musique a un document de recherche (titre, artistes, albums,
+   genres, tags) dans track_search, indexé deux fois :
+   - tsvector + GIN : recherche par mots, préfixes ("revol:*") et classement
+   - pg_trgm + GIN  : sous-chaînes et fautes de frappe (similarité de mots)
+   Les accents sont ignorés (unaccent) des deux côtés. Pas de racinisation :
+   le catalogue mélange français et anglais, la recherche par préfixe suffit.
+   track_search est alimentée depuis tracks_features_mat par trigger : toute
+   écriture du catalogue qui modifie une fiche met à jour son document.
+   Ce script s'exécute après scriptBDDmat.sql.
+*/
+
+CREATE EXTENSION IF NOT EXISTS unaccent WITH SCHEMA public;
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public;
+
+/* unaccent() est STABLE : version IMMUTABLE (dictionnaire explicite) utilisable dans un index */
+CREATE OR REPLACE FUNCTION sae.search_normalize(value TEXT)
+RETURNS TEXT AS $$
+    SELECT lower(public.unaccent('public.unaccent'::regdictionary, COALESCE(value, '')));
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+DROP TEXT SEARCH CONFIGURATION IF EXISTS sae.muse CASCADE;
+CREATE TEXT SEARCH CONFIGURATION sae.muse (COPY = pg_catalog.simple);
+ALTER TEXT SEARCH CONFIGURATION sae.muse
+    ALTER MAPPING FOR asciiword, asciihword, hword_asciipart, word, hword, hword_part
+    WITH public.unaccent, pg_catalog.simple;
+
+
+DROP TABLE IF EXISTS track_search;
+
+CREATE TABLE track_search (
+    track_id    INT PRIMARY KEY REFERENCES tracks(track_id) ON DELETE CASCADE,
+    document    TSVECTOR NOT NULL,
+    search_text TEXT NOT NULL
+);
+
+
+/* ========================== ALIMENTATION  ========================== */
+
+/* Recalcule les documents des musiques `ids` (NULL = tout le catalogue) */
+CREATE OR REPLACE FUNCTION sae.refresh_track_search(ids INT[] DEFAULT NULL)
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM sae.track_search s
+    WHERE (ids IS NULL OR s.track_id = ANY(ids))
+      AND NOT EXISTS (SELECT 1 FROM sae.tracks_features_mat tf WHERE tf.track_id = s.track_id);
+
+    INSERT INTO sae.track_search (track_id, document, search_text)
+    SELECT
+        tf.track_id,
+        setweight(to_tsvector('sae.muse', COALESCE(tf.track_title, '')), 'A') ||
+        setweight(to_tsvector('sae.muse', COALESCE(tf.artist_names, '')), 'B') ||
+        setweight(to_tsvector('sae.muse', COALESCE(tf.album_titles, '')), 'C') ||
+        setweight(to_tsvector('sae.muse', concat_ws(' ', tf.track_genre_top, tf.track_genre, tf.track_tags)), 'D'),
+        sae.search_normalize(concat_ws(' ', tf.track_title, tf.artist_names, tf.album_titles))
+    FROM sae.tracks_features_mat tf
+    WHERE ids IS NULL OR tf.track_id = ANY(ids)
+    ON CONFLICT (track_id) DO UPDATE
+    SET document = EXCLUDED.document,
+        search_text = EXCLUDED.search_text
+    WHERE track_search.document IS DISTINCT FROM EXCLUDED.document
+       OR track_search.search_text IS DISTINCT FROM EXCLUDED.search_text;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION sae.sync_track_search()
+RETURNS TRIGGER AS $$
+DECLARE
+    ids INT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(track_id) INTO ids FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(track_id) INTO ids FROM old_rows;
+    ELSE
+        SELECT array_agg(track_id) INTO ids FROM new_rows;
+    END IF;
+
+    IF ids IS NOT NULL THEN
+        PERFORM sae.refresh_track_search(ids);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tracks_features_mat_search_ins ON tracks_features_mat;
+CREATE TRIGGER tracks_features_mat_search_ins
+AFTER INSERT ON tracks_features_mat
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION sae.sync_track_search();
+
+DROP TRIGGER IF EXISTS tracks_features_mat_search_upd ON tracks_features_mat;
+CREATE TRIGGER tracks_features_mat_search_upd
+AFTER UPDATE ON tracks_features_mat
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION sae.sync_track_search();
+
+DROP TRIGGER IF EXISTS tracks_features_mat_search_del ON tracks_features_mat;
+CREATE TRIGGER tracks_features_mat_search_del
+AFTER DELETE ON tracks_features_mat
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION sae.sync_track_search();
+
+
+/* ========================== CHARGEMENT INITIAL + INDEX  ========================== */
+
+SELECT sae.refresh_track_search();
+
+CREATE INDEX IF NOT EXISTS idx_track_search_document
+ON track_search USING GIN (document);
+
+CREATE INDEX IF NOT EXISTS idx_track_search_trgm
+ON track_search USING GIN (search_text public.gin_trgm_ops);
+
+ANALYZE track_search;
@@ -766,4 +766,19 @@ FOR EACH ROW EXECUTE FUNCTION set_track_created_date();
 
 
 CREATE INDEX IF NOT EXISTS idx_album_keynouns
-ON sae.album USING GIN (album_keynouns);
\ No newline at end of file
+ON sae.album USING GIN (album_keynouns);
+/* Pagination par curseur (keyset) : mêmes expressions que l'ORDER BY des routes */
+CREATE INDEX IF NOT EXISTS idx_tracks_listens_keyset
+ON sae.tracks ((COALESCE(track_listens, -1)) DESC, track_id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_artist_favorites_keyset
+ON sae.artist ((COALESCE(artist_favorites, -1)) DESC, artist_id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_album_released_keyset
+ON sae.album ((COALESCE(album_date_released, DATE '0001-01-01')) DESC, album_id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_track_genre_genre
+ON sae.track_genre (genre_id, track_id);
+
+CREATE INDEX IF NOT EXISTS idx_artist_album_track_track
+ON sae.artist_album_track (track_id);
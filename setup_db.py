@@ -44,7 +44,10 @@ def main():
     print("=== DÉMARRAGE DE LA MISE EN SERVICE DE LA BDD ===\n")
 
     run_sql_file("Tables/scriptBDDv1.sql")
-    # run_sql_file("Tables/scriptBDDdlc.sql")
+    # Vecteurs audio (extension pgvector) du moteur /reco/tracks/audio
+    run_sql_file("Tables/scriptBDDdlc.sql")
+    # Migrations versionnées (Tables/migrations), une seule fois par base
+    run_python_script("API/scripts/migrate.py")
 
     run_python_script("script_peuplement/populateFinale.py")
     run_python_script("script_peuplement/populateFinal2.py")
@@ -52,6 +55,18 @@ def main():
     run_python_script("script_peuplement/populateternairedeconla.py")
     # run_python_script("script_peuplement/populateKeynouns.py")
 
+    # Tables *_features_mat : chargées après le peuplement, puis tenues à jour par triggers
+    run_sql_file("Tables/scriptBDDmat.sql")
+    # Compteurs des totaux paginés (sae.row_counts)
+    run_sql_file("Tables/scriptBDDcounts.sql")
+    # Index de recherche de /search/tracks (plein texte + trigrammes), après les tables *_mat
+    run_sql_file("Tables/scriptBDDsearch.sql")
+    # Notifications des changements du catalogue pour l'autocomplétion en mémoire de l'API
+    run_sql_file("Tables/scriptBDDautocomplete.sql")
+    # Vecteurs audio réduits (présélection de /reco/tracks/audio), après le peuplement des vecteurs
+    run_sql_file("Tables/scriptBDDaudio.sql")
+    run_python_script("Recommendation/audio_reduction.py")
+
     print("=== BASE DE DONNÉES OPÉRATIONNELLE ! ===")
 
 if __name__ == "__main__":